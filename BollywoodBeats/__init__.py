@@ -1,205 +1,274 @@
-from datetime import datetime, timedelta
-from decimal import Decimal
+from datetime import datetime
 import os
 
-from flask import Flask, render_template, request
+from flask import Flask, g, render_template, request
 from flask_bootstrap import Bootstrap5
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from sqlalchemy import func
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy.orm import selectinload
 
-db = SQLAlchemy()
+from .routing import RoutingSession
+from .startup import StartupProfile
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 
+# Lightweight endpoints that must not trigger the per-request status sweep.
+SWEEP_EXEMPT_ENDPOINTS = {
+    "static",
+    "main.event_live",
+    "main.event_live_snapshot",
+    "main.event_queue_status",
+    # Derives each booked event's status in SQL as it reads the page.
+    "main.booking_history",
+    "main.search_suggestions",
+    "calendars.category_feed",
+    "calendars.city_feed",
+    "calendars.user_feed",
+    "metrics",
+}
+
+
+def _archive_database_url(primary_url: str) -> str:
+    if primary_url.startswith("sqlite:///") and primary_url.endswith(".db"):
+        return primary_url[: -len(".db")] + "-archive.db"
+    return primary_url
+
+
 def create_app(test_config: dict | None = None) -> Flask:
     """Application factory so tests and CLI tasks can create isolated apps."""
+    profile = StartupProfile()
     app = Flask(__name__, instance_relative_config=True)
+    app.extensions["startup_profile"] = profile
+
+    replica_urls = [
+        url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ]
 
     # Config: SQLite lives in instance/ for easy packaging
     app.config.from_mapping(
-        # Generate a fresh secret key every start to invalidate sessions
-        SECRET_KEY=os.urandom(32),
+        # Generate a fresh secret key every start to invalidate sessions, unless
+        # one is provided (required when several workers must share sessions).
+        SECRET_KEY=os.environ.get("SECRET_KEY") or os.urandom(32),
         SQLALCHEMY_DATABASE_URI=os.environ.get(
             "DATABASE_URL",
             "sqlite:///" + os.path.join(app.instance_path, "app.db")
         ),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # Read replicas are plain binds; READ_REPLICAS lists which keys serve reads.
+        SQLALCHEMY_BINDS={f"replica_{i}": url for i, url in enumerate(replica_urls)},
+        READ_REPLICAS=[f"replica_{i}" for i in range(len(replica_urls))],
+        READ_REPLICA_HEALTH_INTERVAL=5,
+        READ_YOUR_WRITES_SECONDS=10,
+        # Seconds a cached login principal is trusted before re-reading the user row,
+        # and how often each worker checks whether any account changed elsewhere.
+        IDENTITY_CACHE_TTL=60,
+        IDENTITY_CACHE_SIZE=10_000,
+        IDENTITY_CACHE_CHECK_INTERVAL=2,
+        # Compile templates before serving; bytecode lives in instance/jinja_cache.
+        TEMPLATE_WARMUP=os.environ.get("TEMPLATE_WARMUP", "1") == "1",
+        JINJA_BYTECODE_CACHE_DIR=None,
+        # Seconds partners may reuse a catalogue API response before revalidating.
+        API_CACHE_MAX_AGE=30,
+        # Serve index/event_details/API lists from coroutine views on an async engine.
+        ASYNC_READS=os.environ.get("ASYNC_READS", "0") == "1",
+        # "memory" fans out within one process; "redis" relays across workers.
+        LIVE_BROKER=os.environ.get("LIVE_BROKER", "memory"),
+        LIVE_REDIS_URL=os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+        LIVE_HEARTBEAT_SECONDS=15,
+        # Each open stream pins a request thread, so a process serves only this
+        # many at once (0 = none) and ends each after LIVE_STREAM_SECONDS. Pages
+        # refused a stream poll every LIVE_POLL_SECONDS instead.
+        LIVE_MAX_STREAMS=int(os.environ.get("LIVE_MAX_STREAMS", 2)),
+        LIVE_STREAM_SECONDS=300,
+        LIVE_POLL_SECONDS=15,
+        # Waiting room: per-event admissions per second into book_event.
+        WAITING_ROOM_ENABLED=True,
+        WAITING_ROOM_RATE=5.0,
+        WAITING_ROOM_BURST=20,
+        WAITING_ROOM_EVENT_RATES={},
+        WAITING_ROOM_PASS_SECONDS=120,
+        WAITING_ROOM_TOKEN_MAX_AGE=3600,
+        # Rate limiting: "memory" per process, "redis" shared between workers.
+        RATELIMIT_ENABLED=True,
+        RATELIMIT_STORAGE=os.environ.get("RATELIMIT_STORAGE", "memory"),
+        RATELIMIT_REDIS_URL=os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+        RATELIMIT_RULES={},
+        # Reverse proxies/load balancers in front of the app. When set, the client
+        # address (and scheme) comes from that many X-Forwarded-For/-Proto hops, so
+        # per-IP limits see real clients. Leave at 0 when clients connect directly,
+        # or they could forge the header.
+        TRUSTED_PROXIES=int(os.environ.get("TRUSTED_PROXIES", 0)),
+        # Create tables and seed demo data at boot; production runs `flask init-db` once instead.
+        INIT_DB_ON_STARTUP=os.environ.get("INIT_DB_ON_STARTUP", "1") == "1",
+        # Cold import + create_app budget enforced by `flask startup-report`.
+        STARTUP_BUDGET_MS=float(os.environ.get("STARTUP_BUDGET_MS", 1500)),
+        # Response compression (brotli when installed, else gzip).
+        COMPRESS_ENABLED=True,
+        COMPRESS_MIN_SIZE=1024,
+        COMPRESS_GZIP_LEVEL=6,
+        COMPRESS_BR_LEVEL=5,
+        COMPRESS_CACHE_ENTRIES=256,
+        # Also gzip/brotli streamed HTML, flushing after every chunk.
+        COMPRESS_STREAMS=True,
+        # Listing pages (index, my events, history) render as a chunked stream.
+        STREAM_LISTINGS=True,
+        STREAM_CHUNK_SIZE=8192,
+        STREAM_YIELD_PER=500,
+        # Accounts owning more rows than this are purged in background chunks.
+        ACCOUNT_DELETE_INLINE_LIMIT=5000,
+        ACCOUNT_DELETE_CHUNK_SIZE=1000,
+        # Finished events older than this move to the archive bind in batches.
+        ARCHIVE_DATABASE_URL=os.environ.get("ARCHIVE_DATABASE_URL"),
+        ARCHIVE_AFTER_DAYS=int(os.environ.get("ARCHIVE_AFTER_DAYS", 90)),
+        ARCHIVE_BATCH_SIZE=200,
+        # Related events shown on a detail page, and how many are precomputed
+        # per event (the spare ones cover neighbours that pass or get cancelled).
+        RELATED_EVENTS_LIMIT=4,
+        RELATED_EVENTS_STORED=8,
+        # Facet counts per filter selection; also dropped on any catalogue write.
+        FACET_CACHE_ENTRIES=512,
+        FACET_CACHE_TTL=300,
+        # Home page and nav bar served from an in-memory copy of the catalogue,
+        # re-checked against the catalogue version at most this often (seconds).
+        READ_MODEL_ENABLED=True,
+        READ_MODEL_MAX_STALENESS=2,
+        # Changed-event log the read model reloads from (see changes.py): rows
+        # are kept this long and pruned by each worker at most once per interval.
+        CATALOGUE_LOG_RETENTION=3600,
+        CATALOGUE_LOG_SWEEP_INTERVAL=300,
+        # Search-as-you-type suggestions per keystroke (served from the read model).
+        SUGGEST_LIMIT=8,
+        # Seconds calendar clients may reuse an .ics feed before revalidating.
+        CALENDAR_FEED_MAX_AGE=900,
+        # Checkout holds: seats stay reserved this long, and each worker
+        # deletes expired holds at most once per interval, in batches.
+        HOLD_SECONDS=600,
+        HOLD_SWEEP_INTERVAL=30,
+        HOLD_SWEEP_BATCH=500,
+        # Duplicate booking/event submissions replay the first result for this
+        # long; a duplicate of one still running waits this many seconds for it.
+        IDEMPOTENCY_KEY_TTL=86400,
+        IDEMPOTENCY_WAIT_SECONDS=10,
+        IDEMPOTENCY_SWEEP_INTERVAL=300,
+        # Prometheus metrics at /metrics (off by default: they expose traffic
+        # and pool details); each worker writes its counters to METRICS_DIR
+        # (default instance/metrics) this often for the others to merge.
+        METRICS_ENABLED=os.environ.get("METRICS_ENABLED", "0") == "1",
+        METRICS_DIR=os.environ.get("METRICS_DIR"),
+        METRICS_FLUSH_INTERVAL=5,
+        # When set, scrapers must send "Authorization: Bearer <token>".
+        METRICS_TOKEN=os.environ.get("METRICS_TOKEN"),
+        # Per-request cost allowed by benchmarks/metrics_overhead.py.
+        METRICS_OVERHEAD_BUDGET_US=float(os.environ.get("METRICS_OVERHEAD_BUDGET_US", 100)),
+        # Sampling profiler for single requests (off by default; see profiling.py).
+        PROFILING_ENABLED=os.environ.get("PROFILING_ENABLED", "0") == "1",
+        PROFILE_SAMPLE_RATE=float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+        PROFILE_INTERVAL_MS=5,
+        PROFILE_TOKEN_MAX_AGE=86400,
+        PROFILE_DIR=os.environ.get("PROFILE_DIR"),
     )
     if test_config:
         app.config.update(test_config)
+    # Archive tables default to a sibling SQLite file (or the primary database).
+    app.config["SQLALCHEMY_BINDS"].setdefault(
+        "archive",
+        app.config["ARCHIVE_DATABASE_URL"]
+        or _archive_database_url(app.config["SQLALCHEMY_DATABASE_URI"]),
+    )
 
     os.makedirs(app.instance_path, exist_ok=True)
 
+    if app.config["TRUSTED_PROXIES"]:
+        hops = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
     # Extensions
-    Bootstrap5(app)
-    db.init_app(app)
-    login_manager.init_app(app)
-    login_manager.login_view = "auth.login"
+    with profile.phase("extensions"):
+        from .api import FastJSONProvider
+        app.json = FastJSONProvider(app)
+        Bootstrap5(app)
+        db.init_app(app)
+        login_manager.init_app(app)
+        login_manager.login_view = "auth.login"
 
-    # Import models so metadata is registered
-    from . import models  # noqa: F401
+        # Import models so metadata is registered
+        from . import archive, models  # noqa: F401
 
-    # Ensure database/tables exist for first run
-    with app.app_context():
-        db.create_all()
-        from .models import User, Event, EventStatus
+    from . import seed
+    if app.config["INIT_DB_ON_STARTUP"]:
+        # Ensure database/tables exist for first run
+        with profile.phase("database"), app.app_context():
+            seed.init_database()
 
-        demo_owner = db.session.scalar(
-            db.select(User).where(User.username == "demo_owner")
-        )
-        if demo_owner is None:
-            # Seed a predictable owner so the catalogue and tests have data.
-            demo_owner = User(
-                first_name="Bollywood",
-                last_name="Beats",
-                username="demo_owner",
-                email="demo@bollywoodbeats.com",
-                contact_number="0000000000",
-                street_address="Online Only",
-            )
-            demo_owner.set_password("demo1234")
-            db.session.add(demo_owner)
-            db.session.flush()
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create tables and seed the demo catalogue."""
+        seed.init_database()
 
-        now = datetime.utcnow()
-        demo_events_data = [
-            {
-                "title": "Bollywood Night Live",
-                "category": "Bollywood",
-                "description": "A high-energy evening featuring the best Bollywood hits with live dancers and an immersive light show.",
-                "image_url": "concert1.jpg",
-                "venue": "Sydney Opera House",
-                "city": "Sydney",
-                "start_dt": now + timedelta(days=14),
-                "capacity": 250,
-                "price": Decimal("79.00"),
-                "status": EventStatus.OPEN,
-            },
-            {
-                "title": "Desi Beats Festival",
-                "category": "EDM",
-                "description": "A fusion night of desi EDM with top DJs and surprise guest performers keeping the dance floor packed till late.",
-                "image_url": "concert4.jpg",
-                "venue": "The Forum",
-                "city": "Melbourne",
-                "start_dt": now + timedelta(days=30),
-                "capacity": 0,
-                "price": Decimal("65.00"),
-                "status": EventStatus.SOLD_OUT,
-            },
-            {
-                "title": "Classical Raagas Evening",
-                "category": "Classical",
-                "description": "An intimate concert celebrating timeless raagas with renowned vocalists and instrumental maestros.",
-                "image_url": "concert3.jpg",
-                "venue": "QPAC Concert Hall",
-                "city": "Brisbane",
-                "start_dt": datetime(2026, 1, 1, 18, 0),
-                "capacity": 180,
-                "price": Decimal("45.00"),
-                "status": EventStatus.OPEN,
-            },
-            {
-                "title": "Sufi Soul Sessions",
-                "category": "Sufi",
-                "description": "Experience a spiritual evening of qawwali-inspired vocals and traditional instrumentation in an intimate setting.",
-                "image_url": "concert2.jpg",
-                "venue": "State Theatre",
-                "city": "Sydney",
-                "start_dt": now + timedelta(days=21),
-                "capacity": 220,
-                "price": Decimal("55.00"),
-                "status": EventStatus.OPEN,
-            },
-            {
-                "title": "Bollywood Beats Brunch",
-                "category": "Fusion",
-                "description": "A daytime brunch party with live DJs spinning Bollywood remixes, dance workshops and street-food pop-ups.",
-                "image_url": "concert5.jpg",
-                "venue": "Howard Smith Wharves",
-                "city": "Brisbane",
-                "start_dt": now + timedelta(days=7, hours=5),
-                "capacity": 150,
-                "price": Decimal("39.00"),
-                "status": EventStatus.OPEN,
-            },
-            {
-                "title": "Monsoon Melodies Tour",
-                "category": "Folk",
-                "description": "Celebrate the sounds of the monsoon with folk artists from across India showcasing regional instruments and storytelling.",
-                "image_url": "concert6.jpg",
-                "venue": "Thebarton Theatre",
-                "city": "Adelaide",
-                "start_dt": now + timedelta(days=45),
-                "capacity": 300,
-                "price": Decimal("49.00"),
-                "status": EventStatus.OPEN,
-            },
-            {
-                "title": "Desi Comedy Night",
-                "category": "Comedy",
-                "description": "An evening of stand-up featuring Australian-Indian comedians delivering desi humour, improv and audience roasting.",
-                "image_url": "concert7.jpg",
-                "venue": "Comedy Republic",
-                "city": "Melbourne",
-                "start_dt": now - timedelta(days=2),
-                "capacity": 120,
-                "price": Decimal("30.00"),
-                "status": EventStatus.CANCELLED,
-            },
-        ]
-
-        existing_titles = set(
-            db.session.scalars(
-                db.select(Event.title).where(Event.owner_id == demo_owner.id)
-            ).all()
+    with profile.phase("features"):
+        from . import (
+            archive, changes, compression, deletion, facets, holds, idempotency,
+            identity, live, metrics, ratelimit, readmodel, related, routing, startup,
+            waiting_room,
         )
-        new_events = []
-        for event_data in demo_events_data:
-            if event_data["title"] in existing_titles:
-                continue
-            # Store the raw dictionary so SQLAlchemy assigns defaults (e.g. relationships).
-            new_events.append(
-                Event(
-                    owner_id=demo_owner.id,
-                    **event_data,
-                )
-            )
-        if new_events:
-            db.session.add_all(new_events)
-            db.session.commit()
-
-    # User loader
-    @login_manager.user_loader
-    def load_user(user_id):
-        from .models import User
-        return db.session.get(User, int(user_id))
+        # Registered first so its hooks bracket every other hook, compression included.
+        metrics.init_app(app)
+        if app.config["PROFILING_ENABLED"]:
+            # Next, so profiles include the status sweep and the other hooks.
+            from . import profiling
+            profiling.init_app(app)
+        # Registered next so its after_request hook runs after the rest, on the final body.
+        compression.init_app(app)
+        identity.init_app(app, login_manager)
+        routing.init_app(app, db)
+        live.init_app(app)
+        waiting_room.init_app(app)
+        # Ahead of rate limiting, so replayed duplicates don't count against it.
+        idempotency.init_app(app)
+        ratelimit.init_app(app)
+        startup.init_app(app)
+        deletion.init_app(app)
+        archive.init_app(app)
+        related.init_app(app)
+        changes.init_app(app)
+        facets.init_app(app)
+        readmodel.init_app(app)
+        holds.init_app(app)
 
     # Blueprints already in repo
-    from . import views, auth
-    app.register_blueprint(views.main_bp)
-    app.register_blueprint(auth.auth_bp, url_prefix="/auth")
+    with profile.phase("blueprints"):
+        from . import views, auth, api, calendars
+        app.register_blueprint(views.main_bp)
+        app.register_blueprint(auth.auth_bp, url_prefix="/auth")
+        app.register_blueprint(api.api_bp, url_prefix="/api/v1")
+        app.register_blueprint(calendars.calendar_bp, url_prefix="/calendar")
+
+        if app.config["ASYNC_READS"]:
+            # Imported lazily so sync deployments don't need the async drivers.
+            from . import aio
+            aio.init_app(app)
+
+    with profile.phase("templates"):
+        from . import templating
+        templating.init_app(app)
 
     @app.context_processor
     def inject_navigation_data():
-        from .models import Event, EventStatus
+        if "nav_data" in g:
+            # Async views gather these alongside their main query.
+            return g.nav_data
 
-        now = datetime.utcnow()
-        categories = db.session.scalars(
-            db.select(Event.category)
-            .where(Event.category.isnot(None))
-            .distinct()
-            .order_by(Event.category.asc())
-        ).all()
-        upcoming_event_count = db.session.scalar(
-            db.select(func.count())
-            .select_from(Event)
-            .where(
-                Event.start_dt.isnot(None),
-                Event.start_dt >= now,
-                Event.status != EventStatus.CANCELLED,
-            )
-        ) or 0
+        with routing.replica_reads():
+            snapshot = readmodel.current()
+        if snapshot is not None:
+            return snapshot.nav_data(datetime.utcnow())
+
+        categories_stmt, upcoming_count_stmt = views.nav_statements(datetime.utcnow())
+        with routing.replica_reads():
+            categories = db.session.scalars(categories_stmt).all()
+            upcoming_event_count = db.session.scalar(upcoming_count_stmt) or 0
 
         return {
             "nav_categories": categories,
@@ -217,7 +286,13 @@ def create_app(test_config: dict | None = None) -> Flask:
 
     @app.before_request
     def auto_refresh_event_statuses():
-        if request.endpoint == "static":
+        if request.endpoint in SWEEP_EXEMPT_ENDPOINTS or request.blueprint == "api":
+            # The JSON API derives status in SQL, and streams/polls never render
+            # statuses, so none of them pay for the sweep.
+            return None
+        if request.endpoint == "main.index" and "read_model" in app.extensions:
+            # Both home page views render from the read model, which closes
+            # started events itself; capacity changes are synced by the booking paths.
             return None
 
         from .models import Event, EventStatus
@@ -225,13 +300,25 @@ def create_app(test_config: dict | None = None) -> Flask:
         now = datetime.utcnow()
         # Keep dynamic statuses in sync so pages never render stale availability.
         check_statuses = (EventStatus.OPEN, EventStatus.SOLD_OUT, EventStatus.INACTIVE)
+        # Capacity reads walk these collections, so load them in one query each
+        # rather than lazily per event.
         events = db.session.scalars(
-            db.select(Event).where(Event.status.in_(check_statuses))
+            db.select(Event)
+            .where(Event.status.in_(check_statuses))
+            .options(
+                selectinload(Event.ticket_types),
+                selectinload(Event.bookings),
+                selectinload(Event.holds),
+            )
         ).all()
-        updated = False
+        transitions = []
         for event in events:
-            updated |= event.refresh_status(now=now)
-        if updated:
+            previous = event.status
+            if event.refresh_status(now=now):
+                transitions.append((previous, event.status))
+        if transitions:
             db.session.commit()
+            for previous, status in transitions:
+                metrics.record_status_transition(previous, status)
 
     return app
@@ -0,0 +1,39 @@
+"""
+Per-event aggregate subqueries shared by the catalogue readers.
+
+The JSON API, the read model, facet counts and related events all join
+these instead of loading tiers, bookings or holds per event.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import func, union_all
+
+from . import db
+from .models import Booking, TicketHold, TicketType
+
+
+def booked_subquery(now: datetime):
+    """Seats taken per event: booked, plus held by checkouts still in progress."""
+    taken = union_all(
+        db.select(Booking.event_id, Booking.qty),
+        db.select(TicketHold.event_id, TicketHold.qty).where(TicketHold.expires_at > now),
+    ).subquery()
+    return (
+        db.select(taken.c.event_id, func.sum(taken.c.qty).label("booked"))
+        .group_by(taken.c.event_id)
+        .subquery()
+    )
+
+
+def tiers_subquery():
+    """Total tier capacity and cheapest tier price per event that has tiers."""
+    return (
+        db.select(
+            TicketType.event_id,
+            func.sum(TicketType.quantity).label("tier_capacity"),
+            func.min(TicketType.price).label("tier_price"),
+        )
+        .group_by(TicketType.event_id)
+        .subquery()
+    )
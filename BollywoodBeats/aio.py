@@ -0,0 +1,124 @@
+"""
+Async read path for the catalogue pages.
+
+When ``ASYNC_READS`` is enabled the read-heavy endpoints are swapped for
+coroutine views that query through SQLAlchemy's async engine (aiosqlite for
+the local SQLite file). Independent queries, such as the event list and the
+navigation data, run concurrently instead of back to back. Writes keep using
+the synchronous ``db.session`` and its transactions.
+
+Each read replica gets an async engine of its own. The home page, event
+pages and navigation data read from a healthy replica, picked by the same
+round-robin and health checks as ``RoutingSession``. They fall back to the
+primary after a recent write or when no replica is healthy. The JSON API
+reads from the primary, as its sync view does.
+"""
+
+import asyncio
+from datetime import datetime
+
+from flask import abort, current_app, g, request
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from . import api, db, facets, readmodel, routing, views
+
+# Driver used when the sync URL names only the dialect.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_database_uri(uri: str) -> str:
+    """Translate ``SQLALCHEMY_DATABASE_URI`` into its async-driver equivalent."""
+    scheme, sep, rest = uri.partition("://")
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{dialect}' databases.")
+    return ASYNC_DRIVERS[dialect] + sep + rest
+
+
+def init_app(app) -> None:
+    uris = {
+        None: app.config.get("ASYNC_DATABASE_URI")
+        or async_database_uri(app.config["SQLALCHEMY_DATABASE_URI"])
+    }
+    for key in app.config["READ_REPLICAS"]:
+        bind = app.config["SQLALCHEMY_BINDS"][key]
+        uris[key] = async_database_uri(bind["url"] if isinstance(bind, dict) else bind)
+    # Flask runs each coroutine view on its own event loop, and async DBAPI
+    # connections are bound to the loop that opened them, so skip pooling.
+    engines = {key: create_async_engine(uri, poolclass=NullPool) for key, uri in uris.items()}
+    app.extensions["async_sessions"] = {
+        key: async_sessionmaker(engine, expire_on_commit=False) for key, engine in engines.items()
+    }
+
+    app.view_functions["main.index"] = index
+    app.view_functions["main.event_details"] = event_details
+    app.view_functions["api.list_events"] = list_events
+
+
+def _session(*, replica: bool = False):
+    key = None
+    # Same rules as RoutingSession: read-your-writes pins to the primary.
+    if replica and not routing.wants_primary() and not db.session.info.get("wrote"):
+        key = current_app.extensions["read_replicas"].choose_key(db.engines)
+    return current_app.extensions["async_sessions"][key]()
+
+
+async def _scalars(stmt, *, replica: bool = False) -> list:
+    async with _session(replica=replica) as session:
+        return (await session.scalars(stmt)).all()
+
+
+async def _nav_data() -> dict:
+    categories_stmt, upcoming_count_stmt = views.nav_statements(datetime.utcnow())
+    async with _session(replica=True) as session:
+        categories = (await session.scalars(categories_stmt)).all()
+        upcoming_event_count = await session.scalar(upcoming_count_stmt) or 0
+    return {
+        "nav_categories": categories,
+        "upcoming_event_count": int(upcoming_event_count),
+    }
+
+
+async def index():
+    filters = facets.parse_filters(request.args)
+    search_term = (request.args.get("q") or "").strip()
+
+    with routing.replica_reads():
+        snapshot = readmodel.current()
+    if snapshot is not None:
+        # Memory beats any query, async or not. The cards close started
+        # events themselves, so this page skips the status sweep.
+        events = snapshot.select(filters, search_term, datetime.utcnow())
+        return views._render_index(events, filters, search_term, version=snapshot.version)
+
+    events, g.nav_data = await asyncio.gather(
+        _scalars(views._index_statement(filters, search_term), replica=True),
+        _nav_data(),
+    )
+    # Without the read model, statuses were reconciled by the before_request
+    # sweep. Facet counts come from their cache, so the sync lookup is one
+    # version read.
+    return views._render_index(events, filters, search_term)
+
+
+async def event_details(event_id: int):
+    events, related_events, g.nav_data = await asyncio.gather(
+        _scalars(views._event_details_statement(event_id), replica=True),
+        _scalars(views._related_statement(event_id), replica=True),
+        _nav_data(),
+    )
+    if not events:
+        abort(404)
+    return views._render_event_details(events[0], related_events)
+
+
+async def list_events():
+    stmt, fields, limit = api.events_page_query()
+    async with _session() as session:
+        rows = (await session.execute(stmt)).all()
+    return api.events_page_response(rows, fields, limit)
@@ -0,0 +1,291 @@
+"""Read-only JSON API for the event catalogue (mobile app and partner sites)."""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+
+from flask import Blueprint, abort, current_app, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import case, func, type_coerce
+
+from . import db, routing
+from .aggregates import booked_subquery, tiers_subquery
+from .models import Event, EventStatus, TicketType
+from .pagination import decode_cursor, encode_cursor
+
+try:  # orjson is optional; the stdlib encoder is used when it is missing.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+api_bp = Blueprint("api", __name__)
+
+
+@api_bp.before_request
+def _prefer_replica():
+    # Every API endpoint is read-only, so all of them may use a replica.
+    g.use_replica = not routing.wants_primary()
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# ---------------------------
+# Serialization
+# ---------------------------
+def _default(value):
+    """Fallback encoder for the types the catalogue actually returns."""
+    if isinstance(value, Decimal):
+        # Money stays a string so clients never see float rounding.
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, which encodes datetimes natively."""
+
+    compact = True
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default).decode()
+        kwargs.setdefault("default", _default)
+        kwargs.setdefault("separators", (",", ":"))
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+
+# ---------------------------
+# Query helpers
+# ---------------------------
+def _catalogue_columns(booked, tiers, now: datetime) -> dict:
+    """
+    Map every public field to a SQL expression so capacity, price and status
+    are computed in one statement instead of hydrating bookings per event.
+    """
+    total_capacity = func.coalesce(tiers.c.tier_capacity, Event.capacity, 0)
+    unsold = total_capacity - func.coalesce(booked.c.booked, 0)
+    remaining = case((unsold < 0, 0), else_=unsold)
+    # Mirror Event.refresh_status so API readers never depend on the status sweep.
+    status = type_coerce(
+        case(
+            (Event.status == EventStatus.CANCELLED, Event.status),
+            (Event.start_dt < now, EventStatus.INACTIVE.name),
+            (remaining <= 0, EventStatus.SOLD_OUT.name),
+            else_=EventStatus.OPEN.name,
+        ),
+        Event.status.type,
+    )
+    return {
+        "id": Event.id,
+        "title": Event.title,
+        "category": Event.category,
+        "description": Event.description,
+        "image_url": Event.image_url,
+        "venue": Event.venue,
+        "city": Event.city,
+        "start_dt": Event.start_dt,
+        "price": func.coalesce(tiers.c.tier_price, Event.price),
+        "status": status,
+        "total_capacity": total_capacity,
+        "remaining_capacity": remaining,
+        "updated_at": Event.updated_at,
+    }
+
+
+def capacity_snapshot(event_id: int):
+    """Remaining/total capacity and effective status for one event in one query."""
+    now = datetime.utcnow()
+    booked = booked_subquery(now)
+    tiers = tiers_subquery()
+    columns = _catalogue_columns(booked, tiers, now)
+    return db.session.execute(
+        db.select(
+            *(
+                columns[name].label(name)
+                for name in ("remaining_capacity", "total_capacity", "status")
+            )
+        )
+        .outerjoin(booked, booked.c.event_id == Event.id)
+        .outerjoin(tiers, tiers.c.event_id == Event.id)
+        .where(Event.id == event_id)
+    ).first()
+
+
+LIST_FIELDS = (
+    "id",
+    "title",
+    "category",
+    "image_url",
+    "venue",
+    "city",
+    "start_dt",
+    "price",
+    "status",
+    "remaining_capacity",
+)
+
+
+def _parse_fields(default: tuple[str, ...], allowed) -> tuple[str, ...]:
+    raw = (request.args.get("fields") or "").strip()
+    if not raw:
+        return default
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        abort(400, description=f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def _parse_datetime(name: str) -> datetime | None:
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        abort(400, description=f"'{name}' must be an ISO 8601 date or datetime.")
+
+
+def _cached_json(payload):
+    """Serialize once, then let clients revalidate with If-None-Match."""
+    response = jsonify(payload)
+    response.add_etag()
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get("API_CACHE_MAX_AGE", 30)
+    return response.make_conditional(request)
+
+
+def events_page_query():
+    """Build the list statement from the query string; shared with the async path."""
+    now = datetime.utcnow()
+    booked = booked_subquery(now)
+    tiers = tiers_subquery()
+    columns = _catalogue_columns(booked, tiers, now)
+    fields = _parse_fields(LIST_FIELDS, columns)
+
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        abort(400, description="'limit' must be an integer.")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    # id and start_dt always ride along because the cursor is built from them.
+    selected = dict.fromkeys(("id", "start_dt") + fields)
+    stmt = (
+        db.select(*(columns[name].label(name) for name in selected))
+        .outerjoin(booked, booked.c.event_id == Event.id)
+        .outerjoin(tiers, tiers.c.event_id == Event.id)
+        .order_by(Event.start_dt.asc(), Event.id.asc())
+        .limit(limit + 1)
+    )
+
+    category = request.args.get("category")
+    if category:
+        stmt = stmt.where(Event.category == category)
+    city = request.args.get("city")
+    if city:
+        stmt = stmt.where(Event.city == city)
+    start_from = _parse_datetime("from")
+    if start_from is not None:
+        stmt = stmt.where(Event.start_dt >= start_from)
+    start_to = _parse_datetime("to")
+    if start_to is not None:
+        stmt = stmt.where(Event.start_dt < start_to)
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        after_dt, after_id = decode_cursor(cursor)
+        # Keyset pagination: stable and index-friendly, unlike OFFSET.
+        stmt = stmt.where(
+            db.or_(
+                Event.start_dt > after_dt,
+                db.and_(Event.start_dt == after_dt, Event.id > after_id),
+            )
+        )
+
+    return stmt, fields, limit
+
+
+def events_page_response(rows, fields: tuple[str, ...], limit: int):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.start_dt, last.id)
+
+    return _cached_json(
+        {
+            "data": [{name: getattr(row, name) for name in fields} for row in rows],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+# ---------------------------
+# Endpoints
+# ---------------------------
+@api_bp.get("/events")
+def list_events():
+    stmt, fields, limit = events_page_query()
+    rows = db.session.execute(stmt).all()
+    return events_page_response(rows, fields, limit)
+
+
+def _ticket_types_for(event_id: int) -> list[dict]:
+    rows = db.session.execute(
+        db.select(TicketType.id, TicketType.name, TicketType.price, TicketType.quantity)
+        .where(TicketType.event_id == event_id)
+        .order_by(TicketType.price.asc(), TicketType.id.asc())
+    ).all()
+    return [row._asdict() for row in rows]
+
+
+@api_bp.get("/events/<int:event_id>")
+def event_detail(event_id: int):
+    now = datetime.utcnow()
+    booked = booked_subquery(now)
+    tiers = tiers_subquery()
+    columns = _catalogue_columns(booked, tiers, now)
+    fields = _parse_fields(tuple(columns) + ("ticket_types",), set(columns) | {"ticket_types"})
+
+    # The id is always selected, so a fields list of only ticket_types still
+    # has a column to select and a row that tells whether the event exists.
+    selected = [name for name in dict.fromkeys(("id",) + fields) if name in columns]
+    row = db.session.execute(
+        db.select(*(columns[name].label(name) for name in selected))
+        .outerjoin(booked, booked.c.event_id == Event.id)
+        .outerjoin(tiers, tiers.c.event_id == Event.id)
+        .where(Event.id == event_id)
+    ).first()
+    if row is None:
+        abort(404)
+
+    payload = {name: getattr(row, name) for name in fields if name in columns}
+    if "ticket_types" in fields:
+        payload["ticket_types"] = _ticket_types_for(event_id)
+    return _cached_json({"data": payload})
+
+
+@api_bp.get("/events/<int:event_id>/ticket-types")
+def event_ticket_types(event_id: int):
+    if db.session.scalar(db.select(Event.id).where(Event.id == event_id)) is None:
+        abort(404)
+    return _cached_json({"data": _ticket_types_for(event_id)})
+
+
+@api_bp.errorhandler(400)
+@api_bp.errorhandler(404)
+def api_error(e):
+    return jsonify({"error": e.name, "description": e.description}), e.code
@@ -0,0 +1,192 @@
+"""
+Archival of finished events and database maintenance commands.
+
+Inactive and cancelled events that started more than ``ARCHIVE_AFTER_DAYS``
+ago are copied, with their tiers, bookings and comments, into ``archived_*``
+tables on the ``archive`` bind. They are then deleted from the hot tables,
+which cascade to the children. Archived bookings stay visible on the
+booking history page.
+"""
+
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+
+from . import db
+from .models import Booking, Comment, Event, EventStatus, TicketType
+
+ARCHIVABLE_STATUSES = (EventStatus.INACTIVE, EventStatus.CANCELLED)
+
+
+def _columns(model) -> list[sa.Column]:
+    # Plain copies: no foreign keys, since the archive may be another database.
+    return [
+        sa.Column(column.name, column.type, primary_key=column.primary_key)
+        for column in model.__table__.columns
+    ]
+
+
+events = db.Table(
+    "archived_events",
+    *_columns(Event),
+    sa.Column("archived_at", sa.DateTime),
+    bind_key="archive",
+)
+ticket_types = db.Table(
+    "archived_ticket_types",
+    *_columns(TicketType),
+    sa.Index("ix_archived_ticket_types_event_id", "event_id"),
+    bind_key="archive",
+)
+bookings = db.Table(
+    "archived_bookings",
+    *_columns(Booking),
+    sa.Index("ix_archived_bookings_user_booked_at", "user_id", "booked_at", "id"),
+    sa.Index("ix_archived_bookings_event_id", "event_id"),
+    bind_key="archive",
+)
+comments = db.Table(
+    "archived_comments",
+    *_columns(Comment),
+    sa.Index("ix_archived_comments_event_id", "event_id"),
+    bind_key="archive",
+)
+
+# (hot table, archive table, column linking rows to their event)
+_COPIES = (
+    (Event.__table__, events, "id"),
+    (TicketType.__table__, ticket_types, "event_id"),
+    (Booking.__table__, bookings, "event_id"),
+    (Comment.__table__, comments, "event_id"),
+)
+
+
+def read(stmt):
+    """Execute a SELECT against the archive bind through ``db.session``."""
+    # Flask-SQLAlchemy only routes ORM entities and DML by bind key, not
+    # plain SELECTs over Table objects, so name the engine explicitly.
+    return db.session.execute(stmt, bind_arguments={"bind": db.engines["archive"]})
+
+
+def archive_batch(cutoff: datetime, batch_size: int) -> int:
+    """Archive up to ``batch_size`` finished events that started before ``cutoff``."""
+    event_ids = db.session.scalars(
+        db.select(Event.id)
+        .where(Event.status.in_(ARCHIVABLE_STATUSES), Event.start_dt < cutoff)
+        .order_by(Event.start_dt.asc())
+        .limit(batch_size)
+    ).all()
+    if not event_ids:
+        return 0
+
+    archived_at = datetime.utcnow()
+    copies = []
+    for source, target, key in _COPIES:
+        rows = [
+            dict(row)
+            for row in db.session.execute(
+                db.select(source).where(source.c[key].in_(event_ids))
+            ).mappings()
+        ]
+        if target is events:
+            for row in rows:
+                row["archived_at"] = archived_at
+        copies.append((target, key, rows))
+
+    # Copy first, delete second: a crash in between leaves the events hot, and
+    # the delete-then-insert makes the next run overwrite the partial copy.
+    with db.engines["archive"].begin() as connection:
+        for target, key, rows in copies:
+            connection.execute(target.delete().where(target.c[key].in_(event_ids)))
+            if rows:
+                connection.execute(target.insert(), rows)
+
+    db.session.execute(db.delete(Event).where(Event.id.in_(event_ids)))
+    db.session.commit()
+    return len(event_ids)
+
+
+def archive_events(older_than_days: int, batch_size: int) -> int:
+    """Archive every eligible event, one short transaction per batch."""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        archived = archive_batch(cutoff, batch_size)
+        total += archived
+        if archived < batch_size:
+            return total
+
+
+def forget_user(user_id: int) -> None:
+    """Drop a deleted account's archived events, bookings and comments."""
+    owned = sa.select(events.c.id).where(events.c.owner_id == user_id).scalar_subquery()
+    with db.engines["archive"].begin() as connection:
+        for table in (ticket_types, bookings, comments):
+            connection.execute(table.delete().where(table.c.event_id.in_(owned)))
+        connection.execute(events.delete().where(events.c.owner_id == user_id))
+        connection.execute(bookings.delete().where(bookings.c.user_id == user_id))
+        connection.execute(comments.delete().where(comments.c.user_id == user_id))
+
+
+def _table_sizes(engine) -> dict[str, int]:
+    """Bytes per table, for the backends that can report it."""
+    if engine.dialect.name == "sqlite":
+        try:
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    sa.text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")
+                ).all()
+            return dict(rows)
+        except sa.exc.OperationalError:
+            return {}  # SQLite built without the dbstat virtual table
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            rows = connection.execute(
+                sa.text(
+                    "SELECT relname, pg_total_relation_size(relid) FROM pg_catalog.pg_statio_user_tables"
+                )
+            ).all()
+        return dict(rows)
+    return {}
+
+
+def init_app(app) -> None:
+    @app.cli.command("archive-events")
+    @click.option("--days", type=int, default=None, help="Archive events older than this.")
+    @click.option("--batch-size", type=int, default=None)
+    def archive_events_command(days, batch_size):
+        """Move finished events and their bookings into the archive tables."""
+        db.create_all(bind_key="archive")
+        archived = archive_events(
+            app.config["ARCHIVE_AFTER_DAYS"] if days is None else days,
+            batch_size or app.config["ARCHIVE_BATCH_SIZE"],
+        )
+        click.echo(f"Archived {archived} event(s).")
+
+    @app.cli.command("db-maintenance")
+    @click.option("--vacuum/--no-vacuum", default=True, help="Reclaim space after archiving.")
+    def db_maintenance_command(vacuum):
+        """Run ANALYZE (and VACUUM) on every bind and report table sizes."""
+        replicas = set(app.config["READ_REPLICAS"])
+        for key, engine in db.engines.items():
+            if key in replicas:
+                continue  # replicas are maintained by whatever copies to them
+            label = key or "primary"
+            # VACUUM refuses to run inside a transaction.
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(sa.text("ANALYZE"))
+                if vacuum:
+                    connection.execute(sa.text("VACUUM"))
+
+            sizes = _table_sizes(engine)
+            click.echo(f"[{label}] {engine.url.render_as_string(hide_password=True)}")
+            inspector = sa.inspect(engine)
+            with engine.connect() as connection:
+                for table in sorted(inspector.get_table_names()):
+                    rows = connection.scalar(
+                        sa.select(sa.func.count()).select_from(sa.table(table))
+                    )
+                    size = sizes.get(table)
+                    size_text = f"{size / 1024:,.0f} KiB" if size is not None else "n/a"
+                    click.echo(f"  {table:<28} {rows:>10,} rows {size_text:>12}")
@@ -6,10 +6,12 @@ from flask_login import login_user, logout_user, login_required
 from .models import User
 from .forms import LoginForm, RegisterForm
 from . import db
+from .ratelimit import rate_limit
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit('10/minute')
 def login():
     form = LoginForm()
     error = None
@@ -40,6 +42,7 @@ def login():
     return render_template('user.html', form=form, heading='Login')
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@rate_limit('5/hour')
 def register():
     form = RegisterForm()
 
@@ -0,0 +1,279 @@
+"""
+Month/week calendar pages and subscribable iCalendar (.ics) feeds.
+
+Every read is a range scan on the indexed ``events.start_dt``. Feeds are
+streamed from a ``yield_per`` cursor and carry an ETag and Last-Modified
+derived from ``Event.updated_at``, so polling calendar clients usually get
+a 304 after a single aggregate query.
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    g,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import func
+from werkzeug.http import is_resource_modified
+
+from . import db, routing
+from .models import Booking, Event, EventStatus
+
+calendar_bp = Blueprint("calendars", __name__)
+
+# Feeds include recently finished events so clients don't drop them at once.
+FEED_LOOKBACK = timedelta(days=30)
+# Events have no end time; calendar clients get a typical show length.
+EVENT_DURATION = "PT2H"
+FEED_COLUMNS = (
+    Event.id,
+    Event.title,
+    Event.description,
+    Event.venue,
+    Event.city,
+    Event.start_dt,
+    Event.status,
+    Event.updated_at,
+)
+
+
+@calendar_bp.before_request
+def _prefer_replica():
+    # Calendar pages and feeds only read.
+    g.use_replica = not routing.wants_primary()
+
+
+# ---------------------------
+# Calendar pages
+# ---------------------------
+def _parse_day(raw: str | None) -> date:
+    if not raw:
+        return datetime.utcnow().date()
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        abort(400)
+
+
+def _events_between(start: date, end: date, category: str | None, city: str | None):
+    stmt = (
+        db.select(Event.id, Event.title, Event.start_dt, Event.city, Event.category, Event.status)
+        .where(
+            Event.start_dt >= datetime.combine(start, datetime.min.time()),
+            Event.start_dt < datetime.combine(end, datetime.min.time()),
+        )
+        .order_by(Event.start_dt.asc(), Event.id.asc())
+    )
+    if category:
+        stmt = stmt.where(Event.category == category)
+    if city:
+        stmt = stmt.where(Event.city == city)
+
+    by_day: dict[date, list] = {}
+    for row in db.session.execute(stmt):
+        by_day.setdefault(row.start_dt.date(), []).append(row)
+    return by_day
+
+
+@calendar_bp.route("/")
+def calendar_view():
+    view = request.args.get("view", "month")
+    if view not in ("month", "week"):
+        abort(400)
+    day = _parse_day(request.args.get("date"))
+    category = request.args.get("category") or None
+    city = request.args.get("city") or None
+
+    if view == "week":
+        start = day - timedelta(days=day.weekday())
+        weeks = [[start + timedelta(days=offset) for offset in range(7)]]
+        previous_day, next_day = start - timedelta(days=7), start + timedelta(days=7)
+        title = f"Week of {start.strftime('%d %B %Y')}"
+    else:
+        weeks = calendar.Calendar().monthdatescalendar(day.year, day.month)
+        first = day.replace(day=1)
+        previous_day = (first - timedelta(days=1)).replace(day=1)
+        next_day = (first + timedelta(days=31)).replace(day=1)
+        title = first.strftime("%B %Y")
+
+    events_by_day = _events_between(
+        weeks[0][0], weeks[-1][-1] + timedelta(days=1), category, city
+    )
+    feed_url = None
+    if category:
+        feed_url = url_for("calendars.category_feed", category=category, _external=True)
+    elif city:
+        feed_url = url_for("calendars.city_feed", city=city, _external=True)
+
+    return render_template(
+        "calendar.html",
+        view=view,
+        day=day,
+        weeks=weeks,
+        month=day.month,
+        today=datetime.utcnow().date(),
+        title=title,
+        events_by_day=events_by_day,
+        previous_day=previous_day,
+        next_day=next_day,
+        category=category,
+        city=city,
+        feed_url=feed_url,
+    )
+
+
+# ---------------------------
+# iCalendar feeds
+# ---------------------------
+def _escape(text: str) -> str:
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Split content lines longer than 75 octets, as RFC 5545 requires."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74  # continuation lines start with a space
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # never split a UTF-8 sequence
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(value: datetime | None) -> str:
+    return (value or datetime.utcnow()).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _vevent(row, host: str) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{row.id}@{host}",
+        f"DTSTAMP:{_stamp(row.updated_at)}",
+        f"LAST-MODIFIED:{_stamp(row.updated_at)}",
+        f"DTSTART:{_stamp(row.start_dt)}",
+        f"DURATION:{EVENT_DURATION}",
+        f"SUMMARY:{_escape(row.title)}",
+        f"LOCATION:{_escape(f'{row.venue}, {row.city}')}",
+        f"DESCRIPTION:{_escape(row.description)}",
+        f"URL:{url_for('main.event_details', event_id=row.id, _external=True)}",
+        "STATUS:" + ("CANCELLED" if row.status == EventStatus.CANCELLED else "CONFIRMED"),
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _feed_body(stmt, name: str):
+    host = request.host.split(":")[0]
+    yield "".join(
+        _fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//Bollywood Beats//Event Calendar//EN",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{_escape(name)}",
+        )
+    )
+    batch = current_app.config["STREAM_YIELD_PER"]
+    for row in db.session.execute(stmt.execution_options(yield_per=batch)):
+        yield _vevent(row, host)
+    yield "END:VCALENDAR\r\n"
+
+
+def _feed_response(condition, name: str, *, private: bool = False, extra_validator=None):
+    """Stream the events matching ``condition``, or 304 if the client is current."""
+    since = datetime.utcnow() - FEED_LOOKBACK
+    summary = db.session.execute(
+        db.select(func.count(Event.id), func.max(Event.updated_at)).where(
+            condition, Event.start_dt >= since
+        )
+    ).one()
+    last_modified = summary[1] or datetime(2000, 1, 1)
+    # Count catches deletions and archiving, which leave no updated_at behind.
+    etag = f"{summary[0]}-{last_modified.timestamp() * 1_000_000:.0f}"
+    if extra_validator:
+        etag += f"-{extra_validator}"
+
+    response = Response(mimetype="text/calendar")
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.max_age = current_app.config["CALENDAR_FEED_MAX_AGE"]
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    # Decided before the body exists: make_conditional() would buffer the
+    # generator to compute a Content-Length instead of streaming it.
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    stmt = (
+        db.select(*FEED_COLUMNS)
+        .where(condition, Event.start_dt >= since)
+        .order_by(Event.start_dt.asc(), Event.id.asc())
+    )
+    response.response = stream_with_context(_feed_body(stmt, name))
+    return response
+
+
+@calendar_bp.get("/category/<category>.ics")
+def category_feed(category: str):
+    return _feed_response(Event.category == category, f"Bollywood Beats: {category}")
+
+
+@calendar_bp.get("/city/<city>.ics")
+def city_feed(city: str):
+    return _feed_response(Event.city == city, f"Bollywood Beats: {city}")
+
+
+def _feed_serializer() -> URLSafeSerializer:
+    return URLSafeSerializer(current_app.secret_key, salt="calendar-feed")
+
+
+def user_feed_url(user_id: int) -> str:
+    """Unguessable, login-free URL for one user's bookings feed."""
+    token = _feed_serializer().dumps(user_id)
+    return url_for("calendars.user_feed", token=token, _external=True)
+
+
+@calendar_bp.get("/bookings/<token>.ics")
+def user_feed(token: str):
+    try:
+        user_id = _feed_serializer().loads(token)
+    except BadSignature:
+        abort(404)
+
+    booked = db.select(Booking.event_id).where(Booking.user_id == user_id)
+    # New bookings don't touch Event.updated_at, so they get their own validator.
+    bookings_seen = db.session.execute(
+        db.select(func.count(Booking.id), func.max(Booking.id)).where(Booking.user_id == user_id)
+    ).one()
+    return _feed_response(
+        Event.id.in_(booked),
+        "My Bollywood Beats bookings",
+        private=True,
+        extra_validator=f"{bookings_seen[0]}.{bookings_seen[1] or 0}",
+    )
@@ -0,0 +1,214 @@
+"""
+Catalogue change version shared by every worker.
+
+Any committed write to events, ticket tiers or bookings, whether through a
+flush or a bulk ``db.session.execute`` DML statement, bumps a catalogue row
+in ``change_counters`` in the same transaction. So does deleting a user or a
+series, which the database cascades to their events. Caches of derived
+catalogue data (facet counts, read models) key on ``catalogue_version()``
+and so stay correct across processes without any messaging.
+
+The counter is split over ``CATALOGUE_SHARDS`` rows, and each transaction
+bumps a random one. Concurrent booking commits during an on-sale then
+rarely wait on the same row lock. The version is the sum of the shards,
+which only ever grows.
+
+The same transaction also logs which events it touched in
+``catalogue_changes``, so a cache can reload just those events
+(``changes_after``) instead of rescanning the catalogue. Bulk updates and
+deletes look their events up first; when that isn't possible, such as a
+bulk insert of events, the row's event is NULL and readers rescan. Rows
+older than ``CATALOGUE_LOG_RETENTION`` are pruned by the writers.
+
+A second counter, ``identities``, moves whenever a user row is updated or
+deleted. Each worker's login cache (see identity.py) checks it, so an
+account change made on one worker reaches the others.
+"""
+import random
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+
+from . import db
+from .holds import SweepClock
+from .models import (
+    Booking, CatalogueChange, ChangeCounter, Event, EventSeries, TicketType, User,
+)
+from .routing import RoutingSession
+
+CATALOGUE = "catalogue"
+CATALOGUE_SHARDS = 16
+# The first shard keeps the original row's name, so existing counts carry on.
+_SHARD_NAMES = (CATALOGUE, *(f"{CATALOGUE}:{n}" for n in range(1, CATALOGUE_SHARDS)))
+TRACKED_MODELS = (Event, TicketType, Booking)
+_TRACKED_TABLES = frozenset(model.__table__ for model in TRACKED_MODELS)
+# Deleting one of these changes events through ON DELETE foreign keys.
+CASCADING_MODELS = (User, EventSeries)
+_CASCADING_TABLES = frozenset(model.__table__ for model in CASCADING_MODELS)
+_PENDING = "catalogue_changed"
+IDENTITIES = "identities"
+_IDENTITIES_PENDING = "identities_changed"
+
+
+def _increment(session, name: str) -> int:
+    # A DML statement, so RoutingSession always sends it to the primary.
+    return session.execute(
+        sa.update(ChangeCounter)
+        .where(ChangeCounter.name == name)
+        .values(version=ChangeCounter.version + 1)
+    ).rowcount
+
+
+def _bump(session) -> None:
+    if not _increment(session, random.choice(_SHARD_NAMES)):
+        # Databases from before sharding only have the first row until
+        # `flask init-db` adds the rest.
+        _increment(session, CATALOGUE)
+
+
+def catalogue_version() -> int:
+    return db.session.scalar(
+        db.select(sa.func.sum(ChangeCounter.version)).where(ChangeCounter.name.in_(_SHARD_NAMES))
+    ) or 0
+
+
+def identities_version() -> int:
+    return db.session.scalar(
+        db.select(ChangeCounter.version).where(ChangeCounter.name == IDENTITIES)
+    ) or 0
+
+
+def _bump_identities(session) -> None:
+    if not _increment(session, IDENTITIES):
+        # A database from before this counter; the row starts here.
+        session.execute(sa.insert(ChangeCounter).values(name=IDENTITIES, version=1))
+
+
+def ensure_counters() -> None:
+    """Create any missing counter rows, e.g. on a fresh database."""
+    names = (*_SHARD_NAMES, IDENTITIES)
+    existing = set(
+        db.session.scalars(db.select(ChangeCounter.name).where(ChangeCounter.name.in_(names)))
+    )
+    missing = [name for name in names if name not in existing]
+    if missing:
+        db.session.add_all(ChangeCounter(name=name, version=0) for name in missing)
+        db.session.commit()
+
+
+def changes_after(position: int, also=()) -> list:
+    """(id, event_id) log rows past ``position`` or with an id in ``also``, by id."""
+    return db.session.execute(
+        db.select(CatalogueChange.id, CatalogueChange.event_id)
+        .where(sa.or_(CatalogueChange.id > position, CatalogueChange.id.in_(also)))
+        .order_by(CatalogueChange.id.asc())
+    ).all()
+
+
+def log_position() -> int:
+    """The newest log row's id; later changes are ``changes_after`` it."""
+    return db.session.scalar(db.select(sa.func.max(CatalogueChange.id))) or 0
+
+
+def _record(session, event_ids: set) -> None:
+    """Bump the version and log ``event_ids`` (None for unknown events)."""
+    _bump(session)
+    session.execute(
+        sa.insert(CatalogueChange), [{"event_id": event_id} for event_id in event_ids]
+    )
+    clock = current_app.extensions.get("catalogue_log_clock") if has_app_context() else None
+    if clock is not None and clock.due():
+        retention = timedelta(seconds=current_app.config["CATALOGUE_LOG_RETENTION"])
+        session.execute(
+            sa.delete(CatalogueChange).where(
+                CatalogueChange.changed_at < datetime.utcnow() - retention
+            )
+        )
+
+
+def _event_of(obj):
+    if isinstance(obj, Event):
+        return obj.id
+    if isinstance(obj, TRACKED_MODELS):
+        return obj.event_id
+    # A deleted user or series: its events went with it in SQL, unseen.
+    return None
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _flushed(session, flush_context) -> None:
+    # new/dirty/deleted still describe what was just flushed at this point.
+    event_ids = {
+        _event_of(obj)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, TRACKED_MODELS)
+        or (isinstance(obj, CASCADING_MODELS) and obj in session.deleted)
+    }
+    if event_ids:
+        _record(session, event_ids)
+    if any(isinstance(obj, User) for obj in (*session.dirty, *session.deleted)):
+        _bump_identities(session)
+
+
+def _affected_events(orm_execute_state, table) -> set:
+    """The events a bulk statement is about to write to, or {None} if unknown."""
+    params = orm_execute_state.parameters
+    if orm_execute_state.is_insert:
+        rows = params if isinstance(params, list) else [params or {}]
+        if table.name != Event.__tablename__ and all(row.get("event_id") for row in rows):
+            return {row["event_id"] for row in rows}
+        return {None}
+
+    where = orm_execute_state.statement.whereclause
+    if where is None or isinstance(params, list):
+        return {None}
+    if table.name == Event.__tablename__:
+        lookup = db.select(Event.id).where(where)
+    elif table.name == User.__tablename__:
+        lookup = db.select(Event.id).where(Event.owner_id.in_(db.select(User.id).where(where)))
+    elif table.name == EventSeries.__tablename__:
+        lookup = db.select(Event.id).where(
+            Event.series_id.in_(db.select(EventSeries.id).where(where))
+        )
+    else:
+        lookup = db.select(table.c.event_id).where(where)
+    session = orm_execute_state.session
+    # Read where the write goes, inside its transaction, never from a replica.
+    bind = session.get_bind(clause=orm_execute_state.statement)
+    return set(session.scalars(lookup, bind_arguments={"bind": bind}))
+
+
+@sa.event.listens_for(RoutingSession, "do_orm_execute")
+def _bulk_statement(orm_execute_state) -> None:
+    if not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table in _TRACKED_TABLES or (
+        orm_execute_state.is_delete and table in _CASCADING_TABLES
+    ):
+        pending = orm_execute_state.session.info.setdefault(_PENDING, set())
+        pending |= _affected_events(orm_execute_state, table)
+    if not orm_execute_state.is_insert and table is not None and table.name == User.__tablename__:
+        orm_execute_state.session.info[_IDENTITIES_PENDING] = True
+
+
+@sa.event.listens_for(RoutingSession, "before_commit")
+def _before_commit(session) -> None:
+    event_ids = session.info.pop(_PENDING, None)
+    if event_ids:
+        _record(session, event_ids)
+    if session.info.pop(_IDENTITIES_PENDING, False):
+        _bump_identities(session)
+
+
+@sa.event.listens_for(RoutingSession, "after_rollback")
+def _after_rollback(session) -> None:
+    session.info.pop(_PENDING, None)
+    session.info.pop(_IDENTITIES_PENDING, None)
+
+
+def init_app(app) -> None:
+    app.extensions["catalogue_log_clock"] = SweepClock(app.config["CATALOGUE_LOG_SWEEP_INTERVAL"])
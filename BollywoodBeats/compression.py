@@ -0,0 +1,158 @@
+"""
+Response compression negotiated from ``Accept-Encoding`` (brotli, then gzip).
+
+Small bodies, event streams and formats that are already compressed (images,
+archives) pass through untouched; chunked HTML is compressed incrementally.
+Responses that carry an ETag or public Cache-Control are compressed once and
+served from a small LRU after that, keyed by their content.
+"""
+
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+try:  # brotli is optional; gzip is always available.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding: str, level: int):
+    """
+    Compress an iterable of chunks, sync-flushing after each one so the
+    browser can start parsing the page before the last chunk is rendered.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield process(chunk) + flush()
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+class CompressedCache:
+    """Tiny thread-safe LRU of compressed bodies."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _negotiate(accept_encoding) -> str | None:
+    if brotli is not None and accept_encoding["br"]:
+        return "br"
+    if accept_encoding["gzip"]:
+        return "gzip"
+    return None
+
+
+def _cacheable(response) -> bool:
+    return bool(response.get_etag()[0]) or bool(response.cache_control.public)
+
+
+def init_app(app) -> None:
+    cache = CompressedCache(app.config["COMPRESS_CACHE_ENTRIES"])
+    app.extensions["compression_cache"] = cache
+
+    @app.after_request
+    def compress_response(response):
+        config = app.config
+        if not config["COMPRESS_ENABLED"]:
+            return response
+        # Whatever happens below, caches must key on the client's encoding.
+        response.vary.add("Accept-Encoding")
+        if (
+            response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        if response.is_streamed and (
+            not config["COMPRESS_STREAMS"] or response.mimetype == "text/event-stream"
+        ):
+            return response
+
+        encoding = _negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        level = config["COMPRESS_BR_LEVEL" if encoding == "br" else "COMPRESS_GZIP_LEVEL"]
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers["Content-Encoding"] = encoding
+            response.headers.pop("Content-Length", None)
+            return response
+
+        body = response.get_data()
+        if len(body) < config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        compressed = None
+        key = None
+        if _cacheable(response):
+            key = (hashlib.blake2b(body, digest_size=16).digest(), encoding, level)
+            compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding, level)
+            if key is not None:
+                cache.put(key, compressed)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The bytes changed, so the validator may only stay as a weak one;
+            # If-None-Match uses weak comparison, so revalidation still works.
+            response.set_etag(etag, weak=True)
+        return response
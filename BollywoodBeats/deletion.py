@@ -0,0 +1,123 @@
+"""
+Set-based deletion of events and accounts.
+
+Child rows go through the database's ``ON DELETE CASCADE`` foreign keys,
+so one DELETE removes an event with all its bookings, comments and tiers.
+The archive has no foreign keys, so archived rows are removed explicitly.
+Accounts with more than ``ACCOUNT_DELETE_INLINE_LIMIT`` dependent rows are
+scrubbed and disabled straight away. Their rows are then purged in
+``ACCOUNT_DELETE_CHUNK_SIZE`` batches on a background thread, so no single
+transaction holds the write lock for long. ``flask purge-accounts``
+finishes any purge that a restart interrupted.
+"""
+
+import logging
+import threading
+from datetime import datetime
+
+import click
+from flask import current_app
+
+from . import archive, db
+from .models import Booking, Comment, Event, TicketType, User
+
+log = logging.getLogger(__name__)
+
+
+def delete_event(event_id: int) -> None:
+    """Delete one event; its bookings, comments and tiers cascade in SQL."""
+    db.session.execute(db.delete(Event).where(Event.id == event_id))
+    db.session.commit()
+
+
+def _purge_plan(user_id: int):
+    """(model, condition) pairs in child-first order for one account."""
+    owned = db.select(Event.id).where(Event.owner_id == user_id).scalar_subquery()
+    return (
+        (Booking, Booking.event_id.in_(owned)),
+        (Comment, Comment.event_id.in_(owned)),
+        (TicketType, TicketType.event_id.in_(owned)),
+        (Event, Event.owner_id == user_id),
+        (Booking, Booking.user_id == user_id),
+        (Comment, Comment.user_id == user_id),
+    )
+
+
+def account_footprint(user_id: int) -> int:
+    """Rows that deleting the account would remove, excluding the user row."""
+    return sum(
+        db.session.scalar(db.select(db.func.count()).select_from(model).where(condition))
+        for model, condition in _purge_plan(user_id)
+    )
+
+
+def purge_account(user_id: int, chunk_size: int) -> int:
+    """Delete an account's rows ``chunk_size`` at a time, committing per chunk."""
+    removed = 0
+    for model, condition in _purge_plan(user_id):
+        while True:
+            batch = db.select(model.id).where(condition).limit(chunk_size).scalar_subquery()
+            result = db.session.execute(db.delete(model).where(model.id.in_(batch)))
+            db.session.commit()
+            removed += result.rowcount
+            if result.rowcount < chunk_size:
+                break
+    db.session.execute(db.delete(User).where(User.id == user_id))
+    db.session.commit()
+    archive.forget_user(user_id)
+    return removed
+
+
+def _purge_in_background(app, user_id: int) -> None:
+    with app.app_context():
+        try:
+            removed = purge_account(user_id, app.config["ACCOUNT_DELETE_CHUNK_SIZE"])
+            log.info("Purged account %s (%d rows).", user_id, removed)
+        except Exception:
+            # The account stays scrubbed; `flask purge-accounts` retries it.
+            log.exception("Background purge of account %s failed.", user_id)
+            db.session.rollback()
+
+
+def delete_account(user: User) -> bool:
+    """
+    Delete ``user`` and everything it owns.
+
+    Returns True when the work was handed to a background purge.
+    """
+    config = current_app.config
+    if account_footprint(user.id) <= config["ACCOUNT_DELETE_INLINE_LIMIT"]:
+        db.session.execute(db.delete(User).where(User.id == user.id))
+        db.session.commit()
+        archive.forget_user(user.id)
+        return False
+
+    # Free the username and email and make the account unusable right away.
+    user.deleted_at = datetime.utcnow()
+    user.username = f"deleted-{user.id}"
+    user.email = f"deleted-{user.id}@invalid"
+    user.password_hash = "!"
+    db.session.commit()
+
+    threading.Thread(
+        target=_purge_in_background,
+        args=(current_app._get_current_object(), user.id),
+        name=f"purge-account-{user.id}",
+        daemon=True,
+    ).start()
+    return True
+
+
+def init_app(app) -> None:
+    @app.cli.command("purge-accounts")
+    def purge_accounts_command():
+        """Finish purging accounts that were scrubbed for deletion."""
+        chunk_size = app.config["ACCOUNT_DELETE_CHUNK_SIZE"]
+        user_ids = db.session.scalars(
+            db.select(User.id).where(User.deleted_at.isnot(None))
+        ).all()
+        for user_id in user_ids:
+            removed = purge_account(user_id, chunk_size)
+            click.echo(f"Purged account {user_id} ({removed} rows).")
+        if not user_ids:
+            click.echo("No accounts awaiting purge.")
@@ -0,0 +1,235 @@
+"""
+Faceted filtering for the catalogue on the home page.
+
+Facets are category, city, status, price band and date window. A facet's
+counts honour every other facet's selection but not its own, so users can
+widen a choice as well as narrow it. All five come from one grouped query
+over the facet columns; the per-facet sums are done in Python. Results are
+cached per (catalogue version, search, selection) for
+``FACET_CACHE_TTL`` seconds. The TTL matters because the date windows move
+with the clock.
+"""
+
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import sqlalchemy as sa
+from flask import current_app
+
+from . import db
+from .aggregates import tiers_subquery
+from .changes import catalogue_version
+from .models import Event, EventStatus
+
+# (value, label, lower bound, upper bound); prices compare against the cheapest tier.
+PRICE_BANDS = (
+    ("under-30", "Under $30", None, 30),
+    ("30-60", "$30 - $60", 30, 60),
+    ("60-100", "$60 - $100", 60, 100),
+    ("100-plus", "$100 and up", 100, None),
+)
+# (value, label, days from now to the window's start and end)
+DATE_WINDOWS = (
+    ("past", "Past events", None, 0),
+    ("week", "Next 7 days", 0, 7),
+    ("month", "8 - 30 days", 7, 30),
+    ("later", "Later", 30, None),
+)
+# Stored statuses that read as INACTIVE once the event has started, as in
+# ``Event.refresh_status``; the status sweep may not have run yet.
+CLOSE_WHEN_STARTED = (EventStatus.OPEN, EventStatus.SOLD_OUT)
+FACETS = ("category", "city", "status", "price", "when")
+FACET_LABELS = {
+    "category": "Category",
+    "city": "City",
+    "status": "Status",
+    "price": "Price",
+    "when": "Date",
+}
+_FIXED_LABELS = {
+    "status": {status.name: status.value for status in EventStatus},
+    "price": {value: label for value, label, _, _ in PRICE_BANDS},
+    "when": {value: label for value, label, _, _ in DATE_WINDOWS},
+}
+
+
+class FacetValue(NamedTuple):
+    value: str
+    label: str
+    count: int
+    selected: bool
+
+
+def parse_filters(args) -> dict[str, tuple[str, ...]]:
+    """Selected values per facet from the query string ("All" means none)."""
+    filters = {}
+    for facet in FACETS:
+        values = sorted({v for v in args.getlist(facet) if v and v != "All"})
+        if facet in _FIXED_LABELS:
+            values = [v for v in values if v in _FIXED_LABELS[facet]]
+        filters[facet] = tuple(values)
+    return filters
+
+
+def _banded(expression, bands, value_of):
+    whens = []
+    for value, _, lower, upper in bands:
+        conditions = []
+        if lower is not None:
+            conditions.append(expression >= value_of(lower))
+        if upper is not None:
+            conditions.append(expression < value_of(upper))
+        whens.append((sa.and_(*conditions), value))
+    return sa.case(*whens)
+
+
+def _expressions(tiers, now: datetime) -> dict:
+    price = sa.func.coalesce(tiers.c.tier_price, Event.price)
+    return {
+        "category": Event.category,
+        "city": Event.city,
+        # Enum columns store the member name, which is also the facet value.
+        "status": sa.case(
+            (
+                sa.and_(Event.status.in_(CLOSE_WHEN_STARTED), Event.start_dt < now),
+                EventStatus.INACTIVE.name,
+            ),
+            else_=sa.type_coerce(Event.status, sa.String),
+        ),
+        "price": _banded(price, PRICE_BANDS, lambda bound: bound),
+        "when": _banded(
+            Event.start_dt, DATE_WINDOWS, lambda days: now + timedelta(days=days)
+        ),
+    }
+
+
+def search_condition(search_term: str):
+    """What the home page search box matches: the title or the venue."""
+    pattern = f"%{search_term}%"
+    return sa.or_(Event.title.ilike(pattern), Event.venue.ilike(pattern))
+
+
+def apply_filters(stmt, filters: dict, now: datetime):
+    """Restrict an ``Event`` statement to the selected facet values."""
+    if not any(filters.values()):
+        return stmt
+    tiers = tiers_subquery()
+    expressions = _expressions(tiers, now)
+    if filters.get("price"):
+        stmt = stmt.outerjoin(tiers, tiers.c.event_id == Event.id)
+    for facet, values in filters.items():
+        if values:
+            stmt = stmt.where(expressions[facet].in_(values))
+    return stmt
+
+
+class _FacetCache:
+    """Small thread-safe LRU with a TTL per entry."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _cache() -> _FacetCache:
+    return current_app.extensions["facet_cache"]
+
+
+def _grouped_counts(search_term: str, now: datetime) -> list[tuple]:
+    """One row per distinct facet combination with its event count."""
+    tiers = tiers_subquery()
+    expressions = _expressions(tiers, now)
+    columns = [expressions[facet].label(facet) for facet in FACETS]
+    stmt = (
+        db.select(*columns, sa.func.count().label("events"))
+        .outerjoin(tiers, tiers.c.event_id == Event.id)
+        .group_by(*columns)
+    )
+    if search_term:
+        stmt = stmt.where(search_condition(search_term))
+    return [tuple(row) for row in db.session.execute(stmt)]
+
+
+def _summarise(rows: list[tuple], filters: dict) -> tuple[dict, int]:
+    counts = {facet: Counter() for facet in FACETS}
+    total = 0
+    for row in rows:
+        values, events = row[:-1], row[-1]
+        misses = [
+            facet
+            for facet, value in zip(FACETS, values)
+            if filters[facet] and value not in filters[facet]
+        ]
+        if not misses:
+            total += events
+        for facet, value in zip(FACETS, values):
+            # Counted under a facet if only that facet's own selection excludes it.
+            if value is not None and (not misses or misses == [facet]):
+                counts[facet][value] += events
+    return counts, total
+
+
+def _ordered(facet: str, counts: Counter, selected: tuple) -> list[FacetValue]:
+    if facet in _FIXED_LABELS:
+        labels = _FIXED_LABELS[facet]
+        values = list(labels)
+    else:
+        labels = {}
+        values = sorted(counts, key=str.casefold)
+    values += [v for v in selected if v not in values]  # keep stale selections visible
+    return [
+        FacetValue(value, labels.get(value, value), counts.get(value, 0), value in selected)
+        for value in values
+        if counts.get(value) or value in selected
+    ]
+
+
+def facet_counts(
+    filters: dict, search_term: str, version: int | None = None
+) -> tuple[dict[str, list[FacetValue]], int]:
+    """
+    Facet values with counts for this selection, plus the matching total.
+
+    Callers that already know the catalogue version pass it to save a query.
+    """
+    if version is None:
+        version = catalogue_version()
+    key = (version, search_term.casefold(), tuple(filters[f] for f in FACETS))
+    cached = _cache().get(key)
+    if cached is not None:
+        return cached
+
+    counts, total = _summarise(_grouped_counts(search_term, datetime.utcnow()), filters)
+    result = (
+        {facet: _ordered(facet, counts[facet], filters[facet]) for facet in FACETS},
+        total,
+    )
+    _cache().put(key, result)
+    return result
+
+
+def init_app(app) -> None:
+    app.extensions["facet_cache"] = _FacetCache(
+        app.config["FACET_CACHE_ENTRIES"], app.config["FACET_CACHE_TTL"]
+    )
@@ -1,6 +1,7 @@
 """WTForms definitions for accounts, events, bookings, and comments."""
 
 from datetime import datetime
+from uuid import uuid4
 from flask_wtf import FlaskForm
 from wtforms.fields import (
     TextAreaField,
@@ -11,6 +12,7 @@ from wtforms.fields import (
     IntegerField,
     DecimalField,
     SelectField,
+    HiddenField,
 )
 from wtforms.validators import (
     InputRequired,
@@ -119,6 +121,10 @@ EVENT_CATEGORY_CHOICES = [
     ("Jazz", "Jazz"),
     ("Hip-Hop", "Hip-Hop"),
     ("Bollywood", "Bollywood"),
+    ("Sufi", "Sufi"),
+    ("Folk", "Folk"),
+    ("Fusion", "Fusion"),
+    ("Comedy", "Comedy"),
     ("Pop", "Pop"),
     ("Other", "Other"),
 ]
@@ -144,6 +150,10 @@ class TicketTierForm(Form):
         return bool((self.name.data or "").strip())
 
 
+def _new_idempotency_key() -> str:
+    return uuid4().hex
+
+
 class EventForm(FlaskForm):
     title = StringField(
         "Event Title",
@@ -196,6 +206,8 @@ class EventForm(FlaskForm):
     )
     ticket_types = FieldList(FormField(TicketTierForm), min_entries=3, max_entries=5)
     submit = SubmitField("Create Event")
+    # Resubmitting the same rendered form replays the first result (see idempotency.py).
+    idempotency_key = HiddenField(default=_new_idempotency_key)
 
     def validate_start_dt(self, field):
         if field.data is None:
@@ -271,6 +283,38 @@ class CancelEventForm(FlaskForm):
     submit = SubmitField("Cancel Event")
 
 
+SERIES_REPEAT_CHOICES = [
+    ("weekly", "Every week"),
+    ("fortnightly", "Every two weeks"),
+    ("daily", "Every day"),
+    ("monthly", "Every month"),
+    ("dates", "On the dates listed below"),
+]
+
+
+class EventSeriesForm(EventForm):
+    """A tour or recurring event; ``start_dt`` is the first date."""
+
+    repeat = SelectField("Repeats", choices=SERIES_REPEAT_CHOICES, default="weekly")
+    occurrences = IntegerField(
+        "Number of Dates",
+        default=4,
+        validators=[Optional(), NumberRange(min=2, message="A series needs at least two dates")],
+    )
+    dates = TextAreaField("Other Dates", validators=[Optional()])
+    submit = SubmitField("Create Series")
+
+
+class EventSeriesUpdateForm(EventUpdateForm):
+    # Each date keeps its own start time; those are edited one event at a time.
+    start_dt = None
+    submit = SubmitField("Update Upcoming Dates")
+
+
+class CancelSeriesForm(FlaskForm):
+    submit = SubmitField("Cancel Upcoming Dates")
+
+
 class BookingForm(FlaskForm):
     qty = IntegerField(
         "Number of Tickets",
@@ -279,7 +323,14 @@ class BookingForm(FlaskForm):
             NumberRange(min=1, message="You must book at least one ticket"),
         ],
     )
-    submit = SubmitField("Confirm Booking")
+    submit = SubmitField("Hold Tickets")
+    idempotency_key = HiddenField(default=_new_idempotency_key)
+
+
+class CheckoutForm(FlaskForm):
+    confirm = SubmitField("Confirm Booking")
+    release = SubmitField("Release Tickets")
+    idempotency_key = HiddenField(default=_new_idempotency_key)
 
 
 class CommentForm(FlaskForm):
@@ -0,0 +1,183 @@
+"""
+Time-limited ticket holds taken during checkout.
+
+Booking takes two steps. ``create_hold`` sets seats aside for
+``HOLD_SECONDS``, and ``confirm_hold`` turns the hold into a ``Booking`` in
+one transaction. Unexpired holds count against capacity wherever capacity
+is checked, so an expired hold frees its seats the moment it expires.
+
+The sweeper only deletes expired rows and re-syncs the affected events'
+statuses, so an event that sold out on holds reopens. It reads
+``ix_ticket_holds_expires_at`` oldest first, in ``HOLD_SWEEP_BATCH``
+batches. Each worker runs it from a request hook at most every
+``HOLD_SWEEP_INTERVAL`` seconds. ``flask expire-holds`` runs it on demand,
+for example from cron.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import click
+from flask import current_app, request
+
+from . import db, live
+from .models import Booking, Event, TicketHold
+
+
+def create_hold(event: Event, user_id: int, qty: int) -> TicketHold | None:
+    """
+    Hold ``qty`` seats of ``event`` for ``user_id``, replacing any hold they
+    already have on it. Returns None when not enough seats are free.
+    """
+    now = datetime.utcnow()
+    previous = [hold for hold in event.holds if hold.user_id == user_id]
+    # The user's own hold is about to be released, so its seats are available to them.
+    available = event.remaining_capacity + sum(
+        hold.qty for hold in previous if hold.expires_at > now
+    )
+    if qty > available:
+        return None
+
+    for hold in previous:
+        event.holds.remove(hold)
+    hold = TicketHold(
+        user_id=user_id,
+        qty=qty,
+        unit_price=event.price or Decimal("0"),
+        expires_at=now + timedelta(seconds=current_app.config["HOLD_SECONDS"]),
+    )
+    event.holds.append(hold)
+    event.refresh_status(now=now)
+    db.session.commit()
+    live.publish_event_snapshot(event.id)
+    return hold
+
+
+def active_hold(hold_id: int, user_id: int) -> TicketHold | None:
+    """``user_id``'s hold ``hold_id`` if it has not expired yet."""
+    return db.session.scalar(
+        db.select(TicketHold).where(
+            TicketHold.id == hold_id,
+            TicketHold.user_id == user_id,
+            TicketHold.expires_at > datetime.utcnow(),
+        )
+    )
+
+
+def confirm_hold(hold: TicketHold, order_id: str) -> Booking | None:
+    """
+    Turn ``hold`` into a booking in a single transaction.
+
+    Returns None when the hold expired or was released in the meantime.
+    """
+    now = datetime.utcnow()
+    event_id = hold.event_id
+    # Claiming the row with a guarded DELETE means a concurrent confirm or
+    # sweep can never turn the same hold into a second booking.
+    claimed = db.session.execute(
+        db.delete(TicketHold)
+        .where(TicketHold.id == hold.id, TicketHold.expires_at > now)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        db.session.rollback()
+        return None
+
+    booking = Booking(
+        order_id=order_id,
+        user_id=hold.user_id,
+        event_id=event_id,
+        qty=hold.qty,
+        unit_price=hold.unit_price,
+    )
+    db.session.add(booking)
+    db.session.expunge(hold)
+
+    event = db.session.get(Event, event_id)
+    db.session.flush()
+    db.session.expire(event, ["bookings", "holds"])
+    event.refresh_status(now=now)
+    db.session.commit()
+    live.publish_event_snapshot(event_id)
+    return booking
+
+
+def release_hold(hold: TicketHold) -> None:
+    """Give a hold's seats back before it expires."""
+    event_id = hold.event_id
+    db.session.delete(hold)
+    db.session.flush()
+    event = db.session.get(Event, event_id)
+    db.session.expire(event, ["holds"])
+    event.refresh_status()
+    db.session.commit()
+    live.publish_event_snapshot(event_id)
+
+
+def release_expired(batch_size: int, now: datetime | None = None) -> int:
+    """Delete expired holds in batches, re-syncing each affected event."""
+    now = now or datetime.utcnow()
+    released = 0
+    while True:
+        rows = db.session.execute(
+            db.select(TicketHold.id, TicketHold.event_id)
+            .where(TicketHold.expires_at <= now)
+            .order_by(TicketHold.expires_at.asc())
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return released
+
+        event_ids = {row.event_id for row in rows}
+        db.session.execute(
+            db.delete(TicketHold).where(TicketHold.id.in_([row.id for row in rows]))
+        )
+        for event in db.session.scalars(db.select(Event).where(Event.id.in_(event_ids))):
+            db.session.expire(event, ["holds"])
+            event.refresh_status(now=now)
+        db.session.commit()
+        for event_id in event_ids:
+            live.publish_event_snapshot(event_id)
+
+        released += len(rows)
+        if len(rows) < batch_size:
+            return released
+
+
+class SweepClock:
+    """Lets one request per interval (per worker) run the sweeper."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next_run = 0.0
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_run:
+                return False
+            self._next_run = now + self.interval
+            return True
+
+
+def init_app(app) -> None:
+    from . import SWEEP_EXEMPT_ENDPOINTS
+
+    clock = SweepClock(app.config["HOLD_SWEEP_INTERVAL"])
+    app.extensions["hold_sweep_clock"] = clock
+
+    @app.before_request
+    def expire_holds():
+        if request.endpoint in SWEEP_EXEMPT_ENDPOINTS or request.blueprint == "api":
+            return None
+        if clock.due():
+            release_expired(app.config["HOLD_SWEEP_BATCH"])
+
+    @app.cli.command("expire-holds")
+    def expire_holds_command():
+        """Delete expired ticket holds and reopen the events they blocked."""
+        released = release_expired(app.config["HOLD_SWEEP_BATCH"])
+        click.echo(f"Released {released} expired hold(s).")
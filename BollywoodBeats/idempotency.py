@@ -0,0 +1,219 @@
+"""
+Idempotency keys for form submissions that create bookings and events.
+
+Views marked ``@idempotent()`` read a key from the ``Idempotency-Key``
+header or from the form's hidden ``idempotency_key`` field. Before the view
+runs, the first request with a key claims a row in ``idempotency_keys``.
+The primary key makes that claim atomic, even when duplicates arrive at the
+same moment. The view's redirect and flash messages are then stored on the
+row for ``IDEMPOTENCY_KEY_TTL`` seconds.
+
+A duplicate, such as a double-click, a resubmit or a proxy retry, gets the
+same redirect and messages back without reaching the view or the booking
+tables. If it arrives while the first request is still running, it waits
+up to ``IDEMPOTENCY_WAIT_SECONDS`` for the outcome. Submissions that don't
+end in a redirect, such as a form re-rendered with errors, release their
+key so the corrected form can be sent again.
+"""
+
+import json
+import re
+import time
+from datetime import datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from flask import current_app, flash, g, redirect, request, session
+from flask_login import current_user
+from werkzeug.exceptions import BadRequest, Conflict
+
+from . import db
+from .holds import SweepClock
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+FORM_FIELD = "idempotency_key"
+KEY_PATTERN = re.compile(r"[A-Za-z0-9_.:-]{8,64}")
+# An in-flight claim this old belongs to a worker that died mid-request.
+ABANDONED_AFTER = timedelta(minutes=5)
+POLL_INTERVAL = 0.05
+PURGE_BATCH = 1000
+
+
+def idempotent(methods=("POST",)):
+    """Mark a view so duplicate submissions replay the first one's redirect."""
+
+    def decorator(view):
+        view.idempotent = frozenset(methods)
+        return view
+
+    return decorator
+
+
+def _request_key() -> str | None:
+    key = request.headers.get(HEADER) or request.form.get(FORM_FIELD)
+    if not key:
+        return None
+    if not KEY_PATTERN.fullmatch(key):
+        raise BadRequest(f"Malformed {HEADER}.")
+    return key
+
+
+def _where(identity: tuple):
+    user_id, endpoint, key = identity
+    return (
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.key == key,
+    )
+
+
+def _claim(identity: tuple, now: datetime) -> bool:
+    """Insert the in-flight row; False when another request already has it."""
+    user_id, endpoint, key = identity
+    ttl = timedelta(seconds=current_app.config["IDEMPOTENCY_KEY_TTL"])
+    try:
+        db.session.execute(
+            db.insert(IdempotencyKey).values(
+                user_id=user_id,
+                endpoint=endpoint,
+                key=key,
+                created_at=now,
+                expires_at=now + ttl,
+            )
+        )
+        db.session.commit()
+        return True
+    except sa.exc.IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _release(identity: tuple) -> None:
+    db.session.execute(db.delete(IdempotencyKey).where(*_where(identity)))
+    db.session.commit()
+
+
+def _stored(identity: tuple):
+    # A fresh transaction each time, so polling sees the first request's commit.
+    db.session.rollback()
+    return db.session.execute(
+        db.select(
+            IdempotencyKey.status_code,
+            IdempotencyKey.location,
+            IdempotencyKey.flashes,
+            IdempotencyKey.created_at,
+            IdempotencyKey.expires_at,
+        ).where(*_where(identity))
+    ).first()
+
+
+def _replay(row):
+    for category, message in json.loads(row.flashes or "[]"):
+        flash(message, category)
+    return redirect(row.location, code=row.status_code)
+
+
+def claim_or_replay():
+    """
+    Runs as a before_request hook ahead of rate limiting, so replayed
+    duplicates cost one primary-key lookup and don't use up the quota.
+    """
+    if request.endpoint is None:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    methods = getattr(view, "idempotent", None)
+    if methods is None or request.method not in methods or not current_user.is_authenticated:
+        return None
+    key = _request_key()
+    if key is None:
+        return None
+
+    identity = (int(current_user.get_id()), request.endpoint, key)
+    deadline = time.monotonic() + current_app.config["IDEMPOTENCY_WAIT_SECONDS"]
+    while True:
+        now = datetime.utcnow()
+        if _claim(identity, now):
+            g.idempotency_claim = (identity, len(session.get("_flashes", [])))
+            return None
+
+        # No row means the first request failed and released the key, so the
+        # next pass takes it over.
+        row = _stored(identity)
+        if row is not None and (
+            row.expires_at <= now
+            or (row.status_code is None and row.created_at < now - ABANDONED_AFTER)
+        ):
+            _release(identity)
+            continue
+        if row is not None and row.status_code is not None:
+            return _replay(row)
+        if time.monotonic() >= deadline:
+            raise Conflict("This submission is still being processed.")
+        time.sleep(POLL_INTERVAL)
+
+
+def record_outcome(response):
+    claim = g.pop("idempotency_claim", None)
+    if claim is None:
+        return response
+    identity, flashes_before = claim
+
+    if response.status_code >= 500:
+        db.session.rollback()
+    if response.status_code in (301, 302, 303, 307, 308) and response.location:
+        flashes = session.get("_flashes", [])[flashes_before:]
+        db.session.execute(
+            db.update(IdempotencyKey)
+            .where(*_where(identity))
+            .values(
+                status_code=response.status_code,
+                location=response.location,
+                flashes=json.dumps([list(item) for item in flashes]),
+            )
+        )
+        db.session.commit()
+    else:
+        _release(identity)
+
+    if current_app.extensions["idempotency_sweep_clock"].due():
+        purge_expired(PURGE_BATCH)
+    return response
+
+
+def purge_expired(batch_size: int) -> int:
+    """Delete up to ``batch_size`` expired keys, oldest first."""
+    expired = (
+        db.select(IdempotencyKey.user_id, IdempotencyKey.endpoint, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at <= datetime.utcnow())
+        .order_by(IdempotencyKey.expires_at.asc())
+        .limit(batch_size)
+    )
+    result = db.session.execute(
+        db.delete(IdempotencyKey).where(
+            sa.tuple_(IdempotencyKey.user_id, IdempotencyKey.endpoint, IdempotencyKey.key).in_(
+                expired
+            )
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def init_app(app) -> None:
+    app.extensions["idempotency_sweep_clock"] = SweepClock(
+        app.config["IDEMPOTENCY_SWEEP_INTERVAL"]
+    )
+    app.before_request(claim_or_replay)
+    app.after_request(record_outcome)
+
+    @app.cli.command("expire-idempotency-keys")
+    def expire_idempotency_keys_command():
+        """Delete idempotency keys whose replay window has passed."""
+        total = 0
+        while True:
+            purged = purge_expired(PURGE_BATCH)
+            total += purged
+            if purged < PURGE_BATCH:
+                break
+        click.echo(f"Deleted {total} expired idempotency key(s).")
@@ -0,0 +1,132 @@
+"""
+Cached, read-only principals for Flask-Login.
+
+Most requests only need to know who the user is, not their password hash or
+address. ``load_user`` returns a :class:`Principal` built from a small cached
+projection; views that edit the account fetch the full ORM ``User`` through
+:func:`full_user` on demand.
+
+The cache is per process. Every update or delete of a user row moves the
+shared ``identities`` counter (see changes.py), and each worker checks that
+counter at most every ``IDENTITY_CACHE_CHECK_INTERVAL`` seconds, dropping
+its whole cache when it moved. A changed or deleted account is therefore
+trusted by other workers for at most that long, not the full TTL.
+"""
+
+import threading
+import time
+
+from flask import current_app
+from flask_login import UserMixin, current_user
+
+from . import db
+from .changes import identities_version
+from .models import User
+
+
+class Principal(UserMixin):
+    """Minimal identity exposed as ``current_user`` for authenticated requests."""
+
+    def __init__(self, id: int, username: str, display_name: str) -> None:
+        self.id = id
+        self.username = username
+        self.display_name = display_name
+        self._user = None
+
+    @property
+    def user(self) -> User | None:
+        """The full ORM row, loaded the first time a view asks for it."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __repr__(self) -> str:
+        return f"<Principal {self.username}>"
+
+
+class IdentityCache:
+    """user id -> (username, display name, expiry); per process, TTL bounded."""
+
+    def __init__(self, ttl: float, max_entries: int, check_interval: float) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._entries: dict[int, tuple[str, str, float]] = {}
+        self._generation: int | None = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def check_due(self) -> bool:
+        return time.monotonic() >= self._next_check
+
+    def sync(self, generation: int) -> None:
+        """Drop every entry if accounts changed anywhere since the last check."""
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            self._next_check = time.monotonic() + self.check_interval
+
+    def get(self, user_id: int) -> tuple[str, str] | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[2] < time.monotonic():
+            return None
+        return entry[0], entry[1]
+
+    def put(self, user_id: int, username: str, display_name: str) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Cheap bound: drop the oldest insertion rather than track LRU order.
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = (username, display_name, time.monotonic() + self.ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def init_app(app, login_manager) -> None:
+    app.extensions["identity_cache"] = IdentityCache(
+        app.config["IDENTITY_CACHE_TTL"],
+        app.config["IDENTITY_CACHE_SIZE"],
+        app.config["IDENTITY_CACHE_CHECK_INTERVAL"],
+    )
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return load_principal(int(user_id))
+
+
+def _cache() -> IdentityCache:
+    return current_app.extensions["identity_cache"]
+
+
+def load_principal(user_id: int) -> Principal | None:
+    cache = _cache()
+    if cache.check_due():
+        cache.sync(identities_version())
+    cached = cache.get(user_id)
+    if cached is None:
+        row = db.session.execute(
+            db.select(User.username, User.first_name, User.last_name).where(
+                User.id == user_id, User.deleted_at.is_(None)
+            )
+        ).first()
+        if row is None:
+            return None
+        cached = (row.username, f"{row.first_name} {row.last_name}".strip())
+        cache.put(user_id, *cached)
+    return Principal(user_id, *cached)
+
+
+def invalidate(user_id: int) -> None:
+    """Call after the account changes or disappears."""
+    _cache().invalidate(user_id)
+
+
+def full_user() -> User | None:
+    """The ORM ``User`` for the current request, whatever ``current_user`` holds."""
+    principal = current_user._get_current_object()
+    if isinstance(principal, Principal):
+        return principal.user
+    return principal if isinstance(principal, User) else None
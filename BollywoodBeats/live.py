@@ -0,0 +1,203 @@
+"""
+Live capacity/status updates for event pages over Server-Sent Events.
+
+Booking and cancellation commits publish one snapshot per change. A
+broadcaster fans that snapshot out to every subscriber in the process, so
+watchers cost no database reads. With ``LIVE_BROKER = "redis"`` snapshots are
+relayed through Redis pub/sub so every worker process sees them.
+
+An open stream holds a worker thread for as long as the page stays open, so
+each process serves at most ``LIVE_MAX_STREAMS`` of them, and each one for at
+most ``LIVE_STREAM_SECONDS`` before the browser reconnects. Pages refused a
+stream poll the same snapshot as JSON every ``LIVE_POLL_SECONDS`` instead.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app
+from werkzeug.wsgi import ClosingIterator
+
+from .api import capacity_snapshot
+
+SUBSCRIBER_BACKLOG = 16
+# Backoff between attempts to reconnect the Redis relay, in seconds.
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+
+log = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """In-process fan-out of per-event messages to subscriber queues."""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[int, set[queue.Queue]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_id: int) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        with self._lock:
+            self._subscribers[event_id].add(q)
+        return q
+
+    def unsubscribe(self, event_id: int, q: queue.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(event_id)
+            if subscribers is None:
+                return
+            subscribers.discard(q)
+            if not subscribers:
+                del self._subscribers[event_id]
+
+    def has_subscribers(self, event_id: int) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(event_id))
+
+    def publish(self, event_id: int, message: str) -> None:
+        self._deliver(event_id, message)
+
+    def _deliver(self, event_id: int, message: str) -> None:
+        with self._lock:
+            targets = list(self._subscribers.get(event_id, ()))
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Slow clients only need the latest snapshot; drop the oldest.
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(message)
+
+
+class RedisBroadcaster(Broadcaster):
+    """Relays publishes through Redis so all worker processes fan out locally."""
+
+    CHANNEL_PREFIX = "bollywoodbeats:event:"
+
+    def __init__(self, url: str) -> None:
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise RuntimeError("LIVE_BROKER='redis' requires the 'redis' package.") from exc
+        self._redis = redis.Redis.from_url(url)
+        self._redis_errors = (redis.RedisError, OSError)
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, event_id: int) -> queue.Queue:
+        if self._listener is None:
+            # Started by the first watcher, so booting a worker never waits on Redis.
+            with self._lock:
+                if self._listener is None:
+                    self._listener = threading.Thread(target=self._listen, daemon=True)
+                    self._listener.start()
+        return super().subscribe(event_id)
+
+    def has_subscribers(self, event_id: int) -> bool:
+        # Watchers may be connected to another worker.
+        return True
+
+    def publish(self, event_id: int, message: str) -> None:
+        self._redis.publish(f"{self.CHANNEL_PREFIX}{event_id}", message)
+
+    def _listen(self) -> None:
+        # The relay outlives any one connection: a Redis restart or network
+        # blip only pauses it, with exponential backoff between attempts.
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                delay = RECONNECT_MIN_DELAY
+                for item in pubsub.listen():
+                    channel = item["channel"].decode()
+                    event_id = int(channel.rsplit(":", 1)[1])
+                    self._deliver(event_id, item["data"].decode())
+            except self._redis_errors:
+                log.warning("Live relay lost Redis; reconnecting in %.1fs.", delay, exc_info=True)
+            finally:
+                pubsub.close()
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+def init_app(app) -> None:
+    if app.config["LIVE_BROKER"] == "redis":
+        app.extensions["live_broadcaster"] = RedisBroadcaster(app.config["LIVE_REDIS_URL"])
+    else:
+        app.extensions["live_broadcaster"] = Broadcaster()
+    # Per process, so a few open tabs can never take every request thread.
+    # Zero turns streams off, e.g. for sync workers with a single thread.
+    max_streams = app.config["LIVE_MAX_STREAMS"]
+    app.extensions["live_stream_slots"] = (
+        threading.BoundedSemaphore(max_streams) if max_streams > 0 else None
+    )
+
+
+def broadcaster() -> Broadcaster:
+    return current_app.extensions["live_broadcaster"]
+
+
+def event_snapshot(event_id: int) -> dict | None:
+    """Capacity and status of one event as watchers receive them, in one query."""
+    row = capacity_snapshot(event_id)
+    if row is None:
+        return None
+    return {
+        "event_id": event_id,
+        "remaining_capacity": int(row.remaining_capacity),
+        "total_capacity": int(row.total_capacity),
+        "status": row.status.value,
+    }
+
+
+def publish_event_snapshot(event_id: int) -> None:
+    """Read capacity and status once and push them to every watcher."""
+    hub = broadcaster()
+    if not hub.has_subscribers(event_id):
+        return
+
+    snapshot = event_snapshot(event_id)
+    if snapshot is not None:
+        hub.publish(event_id, json.dumps(snapshot))
+
+
+def sse_stream(event_id: int, heartbeat: float, lifetime: float):
+    """
+    Subscribe now (inside the request) and return a generator of SSE frames
+    that runs after the app context is gone. It ends when the client
+    disconnects or after ``lifetime`` seconds, whereupon browsers reconnect.
+
+    Returns None when this process already serves ``LIVE_MAX_STREAMS``.
+    """
+    slots = current_app.extensions["live_stream_slots"]
+    if slots is None or not slots.acquire(blocking=False):
+        return None
+    hub = broadcaster()
+    q = hub.subscribe(event_id)
+
+    def frames():
+        yield "retry: 5000\n\n"
+        deadline = time.monotonic() + lifetime
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                message = q.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                # Comment frames keep proxies from closing idle connections.
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: capacity\ndata: {message}\n\n"
+
+    def close() -> None:
+        hub.unsubscribe(event_id, q)
+        slots.release()
+
+    # The WSGI server always calls close(), even if the stream never started.
+    return ClosingIterator(frames(), close)
@@ -0,0 +1,452 @@
+"""
+Prometheus metrics served at ``/metrics`` in the text exposition format.
+
+Collected per worker process:
+
+* latency histograms and status counts for ``main`` and ``auth`` endpoints
+  (streamed pages are timed to their first byte);
+* connection pool checkouts and time spent waiting for a connection per
+  bind, plus checked-out, overflow and pool-size gauges;
+* bookings committed, as a counter to ``rate()`` over;
+* event status transitions applied by the per-request status sweep.
+
+Recording takes no lock. Each thread writes to its own shard, and shards
+are only merged when a snapshot is taken. Every ``METRICS_FLUSH_INTERVAL``
+seconds a worker writes its snapshot to ``METRICS_DIR/metrics-<pid>-*.json``
+with an atomic rename. A scrape merges the files of every worker, so any
+worker can answer it. Counters of exited workers are folded into
+``dead.json`` so totals never go backwards; their gauges are dropped.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import Response, abort, current_app, g, has_app_context, request
+
+from . import db
+from .models import Booking
+from .routing import RoutingSession
+
+try:  # fcntl is POSIX-only; without it dead workers' files are read, not folded.
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+PREFIX = "bollywoodbeats_"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+TIMED_BLUEPRINTS = frozenset({"main", "auth"})
+_NEW_BOOKINGS = "metrics_new_bookings"
+
+# name -> (type, help, label names, histogram buckets)
+METRICS = {
+    "http_requests_total": (
+        "counter", "Requests served, by endpoint and status.",
+        ("endpoint", "method", "status"), None,
+    ),
+    "http_request_duration_seconds": (
+        "histogram", "Time to the first byte of the response.",
+        ("endpoint", "method"), LATENCY_BUCKETS,
+    ),
+    "db_pool_checkouts_total": (
+        "counter", "Connections checked out of the pool.", ("bind",), None,
+    ),
+    "db_pool_wait_seconds": (
+        "histogram", "Time spent waiting for a pooled connection.", ("bind",), WAIT_BUCKETS,
+    ),
+    "db_pool_checked_out": (
+        "gauge", "Connections currently checked out.", ("bind", "pid"), None,
+    ),
+    "db_pool_overflow": (
+        "gauge", "Connections open beyond pool_size (negative while filling).",
+        ("bind", "pid"), None,
+    ),
+    "db_pool_size": ("gauge", "Configured pool size.", ("bind", "pid"), None),
+    "bookings_committed_total": ("counter", "Bookings committed.", (), None),
+    "event_status_transitions_total": (
+        "counter", "Event statuses changed by the status sweep.", ("from", "to"), None,
+    ),
+}
+
+
+class _Shard:
+    """One thread's counters and histograms; only that thread writes to it."""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self) -> None:
+        self.counters: dict[tuple, float] = {}
+        # key -> per-bucket counts (the last one is +Inf), then sum, then count
+        self.histograms: dict[tuple, list[float]] = {}
+
+
+class Registry:
+    def __init__(self, directory: str, flush_interval: float) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.engines: dict[str, sa.engine.Engine] = {}
+        self._lock = threading.Lock()  # only taken to register a new thread's shard
+        self._flush_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.pid = os.getpid()
+        # The suffix keeps a recycled pid from overwriting a dead worker's file.
+        self.path = os.path.join(
+            self.directory, f"metrics-{self.pid}-{uuid.uuid4().hex[:8]}.json"
+        )
+        self._local = threading.local()
+        self._shards: list[_Shard] = []
+        self._next_flush = 0.0
+
+    def after_fork(self) -> None:
+        """Start empty in a forked worker; the parent's counts are its own."""
+        self._reset()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    # ---- recording ----
+    def inc(self, name: str, labels: tuple = (), amount: float = 1) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        buckets = METRICS[name][3]
+        histograms = self._shard().histograms
+        key = (name, labels)
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [0] * (len(buckets) + 3)
+        entry[bisect.bisect_left(buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    # ---- snapshots ----
+    def _gauges(self) -> list:
+        gauges = []
+        for bind, engine in self.engines.items():
+            pool = engine.pool
+            labels = [bind, str(self.pid)]
+            for name, method in (
+                ("db_pool_checked_out", "checkedout"),
+                ("db_pool_overflow", "overflow"),
+                ("db_pool_size", "size"),
+            ):
+                if hasattr(pool, method):
+                    gauges.append([name, labels, getattr(pool, method)()])
+        return gauges
+
+    def snapshot(self) -> dict:
+        counters: dict[tuple, float] = {}
+        histograms: dict[tuple, list[float]] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # Copying a dict is atomic under the GIL, so the owner can keep writing.
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, entry in list(shard.histograms.items()):
+                _add_into(histograms, key, list(entry))
+        return {
+            "pid": self.pid,
+            "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            "histograms": [
+                [name, list(labels), entry] for (name, labels), entry in histograms.items()
+            ],
+            "gauges": self._gauges(),
+        }
+
+    def maybe_flush(self) -> None:
+        now = time.monotonic()
+        # Whichever thread gets here first writes; the others don't wait for it.
+        if now < self._next_flush or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_flush = now + self.flush_interval
+            self.flush()
+        except OSError:
+            current_app.logger.exception("Could not write metrics to %s.", self.path)
+        finally:
+            self._flush_lock.release()
+
+    def flush(self) -> None:
+        if os.getpid() != self.pid:
+            self._reset()
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary, self.path)
+
+
+def _add_into(histograms: dict, key: tuple, entry: list) -> None:
+    current = histograms.get(key)
+    if current is None:
+        histograms[key] = entry
+    else:
+        for index, value in enumerate(entry):
+            current[index] += value
+
+
+def _registry() -> Registry | None:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("metrics")
+
+
+def record_status_transition(old, new) -> None:
+    registry = _registry()
+    if registry is not None:
+        registry.inc("event_status_transitions_total", (old.name, new.name))
+
+
+# ---------------------------
+# Collection from workers
+# ---------------------------
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path: str) -> dict | None:
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None  # removed or folded by a concurrent scrape
+
+
+@contextmanager
+def _directory_lock(directory: str):
+    if fcntl is None:
+        yield False
+        return
+    with open(os.path.join(directory, ".lock"), "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _merge(snapshots, include_gauges: bool) -> dict:
+    counters: dict[tuple, float] = {}
+    histograms: dict[tuple, list[float]] = {}
+    gauges = []
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get("counters", ()):
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, entry in snapshot.get("histograms", ()):
+            _add_into(histograms, (name, tuple(labels)), list(entry))
+        if include_gauges:
+            gauges.extend(snapshot.get("gauges", ()))
+    return {"counters": counters, "histograms": histograms, "gauges": gauges}
+
+
+def _fold_dead_workers(directory: str, dead: list[str]) -> None:
+    """Add exited workers' counters into dead.json and delete their files."""
+    with _directory_lock(directory) as locked:
+        if not locked:
+            return
+        archive_path = os.path.join(directory, "dead.json")
+        snapshots = [_read(archive_path) or {}]
+        folded = []
+        for path in dead:
+            snapshot = _read(path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+                folded.append(path)
+        merged = _merge(snapshots, include_gauges=False)
+        temporary = f"{archive_path}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(
+                {
+                    "counters": [[n, list(l), v] for (n, l), v in merged["counters"].items()],
+                    "histograms": [[n, list(l), e] for (n, l), e in merged["histograms"].items()],
+                },
+                handle,
+            )
+        os.replace(temporary, archive_path)
+        for path in folded:
+            os.remove(path)
+
+
+def collect(registry: Registry) -> dict:
+    """Merged metrics of this process (live) and every other worker (files)."""
+    directory = registry.directory
+    os.makedirs(directory, exist_ok=True)
+    snapshots = [registry.snapshot()]
+    dead = []
+    for name in os.listdir(directory):
+        if not (name.startswith("metrics-") and name.endswith(".json")):
+            continue
+        path = os.path.join(directory, name)
+        if path == registry.path:
+            continue
+        if not _alive(int(name.split("-")[1])):
+            dead.append(path)
+            continue
+        snapshot = _read(path)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    if dead:
+        _fold_dead_workers(directory, dead)
+    snapshots.append(_read(os.path.join(directory, "dead.json")) or {})
+    # dead.json never has gauges, and dead workers' files (if not folded) are skipped.
+    return _merge(snapshots, include_gauges=True)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(merged: dict) -> str:
+    lines = []
+    by_name: dict[str, list] = {name: [] for name in METRICS}
+    for (name, labels), value in merged["counters"].items():
+        by_name[name].append((labels, value))
+    for (name, labels), entry in merged["histograms"].items():
+        by_name[name].append((labels, entry))
+    for name, labels, value in merged["gauges"]:
+        by_name[name].append((tuple(labels), value))
+
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        full = PREFIX + name
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} {kind}")
+        for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{full}{_labels(label_names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), value[:-2]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{full}_bucket{_labels(label_names, labels, le)} {_number(cumulative)}")
+            lines.append(f"{full}_sum{_labels(label_names, labels)} {_number(value[-2])}")
+            lines.append(f"{full}_count{_labels(label_names, labels)} {_number(value[-1])}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Instrumentation
+# ---------------------------
+def _time_waits(pool, registry: Registry, bind: str) -> None:
+    # Pools are recreated on dispose(), so this is reapplied from the checkout hook.
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            registry.observe("db_pool_wait_seconds", (bind,), time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+    pool._metrics_timed = True
+
+
+def instrument_engine(registry: Registry, bind: str, engine) -> None:
+    registry.engines[bind] = engine
+
+    @sa.event.listens_for(engine, "checkout")
+    def _checked_out(dbapi_connection, connection_record, connection_proxy):
+        registry.inc("db_pool_checkouts_total", (bind,))
+        if not getattr(engine.pool, "_metrics_timed", False):
+            _time_waits(engine.pool, registry, bind)
+
+    _time_waits(engine.pool, registry, bind)
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _count_new_bookings(session, flush_context) -> None:
+    added = sum(1 for obj in session.new if isinstance(obj, Booking))
+    if added:
+        session.info[_NEW_BOOKINGS] = session.info.get(_NEW_BOOKINGS, 0) + added
+
+
+@sa.event.listens_for(RoutingSession, "after_commit")
+def _bookings_committed(session) -> None:
+    added = session.info.pop(_NEW_BOOKINGS, 0)
+    registry = _registry() if added else None
+    if registry is not None:
+        registry.inc("bookings_committed_total", (), added)
+
+
+@sa.event.listens_for(RoutingSession, "after_rollback")
+def _bookings_rolled_back(session) -> None:
+    session.info.pop(_NEW_BOOKINGS, None)
+
+
+def start_timer() -> None:
+    g.metrics_started = time.perf_counter()
+
+
+def record_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    registry = current_app.extensions["metrics"]
+    if request.blueprint in TIMED_BLUEPRINTS:
+        endpoint, method = request.endpoint, request.method
+        registry.observe(
+            "http_request_duration_seconds", (endpoint, method), time.perf_counter() - started
+        )
+        registry.inc("http_requests_total", (endpoint, method, str(response.status_code)))
+    registry.maybe_flush()
+    return response
+
+
+def init_app(app) -> None:
+    if not app.config["METRICS_ENABLED"]:
+        return
+    registry = Registry(
+        app.config["METRICS_DIR"] or os.path.join(app.instance_path, "metrics"),
+        app.config["METRICS_FLUSH_INTERVAL"],
+    )
+    app.extensions["metrics"] = registry
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            instrument_engine(registry, bind or "primary", engine)
+
+    app.before_request(start_timer)
+    app.after_request(record_request)
+
+    @app.get("/metrics")
+    def metrics():
+        token = app.config["METRICS_TOKEN"]
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            abort(404)
+        return Response(
+            render(collect(registry)), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
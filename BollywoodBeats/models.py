@@ -3,9 +3,20 @@
 from datetime import datetime
 from enum import Enum
 from decimal import Decimal
+import sqlalchemy as sa
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
+
+
+@sa.event.listens_for(sa.engine.Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores REFERENCES clauses (including ON DELETE CASCADE) unless
+    # every connection opts in.
+    if "sqlite" in type(dbapi_connection).__module__:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
 
 # ---------------------------
@@ -33,11 +44,15 @@ class User(UserMixin, db.Model):
     contact_number = db.Column(db.String(30), nullable=False)
     street_address = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set when a large account is scrubbed and queued for background purge.
+    deleted_at = db.Column(db.DateTime)
 
-    # Relationships
-    events = db.relationship("Event", backref="owner", lazy=True)
-    bookings = db.relationship("Booking", backref="user", lazy=True)
-    comments = db.relationship("Comment", backref="user", lazy=True)
+    # Relationships; the database cascades deletes (see ondelete below), so
+    # the ORM never loads children just to delete them.
+    events = db.relationship("Event", backref="owner", lazy=True, passive_deletes=True)
+    bookings = db.relationship("Booking", backref="user", lazy=True, passive_deletes=True)
+    holds = db.relationship("TicketHold", backref="user", lazy=True, passive_deletes=True)
+    comments = db.relationship("Comment", backref="user", lazy=True, passive_deletes=True)
 
     # ---- Auth helpers ----
     def set_password(self, raw: str) -> None:
@@ -64,32 +79,48 @@ class Event(db.Model):
     image_url = db.Column(db.String(255))
     venue = db.Column(db.String(160), nullable=False)
     city = db.Column(db.String(80), nullable=False)
-    start_dt = db.Column(db.DateTime, nullable=False)
+    start_dt = db.Column(db.DateTime, nullable=False, index=True)
     capacity = db.Column(db.Integer, nullable=False, default=0)
     price = db.Column(db.Numeric(10, 2), nullable=False, default=0)
     status = db.Column(db.Enum(EventStatus), nullable=False, default=EventStatus.OPEN)
-    owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    owner_id = db.Column(
+        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    # Set for dates created together as a tour or recurring event (see series.py).
+    series_id = db.Column(
+        db.Integer, db.ForeignKey("event_series.id", ondelete="SET NULL"), index=True
+    )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     bookings = db.relationship(
-        "Booking", backref="event", lazy=True, cascade="all, delete-orphan"
+        "Booking", backref="event", lazy=True, cascade="all, delete-orphan", passive_deletes=True
     )
     comments = db.relationship(
-        "Comment", backref="event", lazy=True, cascade="all, delete-orphan"
+        "Comment", backref="event", lazy=True, cascade="all, delete-orphan", passive_deletes=True
     )
     ticket_types = db.relationship(
-        "TicketType", backref="event", lazy=True, cascade="all, delete-orphan"
+        "TicketType", backref="event", lazy=True, cascade="all, delete-orphan", passive_deletes=True
+    )
+    holds = db.relationship(
+        "TicketHold", backref="event", lazy=True, cascade="all, delete-orphan", passive_deletes=True
     )
 
     @property
     def booked_quantity(self) -> int:
         return sum(b.qty or 0 for b in self.bookings)
 
+    @property
+    def held_quantity(self) -> int:
+        # Expired holds stop counting at once, before the sweeper deletes them.
+        now = datetime.utcnow()
+        return sum(h.qty or 0 for h in self.holds if h.expires_at > now)
+
     @property
     def remaining_capacity(self) -> int:
-        return max(0, (self.total_capacity or 0) - self.booked_quantity)
+        taken = self.booked_quantity + self.held_quantity
+        return max(0, (self.total_capacity or 0) - taken)
 
     @property
     def total_capacity(self) -> int:
@@ -135,13 +166,37 @@ class Event(db.Model):
         return f"<Event {self.title} #{self.id}>"
 
 
+class EventSeries(db.Model):
+    """Events created, edited and cancelled together (see series.py)."""
+
+    __tablename__ = "event_series"
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(160), nullable=False)
+    owner_id = db.Column(
+        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    events = db.relationship("Event", backref="series", lazy=True, passive_deletes=True)
+
+    def __repr__(self) -> str:
+        return f"<EventSeries {self.title} #{self.id}>"
+
+
 class Booking(db.Model):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Serves the booking history page: one user's rows, newest first.
+        db.Index("ix_bookings_user_booked_at", "user_id", "booked_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.String(20), unique=True, index=True, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    event_id = db.Column(
+        db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     qty = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     booked_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -155,12 +210,46 @@ class Booking(db.Model):
         return f"<Booking {self.order_id}>"
 
 
+class TicketHold(db.Model):
+    """Seats set aside for one user's checkout until ``expires_at`` (see holds.py)."""
+
+    __tablename__ = "ticket_holds"
+    __table_args__ = (
+        # Capacity checks sum one event's unexpired holds off this index.
+        db.Index("ix_ticket_holds_event_expires_at", "event_id", "expires_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(
+        db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    qty = db.Column(db.Integer, nullable=False)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The sweeper walks this index oldest first.
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    @property
+    def total(self) -> Decimal:
+        return (self.unit_price or Decimal("0")) * Decimal(self.qty or 0)
+
+    def __repr__(self) -> str:
+        return f"<TicketHold {self.qty} for event {self.event_id} until {self.expires_at}>"
+
+
 class Comment(db.Model):
     __tablename__ = "comments"
 
     id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    event_id = db.Column(
+        db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     body = db.Column(db.Text, nullable=False)
     posted_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -172,7 +261,9 @@ class TicketType(db.Model):
     __tablename__ = "ticket_types"
 
     id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey("events.id"), nullable=False)
+    event_id = db.Column(
+        db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     name = db.Column(db.String(120), nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False, default=0)
     quantity = db.Column(db.Integer, nullable=False, default=0)
@@ -180,3 +271,75 @@ class TicketType(db.Model):
 
     def __repr__(self) -> str:
         return f"<TicketType {self.name} for event {self.event_id}>"
+
+
+class RelatedEvent(db.Model):
+    """Precomputed neighbours of an event, best first (see related.py)."""
+
+    __tablename__ = "related_events"
+    __table_args__ = (
+        # Detail pages read one event's top-K straight off this index.
+        db.Index("ix_related_events_event_score", "event_id", "score"),
+    )
+
+    event_id = db.Column(
+        db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), primary_key=True
+    )
+    related_id = db.Column(
+        db.Integer, db.ForeignKey("events.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    score = db.Column(db.Float, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RelatedEvent {self.event_id} -> {self.related_id} ({self.score:.2f})>"
+
+
+class IdempotencyKey(db.Model):
+    """Outcome of one form submission, replayed to its duplicates (see idempotency.py)."""
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    endpoint = db.Column(db.String(80), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    # NULL while the first request is still running.
+    status_code = db.Column(db.Integer)
+    location = db.Column(db.String(255))
+    flashes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey {self.endpoint} {self.key} for user {self.user_id}>"
+
+
+class ChangeCounter(db.Model):
+    """Monotonic per-topic write counters that caches key on (see changes.py)."""
+
+    __tablename__ = "change_counters"
+
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<ChangeCounter {self.name}={self.version}>"
+
+
+class CatalogueChange(db.Model):
+    """One event touched by a committed catalogue write (see changes.py)."""
+
+    __tablename__ = "catalogue_changes"
+    # Readers track the newest id they've seen, so ids must never be reused,
+    # not even once pruning has emptied the table.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: deleted events are logged too. NULL means the write's
+    # events weren't known, and readers rescan the whole catalogue.
+    event_id = db.Column(db.Integer)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self) -> str:
+        return f"<CatalogueChange #{self.id} event {self.event_id}>"
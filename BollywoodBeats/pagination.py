@@ -0,0 +1,27 @@
+"""
+Opaque keyset cursors for paged lists.
+
+A cursor encodes the ``(timestamp, id)`` of the last row on a page, so the
+next page starts right after it with an index seek instead of an OFFSET.
+The API's event list and the booking history page both use them.
+"""
+
+import base64
+from datetime import datetime
+
+from flask import abort
+
+
+def encode_cursor(start_dt: datetime, row_id: int) -> str:
+    raw = f"{start_dt.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """The ``(timestamp, id)`` inside ``cursor``; aborts with 400 if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_raw, id_raw = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(start_raw), int(id_raw)
+    except (ValueError, UnicodeDecodeError):
+        abort(400, description="Invalid cursor.")
@@ -0,0 +1,157 @@
+"""
+On-demand sampling profiler for single requests.
+
+With ``PROFILING_ENABLED`` on, a request is profiled in either of two
+cases: it carries a valid ``X-Profile-Request`` token (made with
+``flask profile-token``), or it is picked at ``PROFILE_SAMPLE_RATE``. A
+background thread then samples the request thread's stack every
+``PROFILE_INTERVAL_MS``, from the first before_request hook until the
+response body, streamed pages included, has been sent.
+
+Stacks are written in collapsed ("folded") form to
+``PROFILE_DIR/<time>-<endpoint>-<pid>.folded``, ready for flamegraph.pl,
+speedscope or inferno. The root frame of every stack names the endpoint,
+its SQL query count and its wall time. When profiling is off, no hooks or
+listeners are installed, so it costs nothing.
+"""
+
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+import sqlalchemy as sa
+from flask import g, request
+from itsdangerous import BadSignature, TimestampSigner
+
+from . import db
+
+HEADER = "X-Profile-Request"
+# Profiling a request slows it down, so only a couple run at once.
+MAX_CONCURRENT = 2
+# A sampler whose response is never closed gives up after this long.
+MAX_SECONDS = 60
+
+# Request thread ident -> its running sampler, for the query counter.
+_active: dict[int, "_Sampler"] = {}
+
+
+@functools.lru_cache(maxsize=8192)
+def _label(code) -> str:
+    path = code.co_filename
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and path.startswith(prefix + os.sep):
+            path = path[len(prefix) + 1 :]
+            break
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, target: int, interval: float) -> None:
+        super().__init__(name="request-profiler", daemon=True)
+        self.target = target
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self.queries = 0
+        self.started = time.perf_counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        deadline = self.started + MAX_SECONDS
+        while not self._done.wait(self.interval) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> float:
+        self._done.set()
+        self.join()
+        return time.perf_counter() - self.started
+
+
+def _signer(app) -> TimestampSigner:
+    return TimestampSigner(app.secret_key, salt="request-profile")
+
+
+def _wanted(app) -> bool:
+    token = request.headers.get(HEADER)
+    if token:
+        try:
+            _signer(app).unsign(token, max_age=app.config["PROFILE_TOKEN_MAX_AGE"])
+            return True
+        except BadSignature:
+            return False
+    rate = app.config["PROFILE_SAMPLE_RATE"]
+    return rate > 0 and random.random() < rate
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    sampler = _active.get(threading.get_ident())
+    if sampler is not None:
+        sampler.queries += 1
+
+
+def _finish(sampler: _Sampler, slots, path: str, root: str) -> None:
+    """Stop sampling and write the folded stacks once the body has been sent."""
+    elapsed = sampler.stop()
+    _active.pop(sampler.target, None)
+    slots.release()
+    root = f"{root} [{sampler.queries} queries, {elapsed * 1000:.0f} ms]".replace(";", ":")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as handle:
+        for stack, count in sampler.counts.most_common():
+            handle.write(f"{root};{stack} {count}\n")
+
+
+def init_app(app) -> None:
+    if not app.config["PROFILING_ENABLED"]:
+        return
+    directory = app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles")
+    interval = app.config["PROFILE_INTERVAL_MS"] / 1000
+    slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            sa.event.listen(engine, "before_cursor_execute", _count_query)
+
+    @app.before_request
+    def start_profile():
+        if not _wanted(app) or not slots.acquire(blocking=False):
+            return None
+        sampler = _Sampler(threading.get_ident(), interval)
+        _active[sampler.target] = sampler
+        g.profile_sampler = sampler
+        sampler.start()
+
+    @app.after_request
+    def schedule_profile_write(response):
+        sampler = g.pop("profile_sampler", None)
+        if sampler is None:
+            return response
+        endpoint = request.endpoint or "unmatched"
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}-{os.getpid()}.folded"
+        root = f"{request.method} {endpoint}"
+        # Streamed bodies are generated after this hook, so wait for close().
+        response.call_on_close(
+            lambda: _finish(sampler, slots, os.path.join(directory, name), root)
+        )
+        response.headers["X-Profile-Id"] = name
+        return response
+
+    @app.cli.command("profile-token")
+    def profile_token_command():
+        """Print a token that makes a request carrying it get profiled."""
+        click.echo(f"{HEADER}: {_signer(app).sign('profile').decode()}")
+        max_age = app.config["PROFILE_TOKEN_MAX_AGE"]
+        click.echo(f"Valid for {max_age} seconds; profiles go to {directory}.", err=True)
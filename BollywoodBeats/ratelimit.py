@@ -0,0 +1,161 @@
+"""
+Sliding-window rate limiting for auth and write endpoints.
+
+Counters are kept per fixed window; the estimate for "the last window"
+weights the previous window by how much of it still overlaps, which is
+accurate to a few percent and needs two integers per key. The in-memory
+backend suits a single process; ``RATELIMIT_STORAGE = "redis"`` shares the
+counters between workers.
+"""
+
+import threading
+import time
+from flask import current_app, render_template, request
+from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rule(rule: str) -> tuple[int, int]:
+    """Turn ``"10/minute"`` into ``(10, 60)``."""
+    count, _, period = rule.partition("/")
+    return int(count), PERIODS[period.strip().rstrip("s")]
+
+
+class MemoryBackend:
+    """Per-process counters: key -> [window, window index, current, previous]."""
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self) -> None:
+        self._counters: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+
+    def hit(self, key: str, window: int, now: float) -> tuple[int, int]:
+        index = int(now // window)
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[1] < index - 1:
+                entry = self._counters[key] = [window, index, 0, 0]
+            elif entry[1] == index - 1:
+                entry[1:] = [index, 0, entry[2]]
+            entry[2] += 1
+            current, previous = entry[2], entry[3]
+
+            self._hits += 1
+            if self._hits % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+        return current, previous
+
+    def _sweep(self, now: float) -> None:
+        # Anything older than the previous window no longer affects estimates.
+        stale = [
+            key
+            for key, (window, index, _, _) in self._counters.items()
+            if index < now // window - 1
+        ]
+        for key in stale:
+            del self._counters[key]
+
+
+class RedisBackend:
+    """Shared counters in Redis: one INCR plus one GET per check."""
+
+    PREFIX = "bollywoodbeats:rl:"
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise RuntimeError("RATELIMIT_STORAGE='redis' requires the 'redis' package.") from exc
+        self._redis = redis.Redis.from_url(url)
+
+    def hit(self, key: str, window: int, now: float) -> tuple[int, int]:
+        index = int(now // window)
+        current_key = f"{self.PREFIX}{key}:{index}"
+        pipe = self._redis.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, window * 2)
+        pipe.get(f"{self.PREFIX}{key}:{index - 1}")
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+
+class RateLimiter:
+    def __init__(self, backend) -> None:
+        self.backend = backend
+
+    def check(self, key: str, limit: int, window: int) -> float:
+        """Record a hit; return 0 when allowed, else seconds to wait."""
+        now = time.time()
+        current, previous = self.backend.hit(key, window, now)
+        elapsed = (now % window) / window
+        estimate = previous * (1 - elapsed) + current
+        if estimate <= limit:
+            return 0.0
+        # Either the previous window fades out enough or the current one ends.
+        return max(1.0, window - (now % window))
+
+
+def init_app(app) -> None:
+    if app.config["RATELIMIT_STORAGE"] == "redis":
+        backend = RedisBackend(app.config["RATELIMIT_REDIS_URL"])
+    else:
+        backend = MemoryBackend()
+    app.extensions["rate_limiter"] = RateLimiter(backend)
+    app.before_request(enforce_rate_limits)
+
+    @app.errorhandler(429)
+    def too_many_requests(e):
+        response = current_app.make_response((render_template("errors/429.html"), 429))
+        if e.retry_after is not None:
+            response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+
+def _identity(key: str) -> str:
+    if key == "user" and current_user.is_authenticated:
+        return f"user:{current_user.get_id()}"
+    # Behind a proxy this is the proxy's address unless TRUSTED_PROXIES is set.
+    return f"ip:{request.remote_addr}"
+
+
+def enforce_rate_limits() -> None:
+    """
+    Runs as a before_request hook registered ahead of the status sweep, so a
+    throttled request is rejected before it costs any database work.
+    """
+    config = current_app.config
+    if not config["RATELIMIT_ENABLED"] or request.endpoint is None:
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    spec = getattr(view, "rate_limit", None)
+    if spec is None:
+        return
+    default_rule, key, methods = spec
+    if request.method not in methods:
+        return
+
+    rule = config["RATELIMIT_RULES"].get(request.endpoint, default_rule)
+    limit, window = parse_rule(rule)
+    retry_after = current_app.extensions["rate_limiter"].check(
+        f"{request.endpoint}:{_identity(key)}", limit, window
+    )
+    if retry_after:
+        raise TooManyRequests(retry_after=int(retry_after))
+
+
+def rate_limit(default_rule: str, *, key: str = "ip", methods=("POST",)):
+    """
+    Mark a view as throttled per client (``key`` is "ip" or "user").
+    ``RATELIMIT_RULES`` can override the rule per endpoint, e.g.
+    ``{"auth.login": "20/minute"}``.
+    """
+
+    def decorator(view):
+        view.rate_limit = (default_rule, key, frozenset(methods))
+        return view
+
+    return decorator
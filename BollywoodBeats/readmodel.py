@@ -0,0 +1,387 @@
+"""
+In-process read model of the catalogue for the home page and nav bar.
+
+Each worker keeps one compact ``EventCard`` per event. A card holds only
+the columns an event card shows. Cards are sorted by ``start_dt``, and the
+category and city buckets keep the same order. A date window is then two
+bisects, and a category filter never scans other categories. Anonymous
+browsing, by far the most common traffic, renders without loading a
+single ORM object.
+
+The model follows ``changes.catalogue_version()``, checking it at most
+every ``READ_MODEL_MAX_STALENESS`` seconds. Clients pinned to the primary
+after a write check on every request, so they see their own changes. When
+the version has moved, the model reads the changed-event log (see
+changes.py) since its last refresh and reloads just those events, dropping
+the ones that were deleted. Only the first build, a log entry that doesn't
+name its event, or a log gap longer than the retention falls back to one
+narrow query that fingerprints every event by ``updated_at`` and cheapest
+tier price. Each refresh publishes a new immutable snapshot, so readers
+never take a lock. Snapshots also carry the
+search-as-you-type index (see suggest.py), patched with the same changes.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from . import db, routing
+from .aggregates import tiers_subquery
+from .changes import catalogue_version, changes_after, log_position
+from .facets import CLOSE_WHEN_STARTED, DATE_WINDOWS, PRICE_BANDS
+from .models import Event, EventStatus
+from .suggest import SuggestionIndex
+
+# Past this share of changed events, re-sorting beats patching the lists.
+REBUILD_FRACTION = 0.125
+# Keeps ``IN (...)`` lists under SQLite's bound-parameter limit.
+RELOAD_CHUNK = 500
+# Log ids are taken at insert, so concurrent writers can commit them out of
+# order. Missing ids this close to the newest one are re-read on every
+# refresh, so a late commit is picked up rather than skipped.
+LOG_OVERLAP = 1000
+
+
+class EventCard:
+    """What an event card shows; attribute names match ``Event``."""
+
+    __slots__ = (
+        "id",
+        "title",
+        "category",
+        "image_url",
+        "venue",
+        "city",
+        "start_dt",
+        "stored_status",
+        "lowest_ticket_price",
+        "updated_at",
+        "search_text",
+    )
+
+    def __init__(self, row) -> None:
+        self.id = row.id
+        self.title = row.title
+        self.category = row.category
+        self.image_url = row.image_url
+        self.venue = row.venue
+        self.city = row.city
+        self.start_dt = row.start_dt
+        self.stored_status = row.status
+        self.lowest_ticket_price = row.lowest_price
+        self.updated_at = row.updated_at
+        # What the home page search matches: the title or the venue.
+        self.search_text = f"{row.title}\n{row.venue}".casefold()
+
+    @property
+    def status(self) -> EventStatus:
+        # The home page skips the status sweep, so an event whose start has
+        # passed is closed here, just as ``Event.refresh_status`` would.
+        if self.stored_status in CLOSE_WHEN_STARTED and self.start_dt < datetime.utcnow():
+            return EventStatus.INACTIVE
+        return self.stored_status
+
+    @property
+    def is_live(self) -> bool:
+        return self.stored_status != EventStatus.CANCELLED
+
+    def __repr__(self) -> str:
+        return f"<EventCard {self.title} #{self.id}>"
+
+
+def _order(card: EventCard) -> tuple:
+    return (card.start_dt, card.id)
+
+
+def _starts(card: EventCard) -> datetime:
+    return card.start_dt
+
+
+def _patched(cards: list, drop: list, add: list) -> list:
+    """A sorted copy of ``cards`` without ``drop`` and with ``add``."""
+    if len(drop) + len(add) > len(cards) * REBUILD_FRACTION:
+        dropped = {card.id for card in drop}
+        return sorted([c for c in cards if c.id not in dropped] + add, key=_order)
+    cards = list(cards)
+    for card in drop:
+        del cards[bisect_left(cards, _order(card), key=_order)]
+    for card in add:
+        insort(cards, card, key=_order)
+    return cards
+
+
+def _patched_buckets(buckets: dict, attribute: str, drop: list, add: list) -> dict:
+    changes: dict[str, tuple[list, list]] = {}
+    for index, cards in enumerate((drop, add)):
+        for card in cards:
+            value = getattr(card, attribute)
+            if value is not None:
+                changes.setdefault(value, ([], []))[index].append(card)
+    buckets = dict(buckets)
+    for value, (bucket_drop, bucket_add) in changes.items():
+        bucket = _patched(buckets.get(value, []), bucket_drop, bucket_add)
+        if bucket:
+            buckets[value] = bucket
+        else:
+            buckets.pop(value, None)
+    return buckets
+
+
+class Snapshot:
+    """One immutable version of the catalogue."""
+
+    __slots__ = (
+        "version",
+        "by_id",
+        "cards",
+        "by_category",
+        "by_city",
+        "live_starts",
+        "categories",
+        "suggestions",
+    )
+
+    def __init__(
+        self, version, by_id, cards, by_category, by_city, live_starts, suggestions
+    ) -> None:
+        self.version = version
+        self.by_id = by_id
+        self.cards = cards
+        self.by_category = by_category
+        self.by_city = by_city
+        # Start times of events that aren't cancelled, for the upcoming count.
+        self.live_starts = live_starts
+        self.categories = sorted(by_category)
+        self.suggestions = suggestions
+
+    @classmethod
+    def empty(cls) -> "Snapshot":
+        return cls(None, {}, [], {}, {}, [], SuggestionIndex.empty())
+
+    def patched(self, version: int, add: list[EventCard], removed: set[int]) -> "Snapshot":
+        replaced = {card.id for card in add} | removed
+        drop = [self.by_id[card_id] for card_id in replaced if card_id in self.by_id]
+
+        by_id = dict(self.by_id)
+        for card_id in removed:
+            by_id.pop(card_id, None)
+        by_id.update((card.id, card) for card in add)
+
+        cards = _patched(self.cards, drop, add)
+        if len(drop) + len(add) > len(self.cards) * REBUILD_FRACTION:
+            live_starts = [card.start_dt for card in cards if card.is_live]
+            suggestions = SuggestionIndex.build(cards)
+        else:
+            live_starts = list(self.live_starts)
+            for card in drop:
+                if card.is_live:
+                    del live_starts[bisect_left(live_starts, card.start_dt)]
+            for card in add:
+                if card.is_live:
+                    insort(live_starts, card.start_dt)
+            suggestions = self.suggestions.patched(drop, add)
+
+        return Snapshot(
+            version,
+            by_id,
+            cards,
+            _patched_buckets(self.by_category, "category", drop, add),
+            _patched_buckets(self.by_city, "city", drop, add),
+            live_starts,
+            suggestions,
+        )
+
+    def nav_data(self, now: datetime) -> dict:
+        """The navigation bar's context, as ``views.nav_statements`` would give it."""
+        upcoming = len(self.live_starts) - bisect_left(self.live_starts, now)
+        return {"nav_categories": self.categories, "upcoming_event_count": upcoming}
+
+    def select(self, filters: dict, search_term: str, now: datetime) -> list[EventCard]:
+        """Cards matching the facet selection and search, in ``start_dt`` order."""
+        if filters["category"]:
+            sources = [self.by_category.get(value, []) for value in filters["category"]]
+        elif filters["city"]:
+            sources = [self.by_city.get(value, []) for value in filters["city"]]
+        else:
+            sources = [self.cards]
+
+        if filters["when"]:
+            slices = []
+            for value, _, lower, upper in DATE_WINDOWS:
+                if value not in filters["when"]:
+                    continue
+                for cards in sources:
+                    start = 0 if lower is None else bisect_left(
+                        cards, now + timedelta(days=lower), key=_starts
+                    )
+                    end = len(cards) if upper is None else bisect_left(
+                        cards, now + timedelta(days=upper), key=_starts
+                    )
+                    slices.append(cards[start:end])
+            sources = slices
+
+        cities = set(filters["city"]) if filters["category"] else None
+        statuses = set(filters["status"])
+        bands = [band for band in PRICE_BANDS if band[0] in filters["price"]]
+        needle = search_term.casefold()
+
+        matches = []
+        for card in heapq.merge(*sources, key=_order):
+            if cities and card.city not in cities:
+                continue
+            if statuses and card.status.name not in statuses:
+                continue
+            if bands and not any(
+                (lower is None or card.lowest_ticket_price >= lower)
+                and (upper is None or card.lowest_ticket_price < upper)
+                for _, _, lower, upper in bands
+            ):
+                continue
+            if needle and needle not in card.search_text:
+                continue
+            matches.append(card)
+        return matches
+
+
+def _card_statement():
+    tiers = tiers_subquery()
+    return db.select(
+        Event.id,
+        Event.title,
+        Event.category,
+        Event.image_url,
+        Event.venue,
+        Event.city,
+        Event.start_dt,
+        Event.status,
+        Event.updated_at,
+        func.coalesce(tiers.c.tier_price, Event.price).label("lowest_price"),
+    ).outerjoin(tiers, tiers.c.event_id == Event.id)
+
+
+def _fingerprints() -> list:
+    tiers = tiers_subquery()
+    return db.session.execute(
+        db.select(
+            Event.id,
+            Event.updated_at,
+            func.coalesce(tiers.c.tier_price, Event.price).label("lowest_price"),
+        ).outerjoin(tiers, tiers.c.event_id == Event.id)
+    ).all()
+
+
+def _reloaded(snapshot: Snapshot, version: int, changed: list, removed: set) -> Snapshot:
+    """``snapshot`` with the ``changed`` events reloaded and ``removed`` dropped."""
+    if len(changed) > len(snapshot.cards) * REBUILD_FRACTION:
+        cards = [EventCard(row) for row in db.session.execute(_card_statement())]
+        return Snapshot.empty().patched(version, cards, set())
+
+    cards = []
+    for start in range(0, len(changed), RELOAD_CHUNK):
+        chunk = changed[start : start + RELOAD_CHUNK]
+        stmt = _card_statement().where(Event.id.in_(chunk))
+        cards.extend(EventCard(row) for row in db.session.execute(stmt))
+    # Changed events that no longer load were deleted.
+    removed = removed | (set(changed) - {card.id for card in cards})
+    return snapshot.patched(version, cards, removed)
+
+
+def _rescanned(snapshot: Snapshot, version: int) -> Snapshot:
+    rows = _fingerprints()
+    known = snapshot.by_id
+    changed = [
+        row.id
+        for row in rows
+        if (card := known.get(row.id)) is None
+        or card.updated_at != row.updated_at
+        or card.lowest_ticket_price != row.lowest_price
+    ]
+    removed = known.keys() - {row.id for row in rows}
+    return _reloaded(snapshot, version, changed, removed)
+
+
+class ReadModel:
+    """Holds this worker's latest snapshot and decides when to refresh it."""
+
+    def __init__(self, max_staleness: float, log_retention: float) -> None:
+        self.max_staleness = max_staleness
+        self.log_retention = log_retention
+        self._snapshot: Snapshot | None = None
+        self._checked_at = 0.0
+        # The change log id this worker has applied up to, the ids below it
+        # that hadn't committed yet, and when it last read the log.
+        self._log_position = 0
+        self._log_holes: frozenset[int] = frozenset()
+        self._log_read_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, *, fresh: bool = False) -> Snapshot:
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and not fresh
+            and time.monotonic() - self._checked_at < self.max_staleness
+        ):
+            return snapshot
+        # One thread refreshes; the others keep serving the previous snapshot.
+        if not self._lock.acquire(blocking=snapshot is None or fresh):
+            return snapshot
+        try:
+            snapshot = self._snapshot or Snapshot.empty()
+            version = catalogue_version()
+            if version != snapshot.version:
+                snapshot = self._snapshot = self._refreshed(snapshot, version)
+            self._checked_at = time.monotonic()
+            return snapshot
+        finally:
+            self._lock.release()
+
+    def _advance(self, start: int, rows: list) -> None:
+        """Mark ``rows`` applied; ids after ``start`` that they lack are holes."""
+        found = {row.id for row in rows}
+        position = max(start, *found) if found else start
+        floor = position - LOG_OVERLAP
+        holes = (self._log_holes | set(range(max(start, floor) + 1, position + 1))) - found
+        self._log_position = position
+        self._log_holes = frozenset(hole for hole in holes if hole > floor)
+        self._log_read_at = time.monotonic()
+
+    def _refreshed(self, snapshot: Snapshot, version: int) -> Snapshot:
+        # Pruned rows would leave a gap after a long idle spell, so rescan then.
+        if (
+            snapshot.version is not None
+            and time.monotonic() - self._log_read_at < self.log_retention / 2
+        ):
+            start = self._log_position
+            rows = changes_after(start, self._log_holes)
+            if all(row.event_id is not None for row in rows):
+                self._advance(start, rows)
+                changed = list(dict.fromkeys(row.event_id for row in rows))
+                return _reloaded(snapshot, version, changed, set())
+
+        # Read before the scan, so whatever commits during it is re-read later.
+        start = max(0, log_position() - LOG_OVERLAP)
+        rows = changes_after(start)
+        self._log_holes = frozenset()
+        self._advance(start, rows)
+        return _rescanned(snapshot, version)
+
+
+def current() -> Snapshot | None:
+    """This worker's snapshot, or None when the read model is disabled."""
+    model = current_app.extensions.get("read_model")
+    if model is None:
+        return None
+    return model.current(fresh=routing.wants_primary())
+
+
+def init_app(app) -> None:
+    if app.config["READ_MODEL_ENABLED"]:
+        app.extensions["read_model"] = ReadModel(
+            app.config["READ_MODEL_MAX_STALENESS"], app.config["CATALOGUE_LOG_RETENTION"]
+        )
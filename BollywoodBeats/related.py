@@ -0,0 +1,296 @@
+"""
+"You might also like" neighbours for event detail pages.
+
+Scores are symmetric and built from shared category, shared city, price
+band and how close the two start dates are. Each event keeps its best
+``RELATED_EVENTS_STORED`` neighbours in ``related_events``; the detail page
+reads the top few with one lookup on ``ix_related_events_event_score``.
+
+An event is only scored against a bounded pool. The pool holds the
+``BUCKET_WINDOW`` events either side of it by start date in its category
+and in its city, plus the ``DATE_WINDOW`` nearest overall. A full rebuild
+is therefore O(n) scores rather than O(n^2 / buckets). Creating or editing
+an event loads only its own buckets and the dates around it, then
+refreshes the lists it can affect. ``flask rebuild-related`` recomputes
+everything, for example nightly, so lists that lost events to
+cancellation or time fill up again.
+"""
+
+import heapq
+import math
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from . import db
+from .aggregates import tiers_subquery
+from .models import Event, EventStatus, RelatedEvent
+
+CATEGORY_WEIGHT = 3.0
+CITY_WEIGHT = 2.0
+PRICE_WEIGHT = 1.0
+DATE_WEIGHT = 2.0
+# Start dates further apart than this contribute nothing.
+DATE_HORIZON_DAYS = 60
+# Events this close in the date-sorted order are always scored, whatever
+# their category or city, so every event gets some candidates.
+DATE_WINDOW = 10
+# Same-category and same-city events scored either side of an event by date.
+# Farther ones lose most of the date score, so they rarely make the top list.
+BUCKET_WINDOW = 25
+# Incremental updates also load events starting this close to a changed one.
+NEARBY_SPAN = timedelta(days=2)
+# Keeps ``IN (...)`` lists under SQLite's bound-parameter limit.
+QUERY_CHUNK = 500
+
+
+class Features(NamedTuple):
+    id: int
+    category: str | None
+    city: str | None
+    price_band: int
+    start_dt: datetime
+
+
+def _price_band(price) -> int:
+    # Roughly doubling bands: <$20, $20-40, $40-80, ...
+    price = float(price or 0)
+    return 0 if price < 20 else int(math.log2(price / 10))
+
+
+def score(a: Features, b: Features) -> float:
+    total = 0.0
+    if a.category and a.category == b.category:
+        total += CATEGORY_WEIGHT
+    if a.city and a.city == b.city:
+        total += CITY_WEIGHT
+    band_gap = abs(a.price_band - b.price_band)
+    if band_gap == 0:
+        total += PRICE_WEIGHT
+    elif band_gap == 1:
+        total += PRICE_WEIGHT / 2
+    days = abs((a.start_dt - b.start_dt).total_seconds()) / 86400
+    total += DATE_WEIGHT * max(0.0, 1 - days / DATE_HORIZON_DAYS)
+    return total
+
+
+def _candidates(now: datetime, *conditions) -> list[Features]:
+    """Features of the events worth recommending that match ``conditions``, by date."""
+    tiers = tiers_subquery()
+    rows = db.session.execute(
+        db.select(
+            Event.id,
+            Event.category,
+            Event.city,
+            sa.func.coalesce(tiers.c.tier_price, Event.price),
+            Event.start_dt,
+        )
+        .outerjoin(tiers, tiers.c.event_id == Event.id)
+        .where(Event.start_dt >= now, Event.status != EventStatus.CANCELLED, *conditions)
+        .order_by(Event.start_dt.asc(), Event.id.asc())
+    ).all()
+    return [
+        Features(row[0], row[1], row[2], _price_band(row[3]), row[4]) for row in rows
+    ]
+
+
+def _order(features: Features) -> tuple:
+    return (features.start_dt, features.id)
+
+
+class _Pools:
+    """Date-sorted candidates grouped by category and city, for bounded pools."""
+
+    def __init__(self, candidates: list[Features]) -> None:
+        self.candidates = candidates
+        self.by_category: dict[str, list[Features]] = defaultdict(list)
+        self.by_city: dict[str, list[Features]] = defaultdict(list)
+        for features in candidates:
+            self.by_category[features.category].append(features)
+            self.by_city[features.city].append(features)
+
+    @staticmethod
+    def _around(ordered: list[Features], event: Features, window: int) -> list[Features]:
+        position = bisect_left(ordered, _order(event), key=_order)
+        return ordered[max(0, position - window) : position + window + 1]
+
+    def pool(self, event: Features) -> list[Features]:
+        """The candidates ``event`` is scored against, itself excluded."""
+        pool = {
+            other.id: other
+            for other in (
+                *self._around(self.by_category[event.category], event, BUCKET_WINDOW),
+                *self._around(self.by_city[event.city], event, BUCKET_WINDOW),
+                *self._around(self.candidates, event, DATE_WINDOW),
+            )
+        }
+        pool.pop(event.id, None)
+        return list(pool.values())
+
+
+def _stored_limit() -> int:
+    return current_app.config["RELATED_EVENTS_STORED"]
+
+
+def _best(event: Features, candidates, limit: int) -> list[tuple[float, int]]:
+    scored = ((score(event, other), other.id) for other in candidates)
+    return heapq.nlargest(limit, (pair for pair in scored if pair[0] > 0))
+
+
+def refresh_event(event_id: int) -> None:
+    """Recompute ``event_id``'s list and insert it into its neighbours' lists."""
+    refresh_events([event_id])
+
+
+def refresh_events(event_ids: list[int]) -> None:
+    """``refresh_event`` for several events, such as a new series, in one pass."""
+    limit = _stored_limit()
+    now = datetime.utcnow()
+    changed = set(event_ids)
+    events = _candidates(now, Event.id.in_(changed))
+
+    # Old scores involving these events are stale, whatever they changed.
+    db.session.execute(
+        db.delete(RelatedEvent).where(
+            sa.or_(RelatedEvent.event_id.in_(changed), RelatedEvent.related_id.in_(changed))
+        )
+    )
+    if not events:  # past or cancelled: nothing to recommend them for
+        db.session.commit()
+        return
+
+    # Only the changed events' buckets and the dates around them can fill
+    # their pools, so nothing else is loaded.
+    pools = _Pools(
+        _candidates(
+            now,
+            sa.or_(
+                Event.category.in_({event.category for event in events} - {None}),
+                Event.city.in_({event.city for event in events}),
+                *(
+                    Event.start_dt.between(start - NEARBY_SPAN, start + NEARBY_SPAN)
+                    for start in {event.start_dt for event in events}
+                ),
+            ),
+        )
+    )
+    event_pools = {event.id: pools.pool(event) for event in events}
+    rows = [
+        {"event_id": event.id, "related_id": other_id, "score": value}
+        for event in events
+        for value, other_id in _best(event, event_pools[event.id], limit)
+    ]
+
+    # Scores are symmetric, so an event joins the list of any neighbour in
+    # its pool that it beats.
+    neighbours = {
+        other.id: other
+        for pool in event_pools.values()
+        for other in pool
+        if other.id not in changed
+    }
+    floors = {}
+    neighbour_ids = list(neighbours)
+    for start in range(0, len(neighbour_ids), QUERY_CHUNK):
+        chunk = neighbour_ids[start : start + QUERY_CHUNK]
+        floors.update(
+            (row.event_id, (row.count, row.floor))
+            for row in db.session.execute(
+                db.select(
+                    RelatedEvent.event_id,
+                    sa.func.count().label("count"),
+                    sa.func.min(RelatedEvent.score).label("floor"),
+                )
+                .where(RelatedEvent.event_id.in_(chunk))
+                .group_by(RelatedEvent.event_id)
+            )
+        )
+    affected = set()
+    for event in events:
+        for other in event_pools[event.id]:
+            if other.id in changed:
+                continue
+            count, floor = floors.get(other.id, (0, 0.0))
+            value = score(other, event)
+            if value > 0 and (count < limit or value > floor):
+                rows.append({"event_id": other.id, "related_id": event.id, "score": value})
+                affected.add(other.id)
+
+    if rows:
+        db.session.execute(db.insert(RelatedEvent), rows)
+    affected = list(affected)
+    for start in range(0, len(affected), QUERY_CHUNK):
+        _trim(affected[start : start + QUERY_CHUNK], limit)
+    db.session.commit()
+
+
+def _trim(event_ids: list[int], limit: int) -> None:
+    """Drop everything past the ``limit`` best rows of each listed event."""
+    ranked = (
+        db.select(
+            RelatedEvent.event_id,
+            RelatedEvent.related_id,
+            sa.func.row_number()
+            .over(partition_by=RelatedEvent.event_id, order_by=RelatedEvent.score.desc())
+            .label("rank"),
+        )
+        .where(RelatedEvent.event_id.in_(event_ids))
+        .subquery()
+    )
+    db.session.execute(
+        db.delete(RelatedEvent).where(
+            sa.tuple_(RelatedEvent.event_id, RelatedEvent.related_id).in_(
+                db.select(ranked.c.event_id, ranked.c.related_id).where(ranked.c.rank > limit)
+            )
+        )
+    )
+
+
+def rebuild_all() -> int:
+    """Recompute every list, scoring each event against its bounded pool only."""
+    limit = _stored_limit()
+    candidates = _candidates(datetime.utcnow())
+    pools = _Pools(candidates)
+
+    rows = []
+    for event in candidates:
+        rows.extend(
+            {"event_id": event.id, "related_id": other_id, "score": value}
+            for value, other_id in _best(event, pools.pool(event), limit)
+        )
+
+    db.session.execute(db.delete(RelatedEvent))
+    if rows:
+        db.session.execute(db.insert(RelatedEvent), rows)
+    db.session.commit()
+    return len(candidates)
+
+
+def related_statement(event_id: int, limit: int, now: datetime):
+    """Top ``limit`` upcoming neighbours of ``event_id``, best first."""
+    return (
+        db.select(Event)
+        .options(selectinload(Event.ticket_types))
+        .join(RelatedEvent, RelatedEvent.related_id == Event.id)
+        .where(
+            RelatedEvent.event_id == event_id,
+            Event.start_dt >= now,
+            Event.status != EventStatus.CANCELLED,
+        )
+        .order_by(RelatedEvent.score.desc())
+        .limit(limit)
+    )
+
+
+def init_app(app) -> None:
+    @app.cli.command("rebuild-related")
+    def rebuild_related_command():
+        """Recompute the related-events table from scratch."""
+        count = rebuild_all()
+        click.echo(f"Rebuilt related events for {count} event(s).")
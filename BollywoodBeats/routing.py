@@ -0,0 +1,146 @@
+"""
+Read/write engine routing for read replicas.
+
+Replicas are ordinary Flask-SQLAlchemy binds listed in ``READ_REPLICAS``.
+Views marked with :func:`read_replica` (and the navigation data) send their
+SELECTs to a healthy replica; everything else, every flush and every
+statement after this request or a recent POST wrote, goes to the primary.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import click
+import sqlalchemy as sa
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+SESSION_KEY = "primary_until"
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping ones that fail health checks."""
+
+    def __init__(self, keys: list[str], check_interval: float) -> None:
+        self.keys = keys
+        self.check_interval = check_interval
+        self._health: dict[str, tuple[bool, float]] = {}
+        self._cycle = itertools.cycle(keys) if keys else None
+        self._lock = threading.Lock()
+
+    def _healthy(self, key: str, engine) -> bool:
+        now = time.monotonic()
+        healthy, checked_at = self._health.get(key, (True, float("-inf")))
+        if now - checked_at < self.check_interval:
+            return healthy
+        try:
+            with engine.connect() as conn:
+                conn.execute(sa.text("SELECT 1"))
+            healthy = True
+        except sa.exc.DBAPIError:
+            current_app.logger.warning("Read replica %r failed its health check.", key)
+            healthy = False
+        self._health[key] = (healthy, now)
+        return healthy
+
+    def choose_key(self, engines) -> str | None:
+        """Return a healthy replica's bind key, or None to fall back to the primary."""
+        if self._cycle is None:
+            return None
+        for _ in range(len(self.keys)):
+            with self._lock:
+                key = next(self._cycle)
+            if self._healthy(key, engines[key]):
+                return key
+        return None
+
+    def choose(self, engines):
+        """Return a healthy replica engine, or None to fall back to the primary."""
+        key = self.choose_key(engines)
+        return None if key is None else engines[key]
+
+
+class RoutingSession(Session):
+    """``db.session`` class that can divert default-bind reads to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if (
+            bind is not None
+            or self._flushing
+            or isinstance(clause, sa.sql.expression.UpdateBase)
+            or self.info.get("wrote")
+            or not has_request_context()
+            or not g.get("use_replica")
+            or engine is not self._db.engines.get(None)
+        ):
+            return engine
+        replicas = current_app.extensions.get("read_replicas")
+        replica = replicas.choose(self._db.engines) if replicas else None
+        return replica or engine
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _mark_wrote(session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+def wants_primary() -> bool:
+    # Read-your-writes: shortly after a POST this client reads from the primary.
+    until = session.get(SESSION_KEY)
+    return until is not None and until > time.time()
+
+
+def read_replica(view):
+    """Route this view's reads to a replica when one is configured."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = not wants_primary()
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def replica_reads():
+    """Temporarily allow replica reads, e.g. for navigation data on any page."""
+    previous = g.get("use_replica", False)
+    g.use_replica = not wants_primary()
+    try:
+        yield
+    finally:
+        g.use_replica = previous
+
+
+def init_app(app, db) -> None:
+    keys = list(app.config["READ_REPLICAS"])
+    app.extensions["read_replicas"] = ReplicaSet(
+        keys, app.config["READ_REPLICA_HEALTH_INTERVAL"]
+    )
+
+    @app.after_request
+    def pin_primary_after_write(response):
+        if request.method != "GET" and db.session.info.get("wrote"):
+            session[SESSION_KEY] = time.time() + app.config["READ_YOUR_WRITES_SECONDS"]
+        return response
+
+    @app.cli.command("sync-replicas")
+    def sync_replicas():
+        """Copy the primary SQLite file onto each SQLite replica (dev stand-in)."""
+        primary = db.engines[None]
+        for key in keys:
+            replica = db.engines[key]
+            if primary.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+                raise click.ClickException("sync-replicas only supports SQLite files.")
+            source = primary.raw_connection()
+            target = replica.raw_connection()
+            try:
+                source.driver_connection.backup(target.driver_connection)
+            finally:
+                source.close()
+                target.close()
+            click.echo(f"Synced replica '{key}'.")
@@ -0,0 +1,151 @@
+"""Database bootstrap: create tables and seed the demo catalogue."""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from . import archive, changes, db, related
+from .models import Event, EventStatus, RelatedEvent, User
+
+
+def init_database() -> None:
+    """Create missing tables on the primary and seed the demo catalogue."""
+    # Only the primary and the archive; replicas are copies maintained outside the app.
+    db.create_all(bind_key=[None, "archive"])
+    seed_demo_data()
+    changes.ensure_counters()
+    if db.session.scalar(db.select(RelatedEvent.event_id).limit(1)) is None:
+        related.rebuild_all()
+
+
+def seed_demo_data() -> None:
+    """Idempotently add the demo owner and any missing demo events."""
+    demo_owner = db.session.scalar(
+        db.select(User).where(User.username == "demo_owner")
+    )
+    if demo_owner is None:
+        # Seed a predictable owner so the catalogue and tests have data.
+        demo_owner = User(
+            first_name="Bollywood",
+            last_name="Beats",
+            username="demo_owner",
+            email="demo@bollywoodbeats.com",
+            contact_number="0000000000",
+            street_address="Online Only",
+        )
+        demo_owner.set_password("demo1234")
+        db.session.add(demo_owner)
+        db.session.flush()
+
+    now = datetime.utcnow()
+    demo_events_data = [
+        {
+            "title": "Bollywood Night Live",
+            "category": "Bollywood",
+            "description": "A high-energy evening featuring the best Bollywood hits with live dancers and an immersive light show.",
+            "image_url": "concert1.jpg",
+            "venue": "Sydney Opera House",
+            "city": "Sydney",
+            "start_dt": now + timedelta(days=14),
+            "capacity": 250,
+            "price": Decimal("79.00"),
+            "status": EventStatus.OPEN,
+        },
+        {
+            "title": "Desi Beats Festival",
+            "category": "EDM",
+            "description": "A fusion night of desi EDM with top DJs and surprise guest performers keeping the dance floor packed till late.",
+            "image_url": "concert4.jpg",
+            "venue": "The Forum",
+            "city": "Melbourne",
+            "start_dt": now + timedelta(days=30),
+            "capacity": 0,
+            "price": Decimal("65.00"),
+            "status": EventStatus.SOLD_OUT,
+        },
+        {
+            "title": "Classical Raagas Evening",
+            "category": "Classical",
+            "description": "An intimate concert celebrating timeless raagas with renowned vocalists and instrumental maestros.",
+            "image_url": "concert3.jpg",
+            "venue": "QPAC Concert Hall",
+            "city": "Brisbane",
+            "start_dt": datetime(2026, 1, 1, 18, 0),
+            "capacity": 180,
+            "price": Decimal("45.00"),
+            "status": EventStatus.OPEN,
+        },
+        {
+            "title": "Sufi Soul Sessions",
+            "category": "Sufi",
+            "description": "Experience a spiritual evening of qawwali-inspired vocals and traditional instrumentation in an intimate setting.",
+            "image_url": "concert2.jpg",
+            "venue": "State Theatre",
+            "city": "Sydney",
+            "start_dt": now + timedelta(days=21),
+            "capacity": 220,
+            "price": Decimal("55.00"),
+            "status": EventStatus.OPEN,
+        },
+        {
+            "title": "Bollywood Beats Brunch",
+            "category": "Fusion",
+            "description": "A daytime brunch party with live DJs spinning Bollywood remixes, dance workshops and street-food pop-ups.",
+            "image_url": "concert5.jpg",
+            "venue": "Howard Smith Wharves",
+            "city": "Brisbane",
+            "start_dt": now + timedelta(days=7, hours=5),
+            "capacity": 150,
+            "price": Decimal("39.00"),
+            "status": EventStatus.OPEN,
+        },
+        {
+            "title": "Monsoon Melodies Tour",
+            "category": "Folk",
+            "description": "Celebrate the sounds of the monsoon with folk artists from across India showcasing regional instruments and storytelling.",
+            "image_url": "concert6.jpg",
+            "venue": "Thebarton Theatre",
+            "city": "Adelaide",
+            "start_dt": now + timedelta(days=45),
+            "capacity": 300,
+            "price": Decimal("49.00"),
+            "status": EventStatus.OPEN,
+        },
+        {
+            "title": "Desi Comedy Night",
+            "category": "Comedy",
+            "description": "An evening of stand-up featuring Australian-Indian comedians delivering desi humour, improv and audience roasting.",
+            "image_url": "concert7.jpg",
+            "venue": "Comedy Republic",
+            "city": "Melbourne",
+            "start_dt": now - timedelta(days=2),
+            "capacity": 120,
+            "price": Decimal("30.00"),
+            "status": EventStatus.CANCELLED,
+        },
+    ]
+
+    existing_titles = set(
+        db.session.scalars(
+            db.select(Event.title).where(Event.owner_id == demo_owner.id)
+        ).all()
+    )
+    # Archived demo events count as present, or every boot would re-create them.
+    existing_titles.update(
+        archive.read(
+            db.select(archive.events.c.title).where(archive.events.c.owner_id == demo_owner.id)
+        ).scalars()
+    )
+    new_events = []
+    for event_data in demo_events_data:
+        if event_data["title"] in existing_titles:
+            continue
+        # Store the raw dictionary so SQLAlchemy assigns defaults (e.g. relationships).
+        new_events.append(
+            Event(
+                owner_id=demo_owner.id,
+                **event_data,
+            )
+        )
+    if new_events:
+        db.session.add_all(new_events)
+        db.session.commit()
@@ -0,0 +1,194 @@
+"""
+Recurring events and tours, created, edited and cancelled as one series.
+
+``create_series`` writes the ``EventSeries`` row, every ``Event`` and every
+``TicketType`` in one transaction. However many dates the series has, that
+takes one batched INSERT per table. All dates share the image the view
+stored once.
+
+Edits and cancellations are set-based UPDATEs over ``events.series_id``.
+They only touch dates that haven't started and aren't cancelled, so past
+shows keep the details they ran with. Single dates can still be edited on
+their own afterwards.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import selectinload
+
+from . import db, live, related
+from .models import Event, EventSeries, EventStatus, TicketType
+
+MAX_OCCURRENCES = 100
+REPEAT_STEPS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "fortnightly": timedelta(weeks=2),
+}
+# Columns an edit copies onto every upcoming date of the series.
+SHARED_FIELDS = (
+    "title",
+    "category",
+    "description",
+    "image_url",
+    "venue",
+    "city",
+    "capacity",
+    "price",
+)
+
+
+def _add_months(start: datetime, months: int) -> datetime:
+    month = start.month - 1 + months
+    year, month = start.year + month // 12, month % 12 + 1
+    # The 31st falls back to the last day of shorter months.
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def _parse_date(line: str, first: datetime) -> datetime:
+    text = line.strip().replace("T", " ")
+    try:
+        if len(text) == 10:  # a bare date plays at the first date's time
+            return datetime.combine(datetime.fromisoformat(text).date(), first.time())
+        return datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f'"{line.strip()}" is not a date like 2025-11-21 or 2025-11-21 19:30.')
+
+
+def expand(first: datetime, repeat: str, count: int | None, dates: str | None) -> list[datetime]:
+    """
+    Start times for a series, from ``first`` and either a repeat rule with a
+    ``count`` of dates or, for ``repeat="dates"``, one extra date per line.
+
+    Raises ValueError with a message for the form when the dates don't make
+    a valid series.
+    """
+    if repeat == "dates":
+        lines = [line for line in (dates or "").splitlines() if line.strip()]
+        starts = [first, *(_parse_date(line, first) for line in lines)]
+    elif repeat == "monthly":
+        starts = [_add_months(first, offset) for offset in range(count or 0)]
+    elif repeat in REPEAT_STEPS:
+        starts = [first + REPEAT_STEPS[repeat] * offset for offset in range(count or 0)]
+    else:
+        raise ValueError("Choose how the series repeats.")
+
+    starts = sorted(set(starts))
+    if len(starts) < 2:
+        raise ValueError("A series needs at least two dates.")
+    if len(starts) > MAX_OCCURRENCES:
+        raise ValueError(f"A series can have at most {MAX_OCCURRENCES} dates.")
+    if starts[0] <= datetime.utcnow():
+        raise ValueError("Every date in the series must be in the future.")
+    return starts
+
+
+def create_series(
+    owner_id: int, fields: dict, tiers: list[dict], starts: list[datetime]
+) -> tuple[EventSeries, list[int]]:
+    """
+    Create one event per start time, each with a copy of ``tiers``.
+
+    ``fields`` holds the ``SHARED_FIELDS`` values. Returns the series and
+    the new event ids in date order.
+    """
+    series = EventSeries(owner_id=owner_id, title=fields["title"])
+    db.session.add(series)
+    db.session.flush()
+
+    # Without RETURNING, SQLite runs this as one multi-row INSERT.
+    db.session.execute(
+        db.insert(Event),
+        [
+            {
+                **fields,
+                "start_dt": start,
+                "status": EventStatus.OPEN,
+                "owner_id": owner_id,
+                "series_id": series.id,
+            }
+            for start in starts
+        ],
+    )
+    event_ids = db.session.scalars(
+        db.select(Event.id).where(Event.series_id == series.id).order_by(Event.start_dt.asc())
+    ).all()
+    if tiers:
+        db.session.execute(
+            db.insert(TicketType),
+            [{**tier, "event_id": event_id} for event_id in event_ids for tier in tiers],
+        )
+    db.session.commit()
+    related.refresh_events(event_ids)
+    return series, event_ids
+
+
+def _upcoming(series_id: int, now: datetime) -> tuple:
+    return (
+        Event.series_id == series_id,
+        Event.start_dt > now,
+        Event.status != EventStatus.CANCELLED,
+    )
+
+
+def update_series(series: EventSeries, fields: dict, tiers: list[dict]) -> list[int]:
+    """
+    Copy ``fields`` and a fresh set of ``tiers`` onto every upcoming date.
+
+    Returns the ids of the events that changed.
+    """
+    now = datetime.utcnow()
+    event_ids = db.session.scalars(
+        db.update(Event).where(*_upcoming(series.id, now)).values(**fields).returning(Event.id)
+    ).all()
+    series.title = fields["title"]
+    if not event_ids:
+        db.session.commit()
+        return []
+
+    # Tiers are rebuilt from scratch, as on the single-event edit page.
+    db.session.execute(db.delete(TicketType).where(TicketType.event_id.in_(event_ids)))
+    if tiers:
+        db.session.execute(
+            db.insert(TicketType),
+            [{**tier, "event_id": event_id} for event_id in event_ids for tier in tiers],
+        )
+
+    # New capacities can sell dates out (or reopen them); one batched load re-syncs them.
+    events = db.session.scalars(
+        db.select(Event)
+        .options(
+            selectinload(Event.ticket_types),
+            selectinload(Event.bookings),
+            selectinload(Event.holds),
+        )
+        .where(Event.id.in_(event_ids))
+        .execution_options(populate_existing=True)
+    ).all()
+    for event in events:
+        event.refresh_status(now=now)
+    db.session.commit()
+
+    for event_id in event_ids:
+        live.publish_event_snapshot(event_id)
+    related.refresh_events(event_ids)
+    return event_ids
+
+
+def cancel_series(series: EventSeries) -> list[int]:
+    """Cancel every upcoming date in one UPDATE; returns the cancelled ids."""
+    event_ids = db.session.scalars(
+        db.update(Event)
+        .where(*_upcoming(series.id, datetime.utcnow()))
+        .values(status=EventStatus.CANCELLED)
+        .returning(Event.id)
+    ).all()
+    db.session.commit()
+    for event_id in event_ids:
+        live.publish_event_snapshot(event_id)
+    if event_ids:
+        # Cancelled events drop out of everyone's recommendations.
+        related.refresh_events(event_ids)
+    return event_ids
@@ -0,0 +1,127 @@
+"""
+Production entry point: ``python -m BollywoodBeats.serve``.
+
+Runs the app under Gunicorn with one process per core (times ``SERVER_THREADS``
+threads each) so a box's CPUs are all used. Every setting comes from the
+environment, with command-line flags taking precedence:
+
+    SERVER_BIND               host:port to listen on (default 0.0.0.0:8000)
+    SERVER_WORKERS            worker processes; 0 sizes to 2 x cores + 1
+    SERVER_THREADS            threads per worker (default 4)
+    SERVER_TIMEOUT            seconds without a heartbeat before a worker is
+                              restarted (default 30); see below
+    SERVER_GRACEFUL_TIMEOUT   seconds in-flight requests get on reload/stop (default 30)
+    SERVER_KEEPALIVE          keep-alive seconds for idle connections (default 5)
+    SERVER_MAX_REQUESTS       recycle a worker after this many requests (default 2000)
+    SERVER_PRELOAD            build the app once in the master (default 1)
+    LIVE_MAX_STREAMS          live event-page streams per worker (default: half
+                              the threads, so streams never take every thread)
+
+With preload the app, its templates and imports are created before forking,
+so workers share those pages copy-on-write. Send ``HUP`` to the master for a
+graceful worker restart. For a code deploy with preload on, send ``USR2``,
+then ``WINCH`` and ``QUIT`` to the old master, so no request is dropped.
+
+``SERVER_TIMEOUT`` is not a per-request limit. gthread workers send their
+heartbeat from the main loop, so the timeout only catches a whole worker
+that has wedged. A single request hanging in one thread runs on, holding
+that thread. Bound slow requests at the reverse proxy (e.g. nginx
+``proxy_read_timeout``) and slow queries in the database (e.g. a PostgreSQL
+``statement_timeout`` on the app's role).
+"""
+
+import argparse
+import multiprocessing
+import os
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError as exc:  # pragma: no cover - gunicorn is POSIX only
+    raise SystemExit("BollywoodBeats.serve needs gunicorn (pip install gunicorn).") from exc
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def default_workers() -> int:
+    """Gunicorn's rule of thumb: enough processes to keep every core busy."""
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+def server_options(args: argparse.Namespace) -> dict:
+    workers = args.workers if args.workers is not None else _env_int("SERVER_WORKERS", 0)
+    threads = args.threads if args.threads is not None else _env_int("SERVER_THREADS", 4)
+    preload = os.environ.get("SERVER_PRELOAD", "1") == "1" and not args.no_preload
+    return {
+        "bind": args.bind or os.environ.get("SERVER_BIND", "0.0.0.0:8000"),
+        "workers": workers or default_workers(),
+        "threads": threads,
+        "worker_class": "gthread" if threads > 1 else "sync",
+        "timeout": _env_int("SERVER_TIMEOUT", 30),
+        "graceful_timeout": _env_int("SERVER_GRACEFUL_TIMEOUT", 30),
+        "keepalive": _env_int("SERVER_KEEPALIVE", 5),
+        "max_requests": _env_int("SERVER_MAX_REQUESTS", 2000),
+        # Jitter keeps all workers from recycling at the same moment.
+        "max_requests_jitter": _env_int("SERVER_MAX_REQUESTS", 2000) // 10,
+        "preload_app": preload,
+        "post_fork": post_fork,
+        "accesslog": "-",
+    }
+
+
+def post_fork(server, worker) -> None:
+    """Drop state that must not be shared across a fork."""
+    app = server.app.wsgi()
+    from . import db, live, metrics
+
+    with app.app_context():
+        # Pooled connections opened in the master would be shared by every child.
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    # Stream slots and the Redis relay belong to one process; give each worker its own.
+    live.init_app(app)
+    if "metrics" in app.extensions:
+        # Each worker reports under its own pid from here on.
+        app.extensions["metrics"].after_fork()
+
+
+class BollywoodBeatsServer(BaseApplication):
+    def __init__(self, options: dict) -> None:
+        self.options = options
+        self.application = None
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        if self.application is None:
+            from . import create_app
+
+            # The bootstrap belongs to `flask init-db`, not to every worker boot.
+            os.environ.setdefault("INIT_DB_ON_STARTUP", "0")
+            # Each live stream pins a thread; single-threaded workers only poll.
+            os.environ.setdefault("LIVE_MAX_STREAMS", str(self.options["threads"] // 2))
+            self.application = create_app()
+        return self.application
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve Bollywood Beats with Gunicorn.")
+    parser.add_argument("--bind", help="host:port (SERVER_BIND)")
+    parser.add_argument("--workers", type=int, help="worker processes, 0 = auto (SERVER_WORKERS)")
+    parser.add_argument("--threads", type=int, help="threads per worker (SERVER_THREADS)")
+    parser.add_argument("--no-preload", action="store_true", help="build the app in each worker")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("SECRET_KEY"):
+        # Without a shared key each worker would reject the others' session cookies.
+        raise SystemExit("Set SECRET_KEY before starting multiple workers.")
+
+    BollywoodBeatsServer(server_options(args)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Startup-time instrumentation and the ``flask startup-report`` command.
+
+``create_app`` records how long each init phase takes. The report runs a
+cold import + ``create_app`` in a fresh interpreter with ``-X importtime`` so
+module import costs and init phases can be compared side by side, and it
+exits non-zero when the total exceeds ``STARTUP_BUDGET_MS`` so CI can catch
+regressions.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import click
+
+# Packages worth calling out individually in the import breakdown.
+REPORTED_PACKAGES = (
+    "flask",
+    "werkzeug",
+    "jinja2",
+    "sqlalchemy",
+    "flask_sqlalchemy",
+    "flask_login",
+    "flask_bootstrap",
+    "flask_wtf",
+    "wtforms",
+    "email_validator",
+    "orjson",
+    "itsdangerous",
+)
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from BollywoodBeats import create_app
+imported = time.perf_counter()
+app = create_app()
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (finished - imported) * 1000,
+    "phases": app.extensions["startup_profile"].phases,
+}))
+"""
+
+
+class StartupProfile:
+    """Collects ``(phase name, milliseconds)`` pairs while the app is built."""
+
+    def __init__(self) -> None:
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - started) * 1000))
+
+
+def _parse_importtime(stderr: str) -> dict[str, float]:
+    """Cumulative import time (ms) for each top-level package."""
+    totals: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        module = name.strip()
+        top = module.split(".")[0]
+        if module == top or (top == "BollywoodBeats" and module.count(".") == 1):
+            key = module
+            totals[key] = max(totals.get(key, 0.0), int(cumulative) / 1000)
+    return totals
+
+
+def init_app(app) -> None:
+    @app.cli.command("startup-report")
+    @click.option("--budget-ms", type=float, default=None, help="Fail when cold start exceeds this.")
+    def startup_report(budget_ms):
+        """Break down cold-start time by import and init phase."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(app.root_path),
+        )
+        if result.returncode != 0:
+            raise click.ClickException(result.stderr.strip().splitlines()[-1])
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = _parse_importtime(result.stderr)
+
+        click.echo("Imports (cumulative, ms)")
+        for name in REPORTED_PACKAGES + tuple(sorted(k for k in imports if "." in k)):
+            if name in imports:
+                click.echo(f"  {name:<28}{imports[name]:9.1f}")
+        click.echo("create_app phases (ms)")
+        for name, elapsed in report["phases"]:
+            click.echo(f"  {name:<28}{elapsed:9.1f}")
+
+        total = report["import_ms"] + report["create_app_ms"]
+        click.echo(
+            f"Total: {total:.1f} ms (import {report['import_ms']:.1f}, "
+            f"create_app {report['create_app_ms']:.1f})"
+        )
+
+        budget = budget_ms if budget_ms is not None else app.config["STARTUP_BUDGET_MS"]
+        if budget and total > budget:
+            raise click.ClickException(f"Startup took {total:.1f} ms, over the {budget:.0f} ms budget.")
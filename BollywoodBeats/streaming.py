@@ -0,0 +1,49 @@
+"""
+Chunked HTML rendering for the long listing pages.
+
+Jinja yields one string per template node, which would mean thousands of
+tiny writes; ``stream_page`` coalesces them into ``STREAM_CHUNK_SIZE``
+pieces. Rows come from a ``yield_per`` cursor so only one batch of ORM
+objects is alive at a time instead of the whole catalogue.
+"""
+
+from flask import Response, current_app, get_flashed_messages, render_template, stream_template
+
+from . import db
+
+
+def iter_scalars(stmt):
+    """Lazily yield ORM objects from ``stmt`` in ``STREAM_YIELD_PER`` batches."""
+    batch = current_app.config["STREAM_YIELD_PER"]
+    yield from db.session.scalars(stmt.execution_options(yield_per=batch))
+
+
+def _coalesce(pieces, size: int):
+    buffer: list[str] = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_page(template_name: str, **context) -> Response:
+    """
+    Render ``template_name`` as a chunked response (or in one go if disabled).
+
+    Templates must loop with ``{% for %}…{% else %}`` rather than testing the
+    iterable first, since a lazy iterator is always truthy.
+    """
+    config = current_app.config
+    if not config["STREAM_LISTINGS"]:
+        return render_template(template_name, **context)
+
+    # Pop flashes now: once the body starts, the session cookie can't change.
+    get_flashed_messages()
+    pieces = stream_template(template_name, **context)
+    return Response(_coalesce(pieces, config["STREAM_CHUNK_SIZE"]), mimetype="text/html")
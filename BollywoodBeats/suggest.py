@@ -0,0 +1,160 @@
+"""
+Search-as-you-type suggestions from an in-memory prefix index.
+
+Every read model snapshot (see readmodel.py) carries a ``SuggestionIndex``.
+The index is patched with the same changed events as the snapshot, so it
+follows event writes without queries of its own.
+
+Titles, categories, cities and venues of events that aren't cancelled are
+indexed under every word they contain, so "tour" finds "World Tour". The
+keys are casefolded and kept in two sorted lists, one for titles and one
+for the other kinds, so a prefix lookup is a few bisects plus a scan. The
+index counts how many events use each value. Lookups rank every matching
+category, city and venue by that count, and list titles alphabetically
+from a scan that stops once enough are found.
+"""
+
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import NamedTuple
+
+KINDS = ("title", "category", "city", "venue")
+
+
+class Suggestion(NamedTuple):
+    kind: str
+    text: str
+    events: int
+    # Set for a title used by exactly one event, so it can link straight to it.
+    event_id: int | None
+
+
+def _terms(card) -> list[tuple[str, str]]:
+    return [(kind, value) for kind in KINDS if (value := getattr(card, kind))]
+
+
+def _keys(text: str) -> set[str]:
+    """``text`` casefolded, from the start of each of its words."""
+    folded = text.casefold()
+    return {
+        folded[i:]
+        for i, char in enumerate(folded)
+        if char.isalnum() and (i == 0 or not folded[i - 1].isalnum())
+    }
+
+
+def _span(keys: list, needle: str) -> slice:
+    """The entries of the sorted ``keys`` whose key starts with ``needle``."""
+    start = bisect_left(keys, (needle,))
+    return slice(start, bisect_left(keys, (needle + "\U0010ffff",), start))
+
+
+class SuggestionIndex:
+    """One immutable version of the prefix index."""
+
+    __slots__ = ("title_keys", "value_keys", "counts", "title_ids")
+
+    def __init__(self, title_keys: list, value_keys: list, counts: dict, title_ids: dict) -> None:
+        # Sorted (key, kind, text) entries, one per word of each distinct value.
+        # Titles are kept apart: there can be one per event, while categories,
+        # cities and venues are few enough to rank in full on every lookup.
+        self.title_keys = title_keys
+        self.value_keys = value_keys
+        self.counts = counts
+        self.title_ids = title_ids
+
+    @classmethod
+    def empty(cls) -> "SuggestionIndex":
+        return cls([], [], {}, {})
+
+    @classmethod
+    def build(cls, cards) -> "SuggestionIndex":
+        counts: Counter = Counter()
+        title_ids = defaultdict(set)
+        for card in cards:
+            if card.is_live:
+                counts.update(_terms(card))
+                title_ids[card.title].add(card.id)
+        title_keys, value_keys = [], []
+        for kind, text in counts:
+            keys = title_keys if kind == "title" else value_keys
+            keys.extend((key, kind, text) for key in _keys(text))
+        return cls(
+            sorted(title_keys),
+            sorted(value_keys),
+            dict(counts),
+            {t: frozenset(ids) for t, ids in title_ids.items()},
+        )
+
+    def patched(self, drop: list, add: list) -> "SuggestionIndex":
+        """A copy without the ``drop`` cards' terms and with the ``add`` cards' terms."""
+        delta: Counter = Counter()
+        id_changes = defaultdict(lambda: (set(), set()))
+        for index, cards in enumerate((drop, add)):
+            sign = 1 if index else -1
+            for card in cards:
+                if card.is_live:
+                    for term in _terms(card):
+                        delta[term] += sign
+                    id_changes[card.title][index].add(card.id)
+
+        title_keys, value_keys = list(self.title_keys), list(self.value_keys)
+        counts = dict(self.counts)
+        for term, change in delta.items():
+            keys = title_keys if term[0] == "title" else value_keys
+            before = counts.get(term, 0)
+            after = before + change
+            if after > 0:
+                counts[term] = after
+            else:
+                counts.pop(term, None)
+            if before <= 0 < after:
+                for key in _keys(term[1]):
+                    insort(keys, (key, *term))
+            elif after <= 0 < before:
+                for key in _keys(term[1]):
+                    del keys[bisect_left(keys, (key, *term))]
+
+        title_ids = dict(self.title_ids)
+        for title, (removed, added) in id_changes.items():
+            ids = (title_ids.get(title, frozenset()) - removed) | added
+            if ids:
+                title_ids[title] = ids
+            else:
+                title_ids.pop(title, None)
+        return SuggestionIndex(title_keys, value_keys, counts, title_ids)
+
+    def lookup(self, prefix: str, limit: int) -> list[Suggestion]:
+        """
+        Up to ``limit`` suggestions for ``prefix``: the most used matching
+        categories, cities and venues, then matching titles. Neither group
+        takes more than half the slots while the other can fill them.
+        """
+        needle = " ".join(prefix.casefold().split())
+        if not needle or limit <= 0:
+            return []
+
+        values = {}
+        for _, kind, text in self.value_keys[_span(self.value_keys, needle)]:
+            values.setdefault((kind, text), self.counts[(kind, text)])
+
+        # At most ``limit`` titles can be shown, so stop there: one-letter
+        # prefixes stay as fast as long ones however many titles match.
+        titles = {}
+        span = _span(self.title_keys, needle)
+        for index in range(span.start, span.stop):
+            if len(titles) == limit:
+                break
+            _, kind, text = self.title_keys[index]
+            titles.setdefault((kind, text), self.counts[(kind, text)])
+
+        ranked = sorted(values.items(), key=lambda item: (-item[1], item[0][1].casefold()))
+        value_slots = min(len(ranked), max(limit - len(titles), limit // 2))
+        suggestions = [
+            Suggestion(kind, text, count, None) for (kind, text), count in ranked[:value_slots]
+        ]
+        for (kind, text), count in list(titles.items())[: limit - value_slots]:
+            ids = self.title_ids.get(text, ())
+            event_id = next(iter(ids)) if len(ids) == 1 else None
+            suggestions.append(Suggestion(kind, text, count, event_id))
+        return suggestions
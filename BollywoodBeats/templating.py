@@ -0,0 +1,36 @@
+"""Persistent Jinja bytecode cache and template warm-up for new workers."""
+
+import os
+import time
+
+import click
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_app(app) -> None:
+    cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"] or os.path.join(
+        app.instance_path, "jinja_cache"
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    # Compiled templates survive restarts and are shared by every worker on the box.
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    if app.config["TEMPLATE_WARMUP"]:
+        warm_templates(app)
+
+    @app.cli.command("warm-templates")
+    def warm_templates_command():
+        """Compile every template into the bytecode cache."""
+        started = time.perf_counter()
+        count = warm_templates(app)
+        elapsed = (time.perf_counter() - started) * 1000
+        click.echo(f"Compiled {count} templates in {elapsed:.1f} ms.")
+
+
+def warm_templates(app) -> int:
+    """Load every template once so the first real request doesn't compile them."""
+    env = app.jinja_env
+    names = [name for name in env.list_templates() if name.endswith(".html")]
+    for name in names:
+        env.get_template(name)
+    return len(names)
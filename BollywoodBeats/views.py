@@ -7,6 +7,7 @@ from uuid import uuid4
 
 from flask import (
     Blueprint,
+    Response,
     render_template,
     request,
     redirect,
@@ -14,11 +15,21 @@ from flask import (
     flash,
     abort,
     current_app,
+    jsonify,
 )
 from flask_login import current_user, login_required, logout_user
+from sqlalchemy import case, func, type_coerce
 from sqlalchemy.orm import selectinload
 
-from . import db
+from . import (
+    archive, calendars, db, deletion, facets, holds, identity, live, readmodel, related,
+    series, waiting_room,
+)
+from .idempotency import idempotent
+from .pagination import decode_cursor, encode_cursor
+from .ratelimit import rate_limit
+from .routing import read_replica
+from .streaming import iter_scalars, stream_page
 from .forms import (
     UpdateAccountForm,
     DeleteAccountForm,
@@ -26,13 +37,17 @@ from .forms import (
     EventUpdateForm,
     DeleteEventForm,
     CancelEventForm,
+    EventSeriesForm,
+    EventSeriesUpdateForm,
+    CancelSeriesForm,
     BookingForm,
+    CheckoutForm,
     CommentForm,
-    EVENT_CATEGORY_CHOICES,
 )
 from .models import (
     User,
     Event,
+    EventSeries,
     EventStatus,
     TicketType,
     Booking,
@@ -41,6 +56,9 @@ from .models import (
 
 main_bp = Blueprint("main", __name__)
 
+HISTORY_PAGE_SIZE = 25
+MAX_SUGGEST_PREFIX = 80
+
 
 def _generate_order_id() -> str:
     """Create a short uppercase code suitable for showing to attendees."""
@@ -61,56 +79,131 @@ def _sync_event_statuses(events: list[Event]) -> None:
         db.session.commit()
 
 
-@main_bp.route("/")
-@main_bp.route("/home")
-def index():
-    selected_category = request.args.get("category", "All")
-    search_term = (request.args.get("q") or "").strip()
+def nav_statements(now: datetime):
+    """Queries behind the navigation bar, shared by the sync and async paths."""
+    categories_stmt = (
+        db.select(Event.category)
+        .where(Event.category.isnot(None))
+        .distinct()
+        .order_by(Event.category.asc())
+    )
+    upcoming_count_stmt = (
+        db.select(func.count())
+        .select_from(Event)
+        .where(
+            Event.start_dt.isnot(None),
+            Event.start_dt >= now,
+            Event.status != EventStatus.CANCELLED,
+        )
+    )
+    return categories_stmt, upcoming_count_stmt
+
 
+def _index_statement(filters: dict, search_term: str):
+    # Cards only show the cheapest tier, so bookings are never loaded here.
     stmt = (
         db.select(Event)
-        .options(
-            selectinload(Event.ticket_types),
-            selectinload(Event.bookings),
-        )
+        .options(selectinload(Event.ticket_types))
         .order_by(Event.start_dt.asc())
     )
-    if selected_category != "All":
-        stmt = stmt.where(Event.category == selected_category)
+    stmt = facets.apply_filters(stmt, filters, datetime.utcnow())
     if search_term:
-        stmt = stmt.where(Event.title.ilike(f"%{search_term}%"))
+        stmt = stmt.where(facets.search_condition(search_term))
+    return stmt
 
-    events = db.session.scalars(stmt).all()
-    _sync_event_statuses(events)
 
-    categories = ["All"] + [choice[0] for choice in EVENT_CATEGORY_CHOICES]
+def _render_index(
+    events, filters: dict, search_term: str, *, stream: bool = False, version: int | None = None
+):
+    facet_values, total = facets.facet_counts(filters, search_term, version)
 
-    return render_template(
+    render = stream_page if stream else render_template
+    return render(
         "index.html",
         events=events,
-        categories=categories,
-        selected_category=selected_category,
+        facets=facet_values,
+        facet_labels=facets.FACET_LABELS,
+        result_count=total,
+        filtered=any(filters.values()),
         search_term=search_term,
     )
 
 
-@main_bp.route("/event/<int:event_id>")
-def event_details(event_id: int):
-    stmt = (
+@main_bp.route("/")
+@main_bp.route("/home")
+@read_replica
+def index():
+    filters = facets.parse_filters(request.args)
+    search_term = (request.args.get("q") or "").strip()
+
+    snapshot = readmodel.current()
+    if snapshot is not None:
+        events = snapshot.select(filters, search_term, datetime.utcnow())
+        return _render_index(events, filters, search_term, stream=True, version=snapshot.version)
+
+    # Statuses were already refreshed by the before_request sweep, so the rows
+    # can be streamed straight from the cursor into the template.
+    events = iter_scalars(_index_statement(filters, search_term))
+    return _render_index(events, filters, search_term, stream=True)
+
+
+def _suggestion_url(suggestion) -> str:
+    if suggestion.event_id is not None:
+        return url_for("main.event_details", event_id=suggestion.event_id)
+    if suggestion.kind in ("category", "city"):
+        return url_for("main.index", _anchor="events", **{suggestion.kind: suggestion.text})
+    return url_for("main.index", q=suggestion.text, _anchor="events")
+
+
+@main_bp.route("/search/suggest")
+@read_replica
+def search_suggestions():
+    snapshot = readmodel.current()
+    if snapshot is None:
+        # Suggestions only come from memory, never from a query per keystroke.
+        abort(404)
+
+    prefix = (request.args.get("q") or "")[:MAX_SUGGEST_PREFIX]
+    suggestions = snapshot.suggestions.lookup(prefix, current_app.config["SUGGEST_LIMIT"])
+    response = jsonify(
+        {
+            "data": [
+                {
+                    "type": suggestion.kind,
+                    "text": suggestion.text,
+                    "events": suggestion.events,
+                    "url": _suggestion_url(suggestion),
+                }
+                for suggestion in suggestions
+            ]
+        }
+    )
+    # Everyone typing the same prefix gets the same answer until the next refresh.
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["READ_MODEL_MAX_STALENESS"]
+    return response
+
+
+def _event_details_statement(event_id: int):
+    return (
         db.select(Event)
         .options(
             selectinload(Event.ticket_types),
             selectinload(Event.bookings),
+            selectinload(Event.holds),
             selectinload(Event.comments).selectinload(Comment.user),
         )
         .where(Event.id == event_id)
     )
-    event = db.session.execute(stmt).scalar_one_or_none()
-    if event is None:
-        abort(404)
 
-    _sync_event_statuses([event])
 
+def _related_statement(event_id: int):
+    return related.related_statement(
+        event_id, current_app.config["RELATED_EVENTS_LIMIT"], datetime.utcnow()
+    )
+
+
+def _render_event_details(event: Event, related_events):
     booking_form = BookingForm()
     comment_form = CommentForm()
     booking_form.qty.data = booking_form.qty.data or 1
@@ -123,17 +216,78 @@ def event_details(event_id: int):
         booking_form=booking_form,
         comment_form=comment_form,
         comments=comments,
+        related_events=related_events,
     )
 
 
+@main_bp.route("/event/<int:event_id>")
+@read_replica
+def event_details(event_id: int):
+    event = db.session.execute(_event_details_statement(event_id)).scalar_one_or_none()
+    if event is None:
+        abort(404)
+
+    _sync_event_statuses([event])
+
+    related_events = db.session.scalars(_related_statement(event_id)).all()
+    return _render_event_details(event, related_events)
+
+
+@main_bp.route("/event/<int:event_id>/live")
+def event_live(event_id: int):
+    if db.session.scalar(db.select(Event.id).where(Event.id == event_id)) is None:
+        abort(404)
+
+    config = current_app.config
+    stream = live.sse_stream(
+        event_id, config["LIVE_HEARTBEAT_SECONDS"], config["LIVE_STREAM_SECONDS"]
+    )
+    if stream is None:
+        # Every stream slot is taken; the page falls back to polling.
+        response = Response(status=503)
+        response.headers["Retry-After"] = str(config["LIVE_POLL_SECONDS"])
+        return response
+
+    # No stream_with_context: the stream never touches the DB, so the session
+    # and its connection are released as soon as this view returns.
+    return Response(
+        stream,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@main_bp.route("/event/<int:event_id>/live.json")
+def event_live_snapshot(event_id: int):
+    """The stream's snapshot for pages polling instead of streaming."""
+    snapshot = live.event_snapshot(event_id)
+    if snapshot is None:
+        abort(404)
+    response = jsonify(snapshot)
+    response.cache_control.no_cache = True
+    return response
+
+
 @main_bp.post("/event/<int:event_id>/book")
 @login_required
+@idempotent()
+@rate_limit("20/minute", key="user")
 def book_event(event_id: int):
+    # Unknown ids must not get a waiting-room queue of their own.
+    if db.session.scalar(db.select(Event.id).where(Event.id == event_id)) is None:
+        abort(404)
+    # Meter entry before loading bookings and holds so spikes queue cheaply.
+    if not waiting_room.admit(event_id, current_user.id):
+        waiting_room.join_queue(event_id, current_user.id)
+        flash("Tickets are in high demand, so you've been placed in a short queue.")
+        return redirect(url_for("main.event_queue", event_id=event_id))
+
     stmt = (
         db.select(Event)
         .options(
             selectinload(Event.ticket_types),
             selectinload(Event.bookings),
+            selectinload(Event.holds),
         )
         .where(Event.id == event_id)
     )
@@ -158,35 +312,88 @@ def book_event(event_id: int):
         flash("Select at least one ticket.")
         return redirect(url_for("main.event_details", event_id=event_id))
 
-    if qty > event.remaining_capacity:
+    hold = holds.create_hold(event, current_user.id, qty)
+    if hold is None:
         flash("Not enough tickets remaining for that quantity.")
         return redirect(url_for("main.event_details", event_id=event_id))
 
-    order_id = _generate_order_id()
-    while db.session.scalar(db.select(Booking).where(Booking.order_id == order_id)):
-        # In practice collisions are rare, but loop defensively to guarantee uniqueness.
+    waiting_room.consume_pass(event_id, current_user.id)
+    return redirect(url_for("main.checkout", hold_id=hold.id))
+
+
+@main_bp.route("/checkout/<int:hold_id>", methods=["GET", "POST"])
+@login_required
+@idempotent()
+def checkout(hold_id: int):
+    hold = holds.active_hold(hold_id, current_user.id)
+    if hold is None:
+        flash("Your ticket hold has expired or was already used. Please book again.")
+        return redirect(url_for("main.index"))
+    event_id = hold.event_id
+
+    form = CheckoutForm()
+    if form.validate_on_submit():
+        if form.release.data:
+            holds.release_hold(hold)
+            flash("Your tickets have been released.")
+            return redirect(url_for("main.event_details", event_id=event_id))
+
         order_id = _generate_order_id()
+        while db.session.scalar(db.select(Booking).where(Booking.order_id == order_id)):
+            # In practice collisions are rare, but loop defensively to guarantee uniqueness.
+            order_id = _generate_order_id()
+
+        if holds.confirm_hold(hold, order_id) is None:
+            flash("Your ticket hold expired before checkout finished. Please book again.")
+            return redirect(url_for("main.event_details", event_id=event_id))
+        flash(f"Booking confirmed! Your order ID is {order_id}.")
+        return redirect(url_for("main.booking_history"))
+
+    return render_template(
+        "checkout.html",
+        hold=hold,
+        event=hold.event,
+        form=form,
+        seconds_left=max(0, int((hold.expires_at - datetime.utcnow()).total_seconds())),
+    )
+
 
-    unit_price = event.price or Decimal("0")
-    booking = Booking(
-        order_id=order_id,
-        user_id=current_user.id,
-        qty=qty,
-        unit_price=unit_price,
+@main_bp.route("/event/<int:event_id>/queue")
+@login_required
+def event_queue(event_id: int):
+    title = db.session.scalar(db.select(Event.title).where(Event.id == event_id))
+    if title is None:
+        abort(404)
+    ticket = waiting_room.join_queue(event_id, current_user.id)
+    return render_template(
+        "waiting_room.html", event_id=event_id, event_title=title, position=ticket["p"]
     )
-    event.bookings.append(booking)
-    db.session.add(booking)
 
-    if event.refresh_status():
-        db.session.add(event)
 
-    db.session.commit()
-    flash(f"Booking confirmed! Your order ID is {order_id}.")
-    return redirect(url_for("main.booking_history"))
+@main_bp.route("/event/<int:event_id>/queue/status")
+@login_required
+def event_queue_status(event_id: int):
+    status = waiting_room.poll(event_id, current_user.id)
+    if status is None:
+        return jsonify({"queued": False, "admitted": False}), 404
+
+    response = jsonify(
+        {
+            "queued": not status.admitted,
+            "admitted": status.admitted,
+            "position": status.position,
+            "ahead": status.ahead,
+            "retry_after": status.retry_after,
+        }
+    )
+    if not status.admitted:
+        response.headers["Retry-After"] = str(max(1, round(status.retry_after)))
+    return response
 
 
 @main_bp.post("/event/<int:event_id>/comment")
 @login_required
+@rate_limit("10/minute", key="user")
 def post_comment(event_id: int):
     event = db.session.get(Event, event_id)
     if event is None:
@@ -208,8 +415,45 @@ def post_comment(event_id: int):
     return redirect(url_for("main.event_details", event_id=event_id))
 
 
+def _store_image(upload) -> str | None:
+    """Save an uploaded event image under static/uploads; None if none was sent."""
+    if not (upload and upload.filename):
+        return None
+    upload_folder = Path(current_app.static_folder) / "uploads"
+    upload_folder.mkdir(parents=True, exist_ok=True)
+    original_name = Path(upload.filename).name
+    unique_name = f"{uuid4().hex}_{original_name}"
+    upload.save(upload_folder / unique_name)
+    return f"uploads/{unique_name}"
+
+
+def _ticket_tiers(form) -> tuple[list[dict], int, Decimal]:
+    """Filled-in tier rows of an event form, plus the capacity and base price they imply."""
+    ticket_tiers = []
+    for entry in form.ticket_types.entries:
+        name = (entry.form.name.data or "").strip()
+        if not name:
+            continue
+        # Capture only filled-in rows; empty ones are placeholders in the UI.
+        price = entry.form.price.data
+        if price is None:
+            price = Decimal("0")
+        quantity = entry.form.quantity.data or 0
+        ticket_tiers.append({"name": name, "price": price, "quantity": quantity})
+
+    total_capacity = sum(tier["quantity"] for tier in ticket_tiers) or form.capacity.data
+    # When tiers exist we advertise the lowest price so listings stay honest.
+    base_price = form.price.data
+    if ticket_tiers:
+        base_price = min(tier["price"] for tier in ticket_tiers)
+    if base_price is None:
+        base_price = Decimal("0")
+    return ticket_tiers, total_capacity, base_price
+
+
 @main_bp.route("/create", methods=["GET", "POST"])
 @login_required
+@idempotent()
 def create_event():
     form = EventForm()
 
@@ -219,44 +463,8 @@ def create_event():
             form.ticket_types.append_entry()
 
     if form.validate_on_submit():
-        image_path = None
-        if form.image.data and form.image.data.filename:
-            upload_folder = Path(current_app.static_folder) / "uploads"
-            upload_folder.mkdir(parents=True, exist_ok=True)
-            original_name = Path(form.image.data.filename).name
-            unique_name = f"{uuid4().hex}_{original_name}"
-            destination = upload_folder / unique_name
-            form.image.data.save(destination)
-            image_path = f"uploads/{unique_name}"
-
-        ticket_tiers: list[TicketType] = []
-        for entry in form.ticket_types.entries:
-            name = (entry.form.name.data or "").strip()
-            if not name:
-                continue
-            # Capture only filled-in rows; empty ones are placeholders in the UI.
-            price = entry.form.price.data
-            if price is None:
-                price = Decimal("0")
-            quantity = entry.form.quantity.data or 0
-            ticket_tiers.append(
-                TicketType(
-                    name=name,
-                    price=price,
-                    quantity=quantity,
-                )
-            )
-
-        total_capacity = sum(tier.quantity for tier in ticket_tiers) or form.capacity.data
-        # When tiers are provided, use the cheapest tier as base price for listings.
-        base_price = form.price.data
-        if ticket_tiers:
-            base_price = min(
-                (tier.price for tier in ticket_tiers if tier.price is not None),
-                default=base_price,
-            )
-        if base_price is None:
-            base_price = Decimal("0")
+        image_path = _store_image(form.image.data)
+        ticket_tiers, total_capacity, base_price = _ticket_tiers(form)
 
         event = Event(
             title=form.title.data.strip(),
@@ -271,9 +479,10 @@ def create_event():
             status=EventStatus.OPEN,
             owner_id=current_user.id,
         )
-        event.ticket_types = ticket_tiers
+        event.ticket_types = [TicketType(**tier) for tier in ticket_tiers]
         db.session.add(event)
         db.session.commit()
+        related.refresh_event(event.id)
         flash("Event created successfully!")
         return redirect(url_for("main.event_details", event_id=event.id))
 
@@ -286,18 +495,17 @@ def create_event():
 @main_bp.route("/events/mine")
 @login_required
 def my_events():
-    events = db.session.scalars(
+    events = iter_scalars(
         db.select(Event)
         .options(
             selectinload(Event.ticket_types),
             selectinload(Event.bookings),
+            selectinload(Event.holds),
         )
         .where(Event.owner_id == current_user.id)
         .order_by(Event.start_dt.asc())
-    ).all()
-
-    _sync_event_statuses(events)
-    return render_template("my_events.html", events=events)
+    )
+    return stream_page("my_events.html", events=events)
 
 
 @main_bp.route("/events/<int:event_id>/edit", methods=["GET", "POST"])
@@ -305,7 +513,11 @@ def my_events():
 def edit_event(event_id: int):
     stmt = (
         db.select(Event)
-        .options(selectinload(Event.ticket_types), selectinload(Event.bookings))
+        .options(
+            selectinload(Event.ticket_types),
+            selectinload(Event.bookings),
+            selectinload(Event.holds),
+        )
         .where(Event.id == event_id)
     )
     event = db.session.execute(stmt).scalar_one_or_none()
@@ -338,44 +550,8 @@ def edit_event(event_id: int):
             form.ticket_types.append_entry()
 
     if form.validate_on_submit():
-        image_path = event.image_url
-        if form.image.data and form.image.data.filename:
-            upload_folder = Path(current_app.static_folder) / "uploads"
-            upload_folder.mkdir(parents=True, exist_ok=True)
-            original_name = Path(form.image.data.filename).name
-            unique_name = f"{uuid4().hex}_{original_name}"
-            destination = upload_folder / unique_name
-            form.image.data.save(destination)
-            image_path = f"uploads/{unique_name}"
-
-        ticket_tiers: list[TicketType] = []
-        for entry in form.ticket_types.entries:
-            name = (entry.form.name.data or "").strip()
-            if not name:
-                continue
-            # Represent each tier as a fresh model instance to keep ORM state simple.
-            price = entry.form.price.data
-            if price is None:
-                price = Decimal("0")
-            quantity = entry.form.quantity.data or 0
-            ticket_tiers.append(
-                TicketType(
-                    name=name,
-                    price=price,
-                    quantity=quantity,
-                )
-            )
-
-        total_capacity = sum(tier.quantity for tier in ticket_tiers) or form.capacity.data
-        # When tiers exist we advertise the lowest price so listings stay honest.
-        base_price = form.price.data
-        if ticket_tiers:
-            base_price = min(
-                (tier.price for tier in ticket_tiers if tier.price is not None),
-                default=base_price,
-            )
-        if base_price is None:
-            base_price = Decimal("0")
+        image_path = _store_image(form.image.data) or event.image_url
+        ticket_tiers, total_capacity, base_price = _ticket_tiers(form)
 
         event.title = form.title.data.strip()
         event.category = form.category.data
@@ -388,13 +564,15 @@ def edit_event(event_id: int):
         event.price = base_price
 
         event.ticket_types.clear()
-        # Rebuild tiers from scratch so stale rows are removed cleanly.
+        # Rebuild tiers from scratch so stale rows are removed cleanly; fresh
+        # model instances keep ORM state simple.
         for tier in ticket_tiers:
-            event.ticket_types.append(tier)
+            event.ticket_types.append(TicketType(**tier))
 
         # Editing dates/capacity can change status, so refresh after updates.
         event.refresh_status()
         db.session.commit()
+        related.refresh_event(event.id)
         flash("Event updated successfully!")
         return redirect(url_for("main.my_events"))
 
@@ -427,6 +605,7 @@ def cancel_event(event_id: int):
     else:
         event.status = EventStatus.CANCELLED
         db.session.commit()
+        live.publish_event_snapshot(event_id)
         flash("Event cancelled successfully.")
     return redirect(url_for("main.event_details", event_id=event_id))
 
@@ -443,40 +622,227 @@ def delete_event(event_id: int):
         flash("Invalid delete request.")
         return redirect(url_for("main.edit_event", event_id=event_id))
 
-    db.session.delete(event)
-    db.session.commit()
+    deletion.delete_event(event.id)
     flash("Event deleted successfully.")
     return redirect(url_for("main.my_events"))
 
 
-@main_bp.route("/history")
+def _series_fields(form, image_path: str | None, capacity: int, price: Decimal) -> dict:
+    return {
+        "title": form.title.data.strip(),
+        "category": form.category.data,
+        "description": form.description.data.strip(),
+        "image_url": image_path,
+        "venue": form.venue.data.strip(),
+        "city": form.city.data.strip(),
+        "capacity": capacity,
+        "price": price,
+    }
+
+
+@main_bp.route("/create/series", methods=["GET", "POST"])
 @login_required
-def booking_history():
-    search_term = (request.args.get("q") or "").strip()
+@idempotent()
+def create_series():
+    form = EventSeriesForm()
+
+    if request.method == "GET":
+        while len(form.ticket_types.entries) < form.ticket_types.min_entries:
+            form.ticket_types.append_entry()
+
+    if form.validate_on_submit():
+        try:
+            starts = series.expand(
+                form.start_dt.data, form.repeat.data, form.occurrences.data, form.dates.data
+            )
+        except ValueError as exc:
+            form.repeat.errors.append(str(exc))
+        else:
+            # Stored once; every date in the series points at the same file.
+            image_path = _store_image(form.image.data)
+            ticket_tiers, total_capacity, base_price = _ticket_tiers(form)
+            fields = _series_fields(form, image_path, total_capacity, base_price)
+            _, event_ids = series.create_series(current_user.id, fields, ticket_tiers, starts)
+            flash(f"Series created with {len(event_ids)} dates!")
+            return redirect(url_for("main.my_events"))
+
+    if request.method == "POST":
+        flash("Please correct the highlighted errors before submitting.")
+
+    return render_template("create_series.html", form=form)
+
+
+def _owned_series(series_id: int) -> EventSeries:
+    event_series = db.session.get(EventSeries, series_id)
+    if event_series is None or event_series.owner_id != current_user.id:
+        abort(404)
+    return event_series
+
+
+@main_bp.route("/series/<int:series_id>/edit", methods=["GET", "POST"])
+@login_required
+def edit_series(series_id: int):
+    event_series = _owned_series(series_id)
+    events = db.session.scalars(
+        db.select(Event)
+        .options(selectinload(Event.ticket_types))
+        .where(Event.series_id == series_id)
+        .order_by(Event.start_dt.asc())
+    ).all()
+    now = datetime.utcnow()
+    upcoming = [e for e in events if e.start_dt > now and e.status != EventStatus.CANCELLED]
+
+    form = EventSeriesUpdateForm()
+    cancel_form = CancelSeriesForm()
+
+    if request.method == "GET" and upcoming:
+        # Prefill from the next date; an edit applies the same values to all of them.
+        template = upcoming[0]
+        form.title.data = event_series.title
+        form.category.data = template.category
+        form.description.data = template.description
+        form.venue.data = template.venue
+        form.city.data = template.city
+        form.capacity.data = template.total_capacity or template.capacity
+        form.price.data = template.lowest_ticket_price or template.price
 
+        while len(form.ticket_types.entries):
+            form.ticket_types.pop_entry()
+        for ticket in template.ticket_types[:5]:
+            entry = form.ticket_types.append_entry()
+            entry.form.name.data = ticket.name
+            entry.form.price.data = ticket.price
+            entry.form.quantity.data = ticket.quantity
+        while len(form.ticket_types.entries) < 3:
+            form.ticket_types.append_entry()
+
+    if request.method == "POST" and not upcoming:
+        flash("This series has no upcoming dates left to edit.")
+    elif form.validate_on_submit():
+        image_path = _store_image(form.image.data) or upcoming[0].image_url
+        ticket_tiers, total_capacity, base_price = _ticket_tiers(form)
+        fields = _series_fields(form, image_path, total_capacity, base_price)
+        event_ids = series.update_series(event_series, fields, ticket_tiers)
+        flash(f"Updated {len(event_ids)} upcoming date(s).")
+        return redirect(url_for("main.edit_series", series_id=series_id))
+
+    elif request.method == "POST":
+        flash("Please correct the highlighted errors before submitting.")
+
+    return render_template(
+        "edit_series.html",
+        form=form,
+        cancel_form=cancel_form,
+        series=event_series,
+        events=events,
+        upcoming=upcoming,
+        template=upcoming[0] if upcoming else None,
+    )
+
+
+@main_bp.post("/series/<int:series_id>/cancel")
+@login_required
+def cancel_series(series_id: int):
+    event_series = _owned_series(series_id)
+
+    cancel_form = CancelSeriesForm()
+    if not cancel_form.validate_on_submit():
+        flash("Invalid cancel request.")
+        return redirect(url_for("main.edit_series", series_id=series_id))
+
+    event_ids = series.cancel_series(event_series)
+    if event_ids:
+        flash(f"Cancelled {len(event_ids)} upcoming date(s).")
+    else:
+        flash("This series has no upcoming dates to cancel.")
+    return redirect(url_for("main.edit_series", series_id=series_id))
+
+
+def _history_statement(bookings, events, *, archived: bool, search_term: str, cursor, now):
+    """One page of a user's bookings from either the hot or the archive tables."""
+    # Past events read as inactive at display time, as EventCard.status does;
+    # this page skips the status sweep.
+    event_status = case(
+        (events.c.status == EventStatus.CANCELLED, events.c.status),
+        (events.c.start_dt < now, EventStatus.INACTIVE.name),
+        else_=events.c.status,
+    )
     stmt = (
-        db.select(Booking)
-        .options(selectinload(Booking.event))
-        .where(Booking.user_id == current_user.id)
-        .order_by(Booking.booked_at.desc())
+        db.select(
+            bookings.c.id,
+            bookings.c.order_id,
+            bookings.c.qty,
+            bookings.c.booked_at,
+            (bookings.c.qty * bookings.c.unit_price).label("total"),
+            events.c.id.label("event_id"),
+            events.c.title.label("event_title"),
+            events.c.image_url.label("event_image_url"),
+            events.c.city.label("event_city"),
+            events.c.venue.label("event_venue"),
+            events.c.start_dt.label("event_start_dt"),
+            type_coerce(event_status, events.c.status.type).label("event_status"),
+            db.literal(archived).label("archived"),
+        )
+        .outerjoin(events, events.c.id == bookings.c.event_id)
+        .where(bookings.c.user_id == current_user.id)
+        .order_by(bookings.c.booked_at.desc(), bookings.c.id.desc())
+        .limit(HISTORY_PAGE_SIZE + 1)
     )
     if search_term:
-        stmt = stmt.join(Booking.event).where(Event.title.ilike(f"%{search_term}%"))
+        stmt = stmt.where(events.c.title.ilike(f"%{search_term}%"))
+    if cursor:
+        before_dt, before_id = cursor
+        # Keyset pagination over the (user_id, booked_at, id) index, newest first.
+        stmt = stmt.where(
+            db.or_(
+                bookings.c.booked_at < before_dt,
+                db.and_(bookings.c.booked_at == before_dt, bookings.c.id < before_id),
+            )
+        )
+    return stmt
 
-    bookings = db.session.scalars(stmt).all()
-    _sync_event_statuses([booking.event for booking in bookings if booking.event])
 
-    return render_template(
+@main_bp.route("/history")
+@login_required
+@read_replica
+def booking_history():
+    search_term = (request.args.get("q") or "").strip()
+    cursor = request.args.get("cursor")
+    options = {
+        "search_term": search_term,
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "now": datetime.utcnow(),
+    }
+
+    # Archived bookings keep their ids, so both sources share one keyset order.
+    bookings = db.session.execute(
+        _history_statement(Booking.__table__, Event.__table__, archived=False, **options)
+    ).all()
+    bookings += archive.read(
+        _history_statement(archive.bookings, archive.events, archived=True, **options)
+    ).all()
+    bookings.sort(key=lambda row: (row.booked_at or datetime.min, row.id), reverse=True)
+
+    next_cursor = None
+    if len(bookings) > HISTORY_PAGE_SIZE:
+        bookings = bookings[:HISTORY_PAGE_SIZE]
+        next_cursor = encode_cursor(bookings[-1].booked_at, bookings[-1].id)
+
+    return stream_page(
         "history.html",
         bookings=bookings,
         search_term=search_term,
+        next_cursor=next_cursor,
+        feed_url=calendars.user_feed_url(current_user.id),
     )
 
 
 @main_bp.route("/account", methods=["GET", "POST"])
 @login_required
 def account():
-    form = UpdateAccountForm(obj=current_user)
+    # The only view that needs the full row (address, password hash, etc.).
+    user = identity.full_user()
+    form = UpdateAccountForm(obj=user)
     delete_form = DeleteAccountForm()
 
     if form.submit.data and form.validate_on_submit():
@@ -497,27 +863,31 @@ def account():
             flash("Username is already taken. Please choose another.")
             return redirect(url_for("main.account"))
 
-        current_user.first_name = form.first_name.data.strip()
-        current_user.last_name = form.last_name.data.strip()
-        current_user.username = new_username
-        current_user.email = new_email
-        current_user.contact_number = form.contact_number.data.strip()
-        current_user.street_address = form.street_address.data.strip()
+        user.first_name = form.first_name.data.strip()
+        user.last_name = form.last_name.data.strip()
+        user.username = new_username
+        user.email = new_email
+        user.contact_number = form.contact_number.data.strip()
+        user.street_address = form.street_address.data.strip()
 
         new_password = (form.new_password.data or "").strip()
         if new_password:
-            current_user.set_password(new_password)
+            user.set_password(new_password)
 
         db.session.commit()
+        identity.invalidate(user.id)
         flash("Account details updated successfully.")
         return redirect(url_for("main.account"))
 
     if delete_form.delete.data and delete_form.validate_on_submit():
-        user_to_remove = current_user._get_current_object()
         logout_user()
-        db.session.delete(user_to_remove)
-        db.session.commit()
-        flash("Your account has been deleted.")
+        user_id = user.id
+        queued = deletion.delete_account(user)
+        identity.invalidate(user_id)
+        if queued:
+            flash("Your account has been closed. Your events and bookings are being removed.")
+        else:
+            flash("Your account has been deleted.")
         return redirect(url_for("main.index"))
 
     return render_template("account.html", form=form, delete_form=delete_form)
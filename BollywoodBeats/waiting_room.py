@@ -0,0 +1,238 @@
+"""
+Virtual waiting room that meters entry into ``book_event`` during on-sales.
+
+Each event gets a token bucket refilled at ``WAITING_ROOM_RATE`` admissions
+per second. While the bucket has tokens and nobody is queued, bookers walk
+straight through. Otherwise they receive a signed queue token holding their
+position; polling the status endpoint advances the queue as tokens refill
+and eventually swaps the queue token for a short-lived admission pass.
+
+Tokens live in the signed session cookie, so each pass carries a random id
+and the room remembers the ids of passes already spent until they expire.
+Replaying an old cookie then can't book twice on one pass.
+
+State is per process, so with N workers the effective rate is N times the
+configured one; size ``WAITING_ROOM_RATE`` accordingly.
+"""
+
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+
+from flask import current_app, session
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+SESSION_KEY = "waiting_room"
+
+
+class TokenBucket:
+    """Classic token bucket; ``take`` never blocks."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> bool:
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_token(self) -> float:
+        self._refill(time.monotonic())
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class EventQueue:
+    bucket: TokenBucket
+    issued: int = 0  # last queue position handed out
+    admitted: int = 0  # every position <= this may enter
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@dataclass
+class QueueStatus:
+    admitted: bool
+    position: int
+    ahead: int
+    retry_after: float
+
+
+class WaitingRoom:
+    def __init__(self, rate: float, burst: int, overrides: dict | None = None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self._queues: dict[int, EventQueue] = {}
+        # Spent pass id -> when the pass expires anyway, oldest first.
+        self._spent: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, event_id: int) -> EventQueue:
+        queue = self._queues.get(event_id)
+        if queue is None:
+            with self._lock:
+                queue = self._queues.get(event_id)
+                if queue is None:
+                    rate = self.overrides.get(event_id, self.rate)
+                    queue = EventQueue(bucket=TokenBucket(rate, self.burst))
+                    self._queues[event_id] = queue
+        return queue
+
+    def try_enter(self, event_id: int) -> bool:
+        """Admit immediately when nobody is waiting and capacity allows."""
+        queue = self._queue(event_id)
+        with queue.lock:
+            if queue.admitted < queue.issued:
+                # Others are already queued; jumping ahead would be unfair.
+                return False
+            return queue.bucket.take()
+
+    def join(self, event_id: int) -> int:
+        queue = self._queue(event_id)
+        with queue.lock:
+            queue.issued += 1
+            return queue.issued
+
+    def status(self, event_id: int, position: int) -> QueueStatus:
+        queue = self._queue(event_id)
+        with queue.lock:
+            # Advance the head of the queue by however many tokens refilled.
+            while queue.admitted < queue.issued and queue.bucket.take():
+                queue.admitted += 1
+            ahead = max(0, position - queue.admitted - 1)
+            admitted = position <= queue.admitted
+            retry_after = 0.0
+            if not admitted:
+                rate = queue.bucket.rate or 1
+                retry_after = max(queue.bucket.seconds_until_token(), ahead / rate)
+        return QueueStatus(admitted, position, ahead, round(retry_after, 1))
+
+    def is_spent(self, pass_id: str) -> bool:
+        with self._lock:
+            return pass_id in self._spent
+
+    def spend(self, pass_id: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            # Every pass lives equally long, so the oldest entries expire first;
+            # once expired, the signature check rejects the pass on its own.
+            while self._spent and next(iter(self._spent.values())) <= now:
+                del self._spent[next(iter(self._spent))]
+            self._spent[pass_id] = expires_at
+
+
+def init_app(app) -> None:
+    app.extensions["waiting_room"] = WaitingRoom(
+        rate=app.config["WAITING_ROOM_RATE"],
+        burst=app.config["WAITING_ROOM_BURST"],
+        overrides=app.config["WAITING_ROOM_EVENT_RATES"],
+    )
+
+
+def _room() -> WaitingRoom:
+    return current_app.extensions["waiting_room"]
+
+
+def _serializer(purpose: str) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(current_app.secret_key, salt=f"waiting-room-{purpose}")
+
+
+def _tokens() -> dict:
+    return session.get(SESSION_KEY, {})
+
+
+def _store_token(event_id: int, token: str | None) -> None:
+    tokens = dict(_tokens())
+    if token is None:
+        tokens.pop(str(event_id), None)
+    else:
+        tokens[str(event_id)] = token
+    session[SESSION_KEY] = tokens
+
+
+def _load(purpose: str, token: str, max_age: int) -> dict | None:
+    try:
+        return _serializer(purpose).loads(token, max_age=max_age)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+def _pass(event_id: int, user_id: int) -> dict | None:
+    token = _tokens().get(str(event_id))
+    if not token:
+        return None
+    data = _load("pass", token, current_app.config["WAITING_ROOM_PASS_SECONDS"])
+    if not data or data["e"] != event_id or data["u"] != user_id or "n" not in data:
+        return None
+    if _room().is_spent(data["n"]):
+        return None
+    return data
+
+
+def has_pass(event_id: int, user_id: int) -> bool:
+    return _pass(event_id, user_id) is not None
+
+
+def admit(event_id: int, user_id: int) -> bool:
+    """Gate for ``book_event``: True when this user may book right now."""
+    if not current_app.config["WAITING_ROOM_ENABLED"]:
+        return True
+    if has_pass(event_id, user_id):
+        return True
+    if queue_token(event_id, user_id) is None and _room().try_enter(event_id):
+        return True
+    return False
+
+
+def consume_pass(event_id: int, user_id: int) -> None:
+    """Passes are single-use; spend it once the booking committed."""
+    data = _pass(event_id, user_id)
+    if data is not None:
+        expires_at = time.time() + current_app.config["WAITING_ROOM_PASS_SECONDS"]
+        _room().spend(data["n"], expires_at)
+    _store_token(event_id, None)
+
+
+def queue_token(event_id: int, user_id: int) -> dict | None:
+    token = _tokens().get(str(event_id))
+    if not token:
+        return None
+    data = _load("queue", token, current_app.config["WAITING_ROOM_TOKEN_MAX_AGE"])
+    if not data or data["e"] != event_id or data["u"] != user_id:
+        return None
+    return data
+
+
+def join_queue(event_id: int, user_id: int) -> dict:
+    """Return the caller's queue ticket, issuing a new position if needed."""
+    data = queue_token(event_id, user_id)
+    if data is None:
+        data = {"e": event_id, "u": user_id, "p": _room().join(event_id)}
+        _store_token(event_id, _serializer("queue").dumps(data))
+    return data
+
+
+def poll(event_id: int, user_id: int) -> QueueStatus | None:
+    data = queue_token(event_id, user_id)
+    if data is None:
+        if has_pass(event_id, user_id):
+            return QueueStatus(True, 0, 0, 0.0)
+        return None
+    status = _room().status(event_id, data["p"])
+    if status.admitted:
+        # Trade the queue ticket for a short-lived admission pass.
+        data = {"e": event_id, "u": user_id, "n": secrets.token_urlsafe(12)}
+        _store_token(event_id, _serializer("pass").dumps(data))
+    return status
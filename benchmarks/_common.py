@@ -0,0 +1,71 @@
+"""Shared helpers for the ad-hoc benchmarks in this folder."""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from BollywoodBeats import create_app, db  # noqa: E402
+
+
+def make_app(**config):
+    """Create an app backed by a throwaway SQLite file."""
+    tmp = tempfile.mkdtemp(prefix="bb-bench-")
+    settings = {
+        "TESTING": True,
+        "WTF_CSRF_ENABLED": False,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tmp, "bench.db"),
+    }
+    settings.update(config)
+    return create_app(settings)
+
+
+def seed_events(app, count: int) -> None:
+    """Bulk insert ``count`` future events owned by the demo user."""
+    from BollywoodBeats.models import Event, EventStatus, User
+
+    categories = ["Bollywood", "Sufi", "Folk", "Fusion", "Classical", "EDM"]
+    cities = ["Sydney", "Melbourne", "Brisbane", "Adelaide", "Perth"]
+    now = datetime.utcnow()
+    with app.app_context():
+        owner_id = db.session.scalar(db.select(User.id).where(User.username == "demo_owner"))
+        db.session.execute(
+            db.insert(Event),
+            [
+                {
+                    "title": f"Bench Event {i}",
+                    "category": categories[i % len(categories)],
+                    "description": "Generated for benchmarking the catalogue pages.",
+                    "venue": f"Venue {i % 50}",
+                    "city": cities[i % len(cities)],
+                    "start_dt": now + timedelta(hours=i + 1),
+                    "capacity": 100,
+                    "price": Decimal("25.00") + i % 40,
+                    "status": EventStatus.OPEN,
+                    "owner_id": owner_id,
+                }
+                for i in range(count)
+            ],
+        )
+        db.session.commit()
+
+
+@contextmanager
+def serve(app, threaded: bool = True):
+    """Run ``app`` on a real local socket for the duration of the block."""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=threaded)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
@@ -0,0 +1,50 @@
+"""
+Compare the sync and async (ASYNC_READS) read paths under concurrent load.
+
+Usage: python benchmarks/async_reads.py [events] [concurrency] [requests]
+"""
+
+import statistics
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import make_app, seed_events, serve
+
+PATHS = ["/", "/event/1", "/api/v1/events?limit=50"]
+
+
+def _fetch(url: str) -> float:
+    started = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def run(async_reads: bool, events: int, concurrency: int, total: int) -> None:
+    app = make_app(ASYNC_READS=async_reads)
+    seed_events(app, events)
+    with serve(app) as base:
+        urls = [base + PATHS[i % len(PATHS)] for i in range(total)]
+        _fetch(urls[0])  # warm templates and connections
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(_fetch, urls))
+        elapsed = time.perf_counter() - started
+
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    label = "async" if async_reads else "sync"
+    print(
+        f"{label:>5}: {total / elapsed:8.1f} req/s  "
+        f"median {statistics.median(latencies) * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    total = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    print(f"{events} events, {concurrency} concurrent clients, {total} requests")
+    run(False, events, concurrency, total)
+    run(True, events, concurrency, total)
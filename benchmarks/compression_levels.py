@@ -0,0 +1,47 @@
+"""
+CPU cost versus bytes saved for gzip and brotli levels on real pages.
+
+Usage: python benchmarks/compression_levels.py [events]
+"""
+
+import sys
+import time
+
+from _common import make_app, seed_events
+
+from BollywoodBeats.compression import brotli, compress
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 5, 8, 11)}
+
+
+def main(events: int) -> None:
+    app = make_app(COMPRESS_ENABLED=False)
+    seed_events(app, events)
+    client = app.test_client()
+    pages = {
+        "index.html": client.get("/").get_data(),
+        "event.html": client.get("/event/1").get_data(),
+        "api list": client.get("/api/v1/events?limit=100").get_data(),
+    }
+
+    for name, body in pages.items():
+        print(f"{name}: {len(body):,} bytes")
+        for encoding, levels in LEVELS.items():
+            if encoding == "br" and brotli is None:
+                print("  br: brotli not installed")
+                continue
+            for level in levels:
+                rounds = 20
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    out = compress(body, encoding, level)
+                elapsed = (time.perf_counter() - started) / rounds
+                saved = 1 - len(out) / len(body)
+                print(
+                    f"  {encoding:>4} level {level:>2}: {len(out):>9,} bytes "
+                    f"({saved:6.1%} saved) {elapsed * 1000:8.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,87 @@
+"""
+Per-request cost of the metrics hooks, checked against METRICS_OVERHEAD_BUDGET_US.
+
+Times the before/after hooks inside a request context, with the periodic
+file flush included at its configured interval. It also reports a scrape
+with the given number of other workers' files present. Exits non-zero
+when the hooks cost more than the budget.
+
+Usage: python benchmarks/metrics_overhead.py [iterations] [threads] [workers]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from _common import make_app
+
+from flask import Response
+
+from BollywoodBeats.metrics import collect, record_request, render, start_timer
+
+PATHS = ("/", "/event/1", "/auth/login", "/history")
+
+
+def run(app, iterations: int, threads: int, hooks: bool) -> float:
+    """Mean seconds per request context (plus the hooks) across ``threads``."""
+    response = Response("ok")
+    per_thread = iterations // threads
+
+    def worker(offset: int) -> None:
+        for i in range(per_thread):
+            # Pushing the context matches the URL, which is all the hooks read.
+            with app.test_request_context(PATHS[(i + offset) % len(PATHS)]):
+                if hooks:
+                    start_timer()
+                    record_request(response)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return (time.perf_counter() - started) / (per_thread * threads)
+
+
+def fake_workers(registry, count: int) -> None:
+    snapshot = registry.snapshot()
+    for n in range(count):
+        # Our own pid keeps the fake workers "alive", so nothing is folded away.
+        path = os.path.join(registry.directory, f"metrics-{os.getpid()}-fake{n:04d}.json")
+        with open(path, "w") as handle:
+            json.dump(snapshot, handle)
+
+
+def main(iterations: int, threads: int, workers: int) -> None:
+    app = make_app(METRICS_ENABLED=True, METRICS_DIR=tempfile.mkdtemp(prefix="bb-metrics-"))
+    registry = app.extensions["metrics"]
+    budget = app.config["METRICS_OVERHEAD_BUDGET_US"]
+
+    baseline = run(app, iterations, threads, hooks=False)
+    hooked = run(app, iterations, threads, hooks=True)
+    overhead_us = max(0.0, hooked - baseline) * 1e6
+
+    fake_workers(registry, workers)
+    started = time.perf_counter()
+    with app.app_context():
+        body = render(collect(registry))
+    scrape_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{iterations} requests on {threads} thread(s)")
+    print(f"  request context only : {baseline * 1e6:7.2f} us")
+    print(f"  with metrics hooks   : {hooked * 1e6:7.2f} us")
+    print(f"  metrics overhead     : {overhead_us:7.2f} us per request (budget {budget:.0f} us)")
+    print(f"  scrape, {workers} workers : {scrape_ms:7.2f} ms, {len(body):,} bytes")
+    if overhead_us > budget:
+        raise SystemExit(f"Metrics overhead {overhead_us:.1f} us is over the {budget:.0f} us budget.")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    main(iterations, threads, workers)
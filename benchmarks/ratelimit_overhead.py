@@ -0,0 +1,38 @@
+"""
+Per-request cost of the rate limiter on the allowed path.
+
+Usage: python benchmarks/ratelimit_overhead.py [iterations] [distinct clients]
+"""
+
+import sys
+import time
+
+from _common import make_app
+
+from BollywoodBeats.ratelimit import enforce_rate_limits
+
+
+def main(iterations: int, clients: int) -> None:
+    app = make_app(RATELIMIT_RULES={"auth.login": f"{iterations * 10}/minute"})
+
+    def run(enabled: bool) -> float:
+        app.config["RATELIMIT_ENABLED"] = enabled
+        started = time.perf_counter()
+        for i in range(iterations):
+            environ = {"REMOTE_ADDR": f"10.0.{i % clients // 256}.{i % 256}"}
+            with app.test_request_context("/auth/login", method="POST", environ_base=environ):
+                enforce_rate_limits()
+        return (time.perf_counter() - started) / iterations
+
+    baseline = run(False)
+    limited = run(True)
+    print(f"{iterations} checks across {clients} clients")
+    print(f"  request context only : {baseline * 1e6:7.2f} us")
+    print(f"  with rate limit check: {limited * 1e6:7.2f} us")
+    print(f"  limiter overhead     : {(limited - baseline) * 1e6:7.2f} us per request")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    main(iterations, clients)
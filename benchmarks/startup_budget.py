@@ -0,0 +1,95 @@
+"""
+Cold-start time of a worker, checked against STARTUP_BUDGET_MS.
+
+Runs ``import BollywoodBeats`` plus ``create_app()`` in fresh interpreters,
+as a worker boot does (without the demo-data bootstrap), and takes the
+median. It also checks that booting stays lazy. ``create_app`` must not
+open a database connection or start a thread: the read model and its
+suggestion index wait for the first request, the Redis relay for the first
+live stream, and the archive bind for its commands. The profiler and the
+async read path must not be imported while they are switched off. Exits
+non-zero when any check fails.
+
+Usage: python benchmarks/startup_budget.py [runs] [budget_ms]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a default configuration must not import while booting.
+LAZY_MODULES = ("BollywoodBeats.aio", "BollywoodBeats.profiling", "redis", "aiosqlite")
+
+CHILD = """
+import json, sys, threading, time
+started = time.perf_counter()
+import sqlalchemy as sa
+from BollywoodBeats import create_app
+imported = time.perf_counter()
+connections = []
+sa.event.listen(sa.engine.Engine, "connect", lambda *args: connections.append(1))
+threads = set(threading.enumerate())
+app = create_app()
+finished = time.perf_counter()
+print(json.dumps({
+    "total_ms": (finished - started) * 1000,
+    "create_app_ms": (finished - imported) * 1000,
+    "budget_ms": app.config["STARTUP_BUDGET_MS"],
+    "connections": len(connections),
+    "threads": sorted(t.name for t in set(threading.enumerate()) - threads),
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def boot() -> dict:
+    instance = tempfile.mkdtemp(prefix="bb-startup-")
+    env = dict(
+        os.environ,
+        INIT_DB_ON_STARTUP="0",
+        DATABASE_URL="sqlite:///" + os.path.join(instance, "startup.db"),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD], capture_output=True, text=True, cwd=ROOT, env=env
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int, budget: float | None) -> None:
+    results = [boot() for _ in range(runs)]
+    total = statistics.median(r["total_ms"] for r in results)
+    create_app_ms = statistics.median(r["create_app_ms"] for r in results)
+    budget = budget if budget is not None else results[0]["budget_ms"]
+    first = results[0]
+
+    print(f"{runs} cold start(s)")
+    print(f"  import + create_app : {total:7.1f} ms median (budget {budget:.0f} ms)")
+    print(f"  create_app alone    : {create_app_ms:7.1f} ms median")
+    print(f"  connections opened  : {first['connections']}")
+    print(f"  threads started     : {', '.join(first['threads']) or 'none'}")
+
+    failures = []
+    if total > budget:
+        failures.append(f"Cold start took {total:.1f} ms, over the {budget:.0f} ms budget.")
+    if first["connections"]:
+        failures.append("create_app opened a database connection.")
+    if first["threads"]:
+        failures.append(f"create_app started thread(s): {', '.join(first['threads'])}.")
+    eager = [name for name in LAZY_MODULES if name in first["modules"]]
+    if eager:
+        failures.append(f"create_app imported {', '.join(eager)} without needing them.")
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    main(runs, budget)
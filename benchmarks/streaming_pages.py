@@ -0,0 +1,63 @@
+"""
+Time to first byte, total time and peak Python memory for the home page,
+rendered in one go versus streamed in chunks.
+
+Both modes include the before_request status sweep, which still loads every
+event; its cost is shared, so the difference between the rows is the render.
+
+Usage: python benchmarks/streaming_pages.py [events]
+"""
+
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+from _common import make_app, seed_events, serve
+
+
+def measure_http(base_url: str, rounds: int = 5) -> tuple[float, float]:
+    ttfb = total = 0.0
+    for _ in range(rounds):
+        request = urllib.request.Request(base_url + "/", headers={"Accept-Encoding": "identity"})
+        started = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read(1)
+            ttfb += time.perf_counter() - started
+            while response.read(65536):
+                pass
+        total += time.perf_counter() - started
+    return ttfb / rounds, total / rounds
+
+
+def measure_memory(app) -> int:
+    client = app.test_client()
+    client.get("/").close()  # warm caches outside the measurement
+    tracemalloc.start()
+    response = client.get("/", buffered=False)
+    for _ in response.response:
+        pass
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(events: int) -> None:
+    app = make_app(COMPRESS_ENABLED=False)
+    seed_events(app, events)
+    print(f"{events:,} events on the home page")
+
+    for label, streamed in (("render_template", False), ("stream_page", True)):
+        app.config["STREAM_LISTINGS"] = streamed
+        with serve(app) as base_url:
+            ttfb, total = measure_http(base_url)
+        peak = measure_memory(app)
+        print(
+            f"  {label:>15}: TTFB {ttfb * 1000:8.1f} ms  total {total * 1000:8.1f} ms"
+            f"  peak {peak / 1024 / 1024:7.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
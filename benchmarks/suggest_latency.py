@@ -0,0 +1,64 @@
+"""
+Search-as-you-type lookup latency against a large catalogue.
+
+Seeds the given number of events, builds the read model once, then times
+prefix lookups of every length for a few search terms. It also times
+patching the index after a single event changes. Exits non-zero when the
+slowest lookup takes longer than the budget.
+
+Usage: python benchmarks/suggest_latency.py [events] [budget_ms]
+"""
+
+import sys
+import time
+
+from _common import make_app, seed_events
+
+from BollywoodBeats import db
+from BollywoodBeats.models import Event
+
+TERMS = ("Bench Event 4242", "Sydney", "Venue 17", "Bollywood", "zzz", "b")
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    app = make_app()
+    seed_events(app, count)
+    limit = app.config["SUGGEST_LIMIT"]
+
+    with app.test_request_context("/search/suggest"):
+        model = app.extensions["read_model"]
+        started = time.perf_counter()
+        snapshot = model.current(fresh=True)
+        print(f"built read model for {len(snapshot.cards)} events in "
+              f"{time.perf_counter() - started:.2f}s")
+
+        timings = []
+        for term in TERMS:
+            for length in range(1, len(term) + 1):
+                prefix = term[:length]
+                started = time.perf_counter()
+                for _ in range(100):
+                    snapshot.suggestions.lookup(prefix, limit)
+                timings.append(((time.perf_counter() - started) / 100 * 1000, prefix))
+        timings.sort()
+        print(f"lookup median {timings[len(timings) // 2][0]:.3f} ms, "
+              f"slowest {timings[-1][0]:.3f} ms ({timings[-1][1]!r})")
+
+        event = db.session.get(Event, 1)
+        event.title = "Renamed Bench Event"
+        db.session.commit()
+        started = time.perf_counter()
+        model.current(fresh=True)
+        print(f"refresh after one edit {1000 * (time.perf_counter() - started):.1f} ms")
+
+    if timings[-1][0] > budget:
+        print(f"over budget of {budget} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
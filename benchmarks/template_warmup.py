@@ -0,0 +1,55 @@
+"""
+Cold-start latency of the first page views, with and without the Jinja
+bytecode cache and boot-time warm-up. Each scenario runs in a fresh process.
+
+Usage: python benchmarks/template_warmup.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PAGES = ["/", "/event/1", "/auth/login"]
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {bench_dir!r})
+from _common import make_app
+started = time.perf_counter()
+app = make_app(TEMPLATE_WARMUP={warmup}, JINJA_BYTECODE_CACHE_DIR={cache_dir!r})
+boot = time.perf_counter() - started
+client = app.test_client()
+first = {{}}
+for page in {pages!r}:
+    t = time.perf_counter()
+    client.get(page)
+    first[page] = time.perf_counter() - t
+print(json.dumps({{"boot": boot, "first": first}}))
+"""
+
+
+def run(warmup: bool, cache_dir: str) -> dict:
+    code = CHILD.format(
+        bench_dir=os.path.dirname(os.path.abspath(__file__)),
+        warmup=warmup,
+        cache_dir=cache_dir,
+        pages=PAGES,
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def report(label: str, result: dict) -> None:
+    pages = "  ".join(f"{p} {t * 1000:6.1f}ms" for p, t in result["first"].items())
+    total = sum(result["first"].values()) * 1000
+    print(f"{label:<28} boot {result['boot'] * 1000:6.1f}ms  first requests {total:6.1f}ms  ({pages})")
+
+
+if __name__ == "__main__":
+    empty_cache = tempfile.mkdtemp(prefix="bb-jinja-cold-")
+    shared_cache = tempfile.mkdtemp(prefix="bb-jinja-warm-")
+    report("no cache, no warm-up", run(False, empty_cache))
+    report("warm-up, empty cache", run(True, shared_cache))
+    report("warm-up, populated cache", run(True, shared_cache))